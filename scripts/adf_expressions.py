@@ -0,0 +1,223 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:(?P<number>-?\d+(?:\.\d+)?)|(?P<string>'(?:[^']|'')*')|(?P<name>[A-Za-z_]\w*)|(?P<op>\?\.|[().,\[\]]))"
+)
+TIMESTAMP_PATTERN = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,7}))?)?)?(Z|[+-]\d{2}:\d{2})?$"
+)
+TICKS_PER_SECOND = 10_000_000
+LITERALS = {"true": True, "false": False, "null": None}
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_PATTERN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Unexpected character in expression '{text}' at position {pos}.")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "string":
+            value = value[1:-1].replace("''", "'")
+        tokens.append((kind, value))
+    return tokens
+
+
+def parse_timestamp(value, function="ticks"):
+    # Returns the UTC moment and its 7-digit fraction (100ns ticks, beyond what datetime keeps).
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    match = TIMESTAMP_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f"{function}() expects a timestamp, got {value!r}")
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    moment = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    if offset and offset != "Z":
+        shift = timedelta(hours=int(offset[1:3]), minutes=int(offset[4:6]))
+        moment = moment - shift if offset[0] == "+" else moment + shift
+    return moment, (fraction or "0").ljust(7, "0")
+
+
+def ticks(value):
+    moment, fraction = parse_timestamp(value)
+    elapsed = moment - datetime(1, 1, 1)
+    return (elapsed.days * 86400 + elapsed.seconds) * TICKS_PER_SECOND + int(fraction)
+
+
+def add_days(value, days, date_format=None):
+    if date_format is not None:
+        raise ValueError("addDays() only supports the default round-trip format locally.")
+    moment, fraction = parse_timestamp(value, "addDays")
+    return f"{(moment + timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%S')}.{fraction}Z"
+
+
+def utcnow():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f0Z")
+
+
+def coalesce(*values):
+    for value in values:
+        if value is not None:
+            return value
+    return None
+
+
+def empty(value):
+    return value is None or len(value) == 0
+
+
+FUNCTIONS = {
+    "equals": lambda left, right: left == right,
+    "greater": lambda left, right: left > right,
+    "greaterOrEquals": lambda left, right: left >= right,
+    "less": lambda left, right: left < right,
+    "lessOrEquals": lambda left, right: left <= right,
+    "and": lambda *values: all(values),
+    "or": lambda *values: any(values),
+    "not": lambda value: not value,
+    "if": lambda condition, when_true, when_false: when_true if condition else when_false,
+    "concat": lambda *values: "".join("" if value is None else str(value) for value in values),
+    "toLower": lambda value: str(value).lower(),
+    "toUpper": lambda value: str(value).upper(),
+    "string": lambda value: value if isinstance(value, str) else str(value),
+    "int": lambda value: int(value),
+    "length": len,
+    "empty": empty,
+    "coalesce": coalesce,
+    "ticks": ticks,
+    "addDays": add_days,
+    "utcnow": utcnow,
+}
+
+
+class Parser:
+    def __init__(self, tokens, scope):
+        self.tokens = tokens
+        self.pos = 0
+        self.scope = scope
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, expected=None):
+        kind, value = self.peek()
+        if kind is None or (expected is not None and value != expected):
+            raise ValueError(f"Expected '{expected or 'a value'}' in expression, found '{value}'.")
+        self.pos += 1
+        return kind, value
+
+    def parse(self):
+        value = self.expression()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected '{self.peek()[1]}' after expression.")
+        return value
+
+    def expression(self):
+        kind, value = self.take()
+        if kind in ("number", "string"):
+            result = value
+        elif kind == "name" and self.peek()[1] == "(":
+            result = self.call(value)
+        elif kind == "name" and value in LITERALS:
+            result = LITERALS[value]
+        else:
+            raise ValueError(f"Unexpected '{value}' in expression.")
+        return self.accessors(result)
+
+    def call(self, name):
+        self.take("(")
+        args = []
+        if self.peek()[1] != ")":
+            args.append(self.expression())
+            while self.peek()[1] == ",":
+                self.take(",")
+                args.append(self.expression())
+        self.take(")")
+        scope_function = self.scope.get(name)
+        if scope_function is not None:
+            return scope_function(*args)
+        if name not in FUNCTIONS:
+            raise ValueError(f"Unsupported expression function '{name}'.")
+        return FUNCTIONS[name](*args)
+
+    def accessors(self, value):
+        while self.peek()[1] in (".", "?.", "["):
+            _, op = self.take()
+            if op == "[":
+                key = self.expression()
+                self.take("]")
+                value = get_member(value, key, safe=False)
+            else:
+                _, key = self.take()
+                value = get_member(value, key, safe=op == "?.")
+        return value
+
+
+def get_member(value, key, safe):
+    if isinstance(value, list) and isinstance(key, int):
+        if 0 <= key < len(value):
+            return value[key]
+    elif isinstance(value, dict):
+        if key in value:
+            return value[key]
+        # ADF property names are case-insensitive.
+        for name, member in value.items():
+            if str(name).lower() == str(key).lower():
+                return member
+    if safe or value is None:
+        return None
+    raise ValueError(f"Property '{key}' not found.")
+
+
+def evaluate_expression(text, scope):
+    return Parser(tokenize(text), scope).parse()
+
+
+def interpolate(text, scope):
+    parts = []
+    pos = 0
+    while True:
+        start = text.find("@{", pos)
+        if start < 0:
+            parts.append(text[pos:])
+            break
+        parts.append(text[pos:start])
+        end = start + 2
+        quoted = False
+        while end < len(text) and (quoted or text[end] != "}"):
+            if text[end] == "'":
+                quoted = not quoted
+            end += 1
+        if end >= len(text):
+            raise ValueError(f"Unterminated '@{{' in '{text}'.")
+        value = evaluate_expression(text[start + 2:end], scope)
+        parts.append("" if value is None else str(value))
+        pos = end + 1
+    return "".join(parts)
+
+
+def evaluate(value, scope):
+    # Walks activity JSON: {"type": "Expression", "value": ...} objects, "@expr" strings and
+    # "@{...}" interpolations are evaluated, everything else is returned as-is.
+    if isinstance(value, dict):
+        if value.get("type") == "Expression" and set(value) == {"type", "value"}:
+            return evaluate(value["value"], scope)
+        return {key: evaluate(item, scope) for key, item in value.items()}
+    if isinstance(value, list):
+        return [evaluate(item, scope) for item in value]
+    if not isinstance(value, str):
+        return value
+    if value.startswith("@@"):
+        return value[1:]
+    if "@{" in value:
+        return interpolate(value, scope)
+    if value.startswith("@"):
+        return evaluate_expression(value[1:], scope)
+    return value
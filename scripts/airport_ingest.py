@@ -0,0 +1,41 @@
+import argparse
+import time
+
+from json_stream import DEFAULT_CHUNK_SIZE, iter_json_array_batches, write_json_array
+from local_lake import get_lake_root, table_path
+from stacks import DEFAULTS
+
+
+def get_airport_sink_path(lake_root):
+    return table_path(lake_root, DEFAULTS["sink_file_system"], DEFAULTS["airport_sink_folder"], DEFAULTS["airport_sink_file"])
+
+
+def ingest_airports(source, sink_path, batch_size=1000, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Local stand-in for the 06 copy activity: records stream from the source straight into
+    # the bronze file, so memory stays at one batch whatever the payload size.
+    stats = {"records": 0, "batches": 0}
+
+    def records():
+        for batch in iter_json_array_batches(source, batch_size, chunk_size):
+            stats["batches"] += 1
+            stats["records"] += len(batch)
+            yield from batch
+
+    write_json_array(sink_path, records())
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream the airport JSON array into local bronze.")
+    parser.add_argument("--source", default=DEFAULTS["airport_url"], help="Airport JSON URL or file path")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Records per batch")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Bytes read per chunk")
+    args = parser.parse_args()
+
+    sink_path = get_airport_sink_path(get_lake_root())
+    started = time.perf_counter()
+    stats = ingest_airports(args.source, sink_path, args.batch_size, args.chunk_size)
+    print(
+        f"{sink_path}: {stats['records']} records in {stats['batches']} batches, "
+        f"{time.perf_counter() - started:.3f}s"
+    )
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import time
+from array import array
+from pathlib import Path
+
+from columnar import (
+    BOOL,
+    CENTS,
+    DICT,
+    INT,
+    NULL_BOOL,
+    NULL_INT,
+    SILVER_SCHEMAS,
+    ColumnTable,
+    Dictionary,
+    load_silver_table,
+    load_silver_tables,
+    sales_by_airline_name,
+)
+from local_lake import DERIVED_TABLES, SILVER_TABLES, get_lake_root, get_table_version, silver_table_dir
+
+# One uncompressed Arrow IPC file per silver table and delta version. Readers map the file and use
+# its buffers as the column arrays, so a warm load costs a page-in instead of a JSON decode.
+CACHE_DIR_NAME = "_arrow_cache"
+CACHE_FORMAT = "1"
+# Arrow buffer type code per column kind; matches the array("q"/"b"/"i") layouts of columnar.py.
+BUFFER_FORMATS = {INT: "q", CENTS: "q", BOOL: "b", DICT: "i"}
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+    except ImportError:
+        raise RuntimeError("pyarrow is required for the silver Arrow cache (pip install pyarrow).") from None
+    return pyarrow
+
+
+def get_cache_dir(lake_root, table):
+    return Path(lake_root) / CACHE_DIR_NAME / table
+
+
+def get_cache_path(lake_root, table, version):
+    return get_cache_dir(lake_root, table) / f"{version:020d}.arrow"
+
+
+def get_silver_version(lake_root, table):
+    version = get_table_version(silver_table_dir(lake_root, table))
+    if version < 0:
+        raise RuntimeError(f"Silver {table} table not found. Run scripts/silver_flow.py first.")
+    return version
+
+
+def with_nulls(pa, arrow_type, data, null_value):
+    # The sentinel stays in the data buffer for zero-copy readers; the validity bitmap is only for
+    # pyarrow users, who see proper nulls.
+    values = pa.py_buffer(data)
+    plain = pa.Array.from_buffers(arrow_type, len(data), [None, values])
+    valid = pa.compute.not_equal(plain, null_value)
+    if pa.compute.all(valid).as_py() is not False:
+        return plain
+    return pa.Array.from_buffers(arrow_type, len(data), [valid.buffers()[1], values])
+
+
+def to_arrow_array(pa, column):
+    if column.kind in (INT, CENTS):
+        return with_nulls(pa, pa.int64(), column.data, NULL_INT)
+    if column.kind == BOOL:
+        return with_nulls(pa, pa.int8(), column.data, NULL_BOOL)
+    if column.kind == DICT:
+        indices = pa.Array.from_buffers(pa.int32(), len(column.data), [None, pa.py_buffer(column.data)])
+        return pa.DictionaryArray.from_arrays(indices, pa.array(column.dictionary.values))
+    return pa.array(column.data)
+
+
+def build_cache(lake_root, table, version=None):
+    pa = import_pyarrow()
+    version = get_silver_version(lake_root, table) if version is None else version
+    started = time.perf_counter()
+    column_table = load_silver_table(lake_root, table, version=version)
+    fields = []
+    arrays = []
+    for name, column in column_table.columns.items():
+        arrays.append(to_arrow_array(pa, column))
+        metadata = {"kind": column.kind, **({"unit": "cents"} if column.kind == CENTS else {})}
+        fields.append(pa.field(name, arrays[-1].type, metadata=metadata))
+    metadata = {"table": table, "version": str(version), "format": CACHE_FORMAT}
+    arrow_table = pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=metadata))
+
+    path = get_cache_path(lake_root, table, version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        # One record batch and no compression, so every column maps to a single contiguous buffer.
+        with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table, max_chunksize=max(arrow_table.num_rows, 1))
+    os.replace(tmp_path, path)
+    remove_stale(lake_root, table, version)
+    print(f"arrow cache: silver.{table} v{version}, {len(column_table)} rows in {time.perf_counter() - started:.3f}s")
+    return path
+
+
+def remove_stale(lake_root, table, version):
+    keep = get_cache_path(lake_root, table, version).name
+    for path in get_cache_dir(lake_root, table).glob("*.arrow"):
+        if path.name != keep:
+            try:
+                path.unlink()
+            except OSError:
+                # Still mapped by a reader on Windows; the next build removes it.
+                pass
+
+
+def is_current(arrow_table, table, version):
+    metadata = {key.decode(): value.decode() for key, value in (arrow_table.schema.metadata or {}).items()}
+    if metadata.get("format") != CACHE_FORMAT or metadata.get("version") != str(version):
+        return False
+    kinds = {field.name: (field.metadata or {}).get(b"kind", b"").decode() for field in arrow_table.schema}
+    return kinds == SILVER_SCHEMAS[table]
+
+
+def open_cached_table(lake_root, table, version=None):
+    # Returns a pyarrow Table whose buffers point into the mapped file.
+    pa = import_pyarrow()
+    version = get_silver_version(lake_root, table) if version is None else version
+    path = get_cache_path(lake_root, table, version)
+    for attempt in range(2):
+        if attempt or not path.exists():
+            build_cache(lake_root, table, version)
+        arrow_table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        if is_current(arrow_table, table, version):
+            return arrow_table
+    raise RuntimeError(f"Arrow cache at {path} does not match the silver {table} schema.")
+
+
+def single_chunk(chunked):
+    return chunked.chunk(0) if chunked.num_chunks == 1 else chunked.combine_chunks()
+
+
+def buffer_view(values, kind):
+    fmt = BUFFER_FORMATS[kind]
+    if not len(values):
+        return array(fmt)
+    itemsize = array(fmt).itemsize
+    start = values.offset * itemsize
+    return memoryview(values.buffers()[1])[start:start + len(values) * itemsize].cast(fmt)
+
+
+class TextView:
+    # Free-text columns stay in the Arrow string buffers and are decoded one value at a time.
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+    def __getitem__(self, index):
+        return self.values[index].as_py()
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values.to_pylist())
+
+
+def to_dictionary(values):
+    dictionary = Dictionary()
+    for value in values.to_pylist():
+        dictionary.encode(value)
+    return dictionary
+
+
+def load_cached_table(lake_root, table, dictionaries=None, version=None):
+    # Same ColumnTable as columnar.load_silver_table, but numeric and code columns are read-only
+    # views of the mapped file. Only columns with a shared dictionary are copied, to re-code them.
+    arrow_table = open_cached_table(lake_root, table, version)
+    column_table = ColumnTable(table, SILVER_SCHEMAS[table], dictionaries)
+    for name, column in column_table.columns.items():
+        values = single_chunk(arrow_table.column(name))
+        if column.kind == DICT:
+            codes = buffer_view(values.indices, DICT)
+            if (dictionaries or {}).get(name) is not None:
+                mapping = [column.dictionary.encode(value) for value in values.dictionary.to_pylist()]
+                column.data = array("i", [mapping[code] for code in codes])
+            else:
+                column.data = codes
+                column.dictionary = to_dictionary(values.dictionary)
+        elif column.kind in BUFFER_FORMATS:
+            column.data = buffer_view(values, column.kind)
+        else:
+            column.data = TextView(values)
+    column_table.length = arrow_table.num_rows
+    return column_table
+
+
+def load_cached_tables(lake_root, tables=None):
+    dictionaries = {"country": Dictionary(), "country_upper": Dictionary()}
+    return {table: load_cached_table(lake_root, table, dictionaries) for table in tables or SILVER_TABLES}
+
+
+def cache_status(lake_root, table):
+    version = get_table_version(silver_table_dir(lake_root, table))
+    cached = sorted(get_cache_dir(lake_root, table).glob("*.arrow"))
+    current = get_cache_path(lake_root, table, version) if version >= 0 else None
+    return {
+        "table": table,
+        "silver_version": version,
+        "cached_versions": [int(path.stem) for path in cached],
+        "current": current is not None and current.exists(),
+        "bytes": current.stat().st_size if current is not None and current.exists() else 0,
+    }
+
+
+def time_query(load, lake_root):
+    started = time.perf_counter()
+    tables = load(lake_root, ["bookings", "airline"])
+    loaded = time.perf_counter()
+    totals = sales_by_airline_name(tables["bookings"], tables["airline"])
+    finished = time.perf_counter()
+    return loaded - started, finished - loaded, totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and inspect the memory-mapped Arrow cache of the silver tables.")
+    parser.add_argument("command", choices=["build", "status", "query"], help="Cache action")
+    parser.add_argument("--table", choices=sorted([*SILVER_TABLES, *DERIVED_TABLES]), action="append", help="Limit to a table")
+    parser.add_argument("--force", action="store_true", help="build: rewrite entries that are already current")
+    args = parser.parse_args()
+
+    lake_root = get_lake_root()
+    tables = args.table or sorted(SILVER_TABLES)
+    if args.command == "build":
+        for table in tables:
+            version = get_silver_version(lake_root, table)
+            if args.force or not get_cache_path(lake_root, table, version).exists():
+                build_cache(lake_root, table, version)
+            else:
+                print(f"arrow cache: silver.{table} v{version} is current")
+    elif args.command == "status":
+        for table in tables:
+            status = cache_status(lake_root, table)
+            state = "current" if status["current"] else "stale" if status["cached_versions"] else "missing"
+            print(
+                f"silver.{table}: version {status['silver_version']}, cache {state} "
+                f"({status['bytes']} bytes, cached versions {json.dumps(status['cached_versions'])})"
+            )
+    else:
+        # Sales by airline_name from the delta files and from the mapped cache (built on first use).
+        for label, load in (("delta rows", load_silver_tables), ("arrow cache", load_cached_tables)):
+            load_seconds, query_seconds, totals = time_query(load, lake_root)
+            print(f"{label:<11}: load {load_seconds * 1000:8.1f} ms, query {query_seconds * 1000:8.1f} ms, {len(totals)} groups")
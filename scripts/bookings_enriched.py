@@ -0,0 +1,199 @@
+import argparse
+import time
+
+from file_index import may_hold_any
+from local_lake import (
+    CHANGE_TYPE_FIELD,
+    DELETE,
+    DERIVED_TABLES,
+    INSERT,
+    SILVER_TABLES,
+    UPDATE_POSTIMAGE,
+    active_files,
+    get_lake_root,
+    get_table_version,
+    has_full_change_feed,
+    overwrite_table,
+    read_changes,
+    read_file_rows,
+    read_json_optional,
+    read_rows,
+    read_rows_in,
+    silver_table_dir,
+    upsert_table,
+    write_json_atomic,
+)
+from scd2 import EFFECTIVE_FROM, build_history, row_as_of
+
+ENRICHED_TABLE = "bookings_enriched"
+FACT_COLUMNS = [
+    "booking_id",
+    "passenger_id",
+    "flight_id",
+    "airline_id",
+    "origin_airport_id",
+    "destination_airport_id",
+    "booking_date",
+    "booking_year",
+    "booking_month",
+    "ticket_cost",
+    "flight_duration_mins",
+    "is_paid",
+]
+# (dimension, fact key, enriched column -> dimension column). Only the attributes gold reads are
+# kept; airport plays two roles. SCD2 dimensions are joined as of booking_date, and their
+# effective_from is kept as the version key of the match.
+JOINS = [
+    ("airline", "airline_id", {"airline_name": "airline_name", "airline_effective_from": EFFECTIVE_FROM}),
+    ("flight", "flight_id", {"flight_number": "flight_number"}),
+    (
+        "passenger",
+        "passenger_id",
+        {"age_band": "age_band", "gender_full": "gender_full", "passenger_country": "country", "passenger_effective_from": EFFECTIVE_FROM},
+    ),
+    ("airport", "origin_airport_id", {"origin_airport_name": "airport_name", "origin_city": "city"}),
+    ("airport", "destination_airport_id", {"destination_airport_name": "airport_name", "destination_city": "city"}),
+]
+DIMENSIONS = sorted({table for table, _, _ in JOINS})
+SOURCE_TABLES = ["bookings"] + DIMENSIONS
+
+
+def get_state_path(table_dir):
+    return table_dir / "_state.json"
+
+
+def get_source_versions(lake_root):
+    return {table: get_table_version(silver_table_dir(lake_root, table)) for table in SOURCE_TABLES}
+
+
+def load_dimensions(lake_root, versions, keys=None):
+    # keys maps a dimension to the keys to load; without it every row is read (full refresh).
+    # Incremental refreshes only open the files whose stats and blooms may hold those keys, so
+    # their cost follows the changed bookings, not the dimension size.
+    dimensions = {}
+    for table in DIMENSIONS:
+        table_dir = silver_table_dir(lake_root, table)
+        key_column = SILVER_TABLES[table]["keys"][0]
+        if versions[table] < 0:
+            rows = []
+        elif keys is None:
+            rows = read_rows(table_dir, versions[table])
+        else:
+            rows = read_rows_in(table_dir, key_column, keys.get(table, ()), versions[table])
+        dimensions[table] = build_history(rows, key_column)
+    return dimensions
+
+
+def referenced_keys(rows):
+    keys = {table: set() for table in DIMENSIONS}
+    for row in rows:
+        for table, fact_key, _ in JOINS:
+            if row.get(fact_key) is not None:
+                keys[table].add(row[fact_key])
+    return keys
+
+
+def enrich(booking, dimensions):
+    row = {column: booking.get(column) for column in FACT_COLUMNS}
+    for table, fact_key, columns in JOINS:
+        match = row_as_of(dimensions[table], booking.get(fact_key), booking.get("booking_date"))
+        for target, source in columns.items():
+            row[target] = match.get(source) if match else None
+    return row
+
+
+def changed_bookings(lake_root, start_version, end_version):
+    # booking_id -> latest silver row, or None when the booking was deleted.
+    latest = {}
+    for row in read_changes(silver_table_dir(lake_root, "bookings"), start_version, end_version):
+        change_type = row.get(CHANGE_TYPE_FIELD)
+        if change_type in (INSERT, UPDATE_POSTIMAGE):
+            latest[row["booking_id"]] = row
+        elif change_type == DELETE:
+            latest[row["booking_id"]] = None
+    return latest
+
+
+def changed_dimension_keys(lake_root, previous, versions):
+    # fact key -> dimension keys whose rows changed, from the dimension change feeds.
+    changed = {}
+    for table in DIMENSIONS:
+        if versions[table] == previous[table]:
+            continue
+        key_column = SILVER_TABLES[table]["keys"][0]
+        keys = {row.get(key_column) for row in read_changes(silver_table_dir(lake_root, table), previous[table], versions[table])}
+        for join_table, fact_key, _ in JOINS:
+            if join_table == table and keys:
+                changed.setdefault(fact_key, set()).update(keys)
+    return changed
+
+
+def affected_rows(table_dir, changed_keys, skip):
+    # Enriched rows joined to a changed dimension key; files whose stats or blooms rule out every
+    # changed key are not opened.
+    for rel_path, add in active_files(table_dir).items():
+        if not any(may_hold_any(table_dir, add, fact_key, list(keys)) for fact_key, keys in changed_keys.items()):
+            continue
+        for row in read_file_rows(table_dir, rel_path):
+            if row["booking_id"] not in skip and any(row.get(fact_key) in keys for fact_key, keys in changed_keys.items()):
+                yield row
+
+
+def needs_full_refresh(lake_root, previous, versions):
+    for table in SOURCE_TABLES:
+        if versions[table] < previous.get(table, -1):
+            return True
+        if not has_full_change_feed(silver_table_dir(lake_root, table), previous.get(table, -1), versions[table]):
+            return True
+    return False
+
+
+def refresh_enriched(lake_root, full=False):
+    started = time.perf_counter()
+    table_dir = silver_table_dir(lake_root, ENRICHED_TABLE)
+    spec = DERIVED_TABLES[ENRICHED_TABLE]
+    versions = get_source_versions(lake_root)
+    if versions["bookings"] < 0:
+        raise RuntimeError("Silver bookings table not found. Run scripts/silver_flow.py first.")
+    state = None if full else read_json_optional(get_state_path(table_dir))
+    previous = state["versions"] if state and get_table_version(table_dir) >= 0 else None
+    if previous == versions:
+        print(f"silver.{ENRICHED_TABLE}: up to date")
+        return {"mode": "current", "version": get_table_version(table_dir), "changes": 0, "rows": 0}
+
+    if previous is None or needs_full_refresh(lake_root, previous, versions):
+        mode = "full"
+        dimensions = load_dimensions(lake_root, versions)
+        rows = overwrite_table(
+            table_dir,
+            (enrich(booking, dimensions) for booking in read_rows(silver_table_dir(lake_root, "bookings"), versions["bookings"])),
+            spec["bloom"],
+        )
+        # A rewrite leaves no change data, so change-feed readers rescan the table.
+        result = {"version": get_table_version(table_dir), "changes": 0}
+    else:
+        # Bookings that changed are enriched from their new silver row; bookings whose dimension
+        # rows changed are re-enriched from the fact columns they already carry.
+        mode = "incremental"
+        bookings = changed_bookings(lake_root, previous["bookings"], versions["bookings"])
+        pending = [row for row in bookings.values() if row is not None]
+        deletes = [{"booking_id": booking_id} for booking_id, row in bookings.items() if row is None]
+        changed_keys = changed_dimension_keys(lake_root, previous, versions)
+        if changed_keys:
+            pending.extend(affected_rows(table_dir, changed_keys, bookings))
+        dimensions = load_dimensions(lake_root, versions, referenced_keys(pending))
+        upserts = [enrich(row, dimensions) for row in pending]
+        rows = len(upserts) + len(deletes)
+        result = upsert_table(table_dir, upserts, spec["keys"], deletes, spec["bloom"])
+    write_json_atomic(get_state_path(table_dir), {"versions": versions})
+    elapsed = time.perf_counter() - started
+    print(f"silver.{ENRICHED_TABLE}: {mode} refresh to version {result['version']}, {rows} rows enriched, {result['changes']} change rows in {elapsed:.3f}s")
+    return dict(result, mode=mode, rows=rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the bookings_enriched join index from the local silver tables.")
+    parser.add_argument("--full", action="store_true", help="Rebuild from a full scan of silver bookings")
+    args = parser.parse_args()
+
+    refresh_enriched(get_lake_root(), full=args.full)
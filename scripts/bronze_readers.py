@@ -0,0 +1,285 @@
+import argparse
+import csv
+import json
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from columnar import CENTS, DICT, INT, SILVER_SCHEMAS, TEXT, ColumnTable
+from json_stream import iter_json_values
+from local_lake import SILVER_TABLES, bronze_source_path, get_lake_root, get_repo_root
+from stacks import DEFAULTS
+
+DEFAULT_BATCH_SIZE = 65536
+DATAFLOW_DIR_NAME = "10_adf_dataflow_bronze_silver"
+SOURCE_PATTERN = re.compile(r'"source\(output\((.+?)\), allowSchemaDrift.*?~> (\w+)"')
+FIELD_PATTERN = re.compile(r"^\s*(\w+)\s+as\s+(\w+)(?:\((\d+)\s*,\s*(\d+)\))?\s*$")
+# Written by the change_tracking mode of 08_adf_pipeline_fact_bookings_incremental; absent (None)
+# in watermark mode.
+CHANGE_CAPTURE_COLUMNS = ("is_deleted", "change_version")
+SOURCE_TABLES = {
+    "srcAirline": "airline",
+    "srcFlight": "flight",
+    "srcPassenger": "passenger",
+    "srcAirport": "airport",
+    "srcBookings": "bookings",
+}
+
+
+class Field:
+    __slots__ = ("name", "type", "precision", "scale")
+
+    def __init__(self, name, field_type, precision=None, scale=None):
+        self.name = name
+        self.type = field_type
+        self.precision = precision
+        self.scale = scale
+
+
+class RejectSink:
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.count = 0
+        self.handle = None
+
+    def write(self, source, row_number, error, raw):
+        self.count += 1
+        if self.path is None:
+            return
+        if self.handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.handle = self.path.open("a", encoding="utf-8")
+        record = {"source": str(source), "row_number": row_number, "error": error, "raw": raw}
+        self.handle.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def split_fields(text):
+    fields = []
+    depth = 0
+    current = []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            fields.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        fields.append("".join(current))
+    return fields
+
+
+def parse_schema(text):
+    schema = []
+    for field_text in split_fields(text):
+        match = FIELD_PATTERN.match(field_text)
+        if not match:
+            raise ValueError(f"Unsupported schema field: '{field_text.strip()}'")
+        name, field_type, precision, scale = match.groups()
+        schema.append(Field(
+            name,
+            field_type.lower(),
+            int(precision) if precision else None,
+            int(scale) if scale else None,
+        ))
+    return schema
+
+
+def load_dataflow_schemas(repo_root=None):
+    main_tf = (repo_root or get_repo_root()) / "terraform" / DATAFLOW_DIR_NAME / "main.tf"
+    schemas = {}
+    for output_text, source_name in SOURCE_PATTERN.findall(main_tf.read_text(encoding="utf-8")):
+        table = SOURCE_TABLES.get(source_name)
+        if table:
+            schemas[table] = parse_schema(output_text)
+    return schemas
+
+
+def column_kind(table, field):
+    known = SILVER_SCHEMAS.get(table, {}).get(field.name)
+    if field.type == "decimal":
+        return CENTS if field.scale == 2 else TEXT
+    if field.type in ("integer", "long", "short"):
+        return INT
+    if field.type == "date":
+        return DICT
+    return known if known in (DICT, TEXT) else DICT
+
+
+def convert_value(field, value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip() if field.type != "string" else value
+        if value == "":
+            return None
+    if field.type in ("integer", "long", "short"):
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"{field.name}: expected integer, got {value!r}")
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"{field.name}: expected integer, got {value!r}") from None
+    if field.type == "decimal":
+        try:
+            number = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f"{field.name}: expected decimal, got {value!r}") from None
+        scaled = number.scaleb(field.scale or 0)
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"{field.name}: more than {field.scale} decimal places in {value!r}")
+        if field.precision and len(str(abs(int(scaled)))) > field.precision:
+            raise ValueError(f"{field.name}: {value!r} exceeds decimal({field.precision},{field.scale})")
+        return number
+    if field.type == "date":
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        try:
+            return date.fromisoformat(str(value)[:10]).isoformat()
+        except ValueError:
+            raise ValueError(f"{field.name}: expected yyyy-MM-dd date, got {value!r}") from None
+    if field.type == "boolean":
+        if isinstance(value, bool):
+            return value
+        lowered = str(value).lower()
+        if lowered in ("true", "1", "yes"):
+            return True
+        if lowered in ("false", "0", "no"):
+            return False
+        raise ValueError(f"{field.name}: expected boolean, got {value!r}")
+    return str(value)
+
+
+def convert_row(schema, raw):
+    return {field.name: convert_value(field, raw.get(field.name)) for field in schema}
+
+
+def new_batch(table, schema):
+    return ColumnTable(table, {field.name: column_kind(table, field) for field in schema})
+
+
+def batch_rows(table, schema, rows, source, batch_size, rejects):
+    batch = new_batch(table, schema)
+    for row_number, raw in rows:
+        if "_malformed" in raw:
+            rejects.write(source, row_number, "row does not match the header or record shape", raw["_malformed"])
+            continue
+        try:
+            typed = convert_row(schema, raw)
+        except (ValueError, TypeError) as exc:
+            rejects.write(source, row_number, str(exc), raw)
+            continue
+        batch.append_row(typed)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = new_batch(table, schema)
+    if len(batch):
+        yield batch
+
+
+def check_columns(path, schema, available):
+    # validateSchema of the data flow sources: a file missing a declared column fails the source
+    # instead of loading nulls.
+    if not DEFAULTS["silver_validate_schema"]:
+        return
+    missing = [field.name for field in schema if field.name not in available and field.name not in CHANGE_CAPTURE_COLUMNS]
+    if missing:
+        raise RuntimeError(f"{path} is missing columns declared in the data flow source schema: {', '.join(missing)}")
+
+
+def iter_csv_records(path, delimiter=",", schema=()):
+    with Path(path).open("r", encoding="utf-8-sig", newline="") as handle:
+        reader = csv.reader(handle, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        check_columns(path, schema, header)
+        for row_number, values in enumerate(reader, start=2):
+            if len(values) != len(header):
+                yield row_number, {"_malformed": values}
+                continue
+            yield row_number, dict(zip(header, values))
+
+
+def iter_json_records(path):
+    for row_number, value in enumerate(iter_json_values(path), start=1):
+        yield row_number, value if isinstance(value, dict) else {"_malformed": value}
+
+
+def read_csv_batches(path, table, schema, batch_size=DEFAULT_BATCH_SIZE, rejects=None):
+    rejects = rejects or RejectSink()
+    yield from batch_rows(table, schema, iter_csv_records(path, schema=schema), path, batch_size, rejects)
+
+
+def read_json_batches(path, table, schema, batch_size=DEFAULT_BATCH_SIZE, rejects=None):
+    rejects = rejects or RejectSink()
+    yield from batch_rows(table, schema, iter_json_records(path), path, batch_size, rejects)
+
+
+def read_parquet_batches(path, table, schema, batch_size=DEFAULT_BATCH_SIZE, rejects=None):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow is required to read parquet bronze files (pip install pyarrow).") from None
+    rejects = rejects or RejectSink()
+    parquet_file = pq.ParquetFile(str(path))
+    available = set(parquet_file.schema_arrow.names)
+    check_columns(path, schema, available)
+    columns = [field.name for field in schema if field.name in available]
+
+    def records():
+        row_number = 0
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            for record in record_batch.to_pylist():
+                row_number += 1
+                yield row_number, record
+
+    yield from batch_rows(table, schema, records(), path, batch_size, rejects)
+
+
+def read_bronze_batches(path, table, schema, batch_size=DEFAULT_BATCH_SIZE, rejects=None):
+    suffix = Path(path).suffix.lower()
+    if suffix == ".parquet":
+        return read_parquet_batches(path, table, schema, batch_size, rejects)
+    if suffix == ".json":
+        return read_json_batches(path, table, schema, batch_size, rejects)
+    return read_csv_batches(path, table, schema, batch_size, rejects)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read local bronze files into typed columnar batches.")
+    parser.add_argument("table", choices=sorted(SILVER_TABLES), help="Bronze source to read")
+    parser.add_argument("--path", help="Override the bronze file path")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per batch")
+    parser.add_argument("--rejects", help="JSON-lines file for rejected rows")
+    args = parser.parse_args()
+
+    lake_root = get_lake_root()
+    schema = load_dataflow_schemas()[args.table]
+    path = Path(args.path) if args.path else bronze_source_path(lake_root, args.table)
+    started = time.perf_counter()
+    rows = 0
+    batches = 0
+    with RejectSink(args.rejects) as rejects:
+        for batch in read_bronze_batches(path, args.table, schema, args.batch_size, rejects):
+            rows += len(batch)
+            batches += 1
+        print(f"{path}: {rows} rows in {batches} batches, {rejects.count} rejected, {time.perf_counter() - started:.3f}s")
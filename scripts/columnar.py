@@ -0,0 +1,366 @@
+import argparse
+import sys
+import time
+from array import array
+from decimal import Decimal
+
+from local_lake import SILVER_TABLES, get_lake_root, read_rows, silver_table_dir, to_cents
+from scd2 import EFFECTIVE_FROM, EFFECTIVE_TO, IS_CURRENT, OPEN_START, version_index
+
+NULL_INT = -(2 ** 63)
+NULL_BOOL = -1
+
+INT = "int"
+CENTS = "cents"
+BOOL = "bool"
+DICT = "dict"
+TEXT = "text"
+
+# Low-cardinality text is dictionary-encoded; free text (names) stays a plain list.
+SILVER_SCHEMAS = {
+    "airline": {
+        "airline_id": INT,
+        "airline_name": DICT,
+        "country": DICT,
+        "airline_name_clean": DICT,
+        "country_upper": DICT,
+        EFFECTIVE_FROM: DICT,
+        EFFECTIVE_TO: DICT,
+        IS_CURRENT: BOOL,
+    },
+    "flight": {
+        "flight_id": INT,
+        "flight_number": TEXT,
+        "departure_time": DICT,
+        "arrival_time": DICT,
+        "flight_prefix": DICT,
+        "departure_ts": DICT,
+        "arrival_ts": DICT,
+    },
+    "passenger": {
+        "passenger_id": INT,
+        "full_name": TEXT,
+        "gender": DICT,
+        "age": INT,
+        "country": DICT,
+        "full_name_clean": TEXT,
+        "gender_full": DICT,
+        "age_band": DICT,
+        EFFECTIVE_FROM: DICT,
+        EFFECTIVE_TO: DICT,
+        IS_CURRENT: BOOL,
+    },
+    "airport": {
+        "airport_id": INT,
+        "airport_name": TEXT,
+        "city": DICT,
+        "country": DICT,
+        "airport_name_clean": TEXT,
+        "city_upper": DICT,
+    },
+    "bookings": {
+        "booking_id": INT,
+        "passenger_id": INT,
+        "flight_id": INT,
+        "airline_id": INT,
+        "origin_airport_id": INT,
+        "destination_airport_id": INT,
+        "booking_date": DICT,
+        "ticket_cost": CENTS,
+        "flight_duration_mins": INT,
+        "checkin_status": DICT,
+        "booking_year": INT,
+        "booking_month": INT,
+        "is_paid": BOOL,
+    },
+    # Bookings joined to all four dimensions (scripts/bookings_enriched.py); the *_effective_from
+    # columns name the SCD2 version each booking was joined to.
+    "bookings_enriched": {
+        "booking_id": INT,
+        "passenger_id": INT,
+        "flight_id": INT,
+        "airline_id": INT,
+        "origin_airport_id": INT,
+        "destination_airport_id": INT,
+        "booking_date": DICT,
+        "booking_year": INT,
+        "booking_month": INT,
+        "ticket_cost": CENTS,
+        "flight_duration_mins": INT,
+        "is_paid": BOOL,
+        "airline_name": DICT,
+        "airline_effective_from": DICT,
+        "flight_number": DICT,
+        "age_band": DICT,
+        "gender_full": DICT,
+        "passenger_country": DICT,
+        "passenger_effective_from": DICT,
+        "origin_airport_name": DICT,
+        "origin_city": DICT,
+        "destination_airport_name": DICT,
+        "destination_city": DICT,
+    },
+}
+
+
+class Dictionary:
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class Column:
+    __slots__ = ("name", "kind", "data", "dictionary")
+
+    def __init__(self, name, kind, dictionary=None):
+        self.name = name
+        self.kind = kind
+        self.dictionary = None
+        if kind in (INT, CENTS):
+            self.data = array("q")
+        elif kind == BOOL:
+            self.data = array("b")
+        elif kind == DICT:
+            self.data = array("i")
+            self.dictionary = dictionary if dictionary is not None else Dictionary()
+        else:
+            self.data = []
+
+    def append(self, value):
+        if self.kind == INT:
+            self.data.append(NULL_INT if value is None else int(value))
+        elif self.kind == CENTS:
+            self.data.append(NULL_INT if value is None else to_cents(value))
+        elif self.kind == BOOL:
+            self.data.append(NULL_BOOL if value is None else int(bool(value)))
+        elif self.kind == DICT:
+            self.data.append(self.dictionary.encode(value))
+        else:
+            self.data.append(value)
+
+    def value(self, index):
+        raw = self.data[index]
+        if self.kind == INT:
+            return None if raw == NULL_INT else raw
+        if self.kind == CENTS:
+            return None if raw == NULL_INT else Decimal(raw).scaleb(-2)
+        if self.kind == BOOL:
+            return None if raw == NULL_BOOL else bool(raw)
+        if self.kind == DICT:
+            return self.dictionary.decode(raw)
+        return raw
+
+    def memory_bytes(self):
+        if isinstance(self.data, (array, memoryview)):
+            size = self.data.itemsize * len(self.data)
+        else:
+            size = sys.getsizeof(self.data) + sum(sys.getsizeof(item) for item in self.data)
+        if self.dictionary is not None:
+            size += sum(sys.getsizeof(item) for item in self.dictionary.values)
+        return size
+
+
+class RowView:
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, name):
+        return self.table.columns[name].value(self.index)
+
+    def as_dict(self):
+        return {name: column.value(self.index) for name, column in self.table.columns.items()}
+
+
+class ColumnTable:
+    __slots__ = ("name", "columns", "length")
+
+    def __init__(self, name, schema, dictionaries=None):
+        self.name = name
+        self.length = 0
+        self.columns = {}
+        for column_name, kind in schema.items():
+            shared = (dictionaries or {}).get(column_name) if kind == DICT else None
+            self.columns[column_name] = Column(column_name, kind, shared)
+
+    def append_row(self, row):
+        for name, column in self.columns.items():
+            column.append(row.get(name))
+        self.length += 1
+
+    def extend_rows(self, rows):
+        for row in rows:
+            self.append_row(row)
+        return self
+
+    def column(self, name):
+        return self.columns[name]
+
+    def row(self, index):
+        return RowView(self, index)
+
+    def rows(self):
+        for index in range(self.length):
+            yield self.row(index).as_dict()
+
+    def memory_bytes(self):
+        return sum(column.memory_bytes() for column in self.columns.values())
+
+    def __len__(self):
+        return self.length
+
+
+def build_key_index(table, key_column):
+    keys = table.column(key_column).data
+    largest = max((key for key in keys if key != NULL_INT), default=-1)
+    # Surrogate ids are small dense integers, so a positional array beats a dict lookup.
+    if 0 <= largest <= max(1024, 4 * len(keys)):
+        index = array("q", [-1]) * (largest + 1)
+        for position, key in enumerate(keys):
+            if key != NULL_INT:
+                index[key] = position
+        return index
+    return {key: position for position, key in enumerate(keys) if key != NULL_INT}
+
+
+def join_codes(fact_keys, key_index, dim_codes, missing_code):
+    # Maps every fact row to the dimension's integer code; no strings are touched.
+    codes = array("i", bytes(4 * len(fact_keys)))
+    dense = isinstance(key_index, array)
+    limit = len(key_index) if dense else 0
+    for position, key in enumerate(fact_keys):
+        if dense:
+            dim_position = key_index[key] if 0 <= key < limit else -1
+        else:
+            dim_position = key_index.get(key, -1)
+        codes[position] = dim_codes[dim_position] if dim_position >= 0 else missing_code
+    return codes
+
+
+def has_history(table):
+    column = table.columns.get(EFFECTIVE_FROM)
+    return column is not None and any(value is not None for value in column.dictionary.values)
+
+
+def build_version_index(table, key_column):
+    # key -> (sorted effective_from values, row positions) for SCD2 dimensions.
+    keys = table.column(key_column).data
+    starts = table.column(EFFECTIVE_FROM)
+    versions = {}
+    for position, key in enumerate(keys):
+        if key != NULL_INT:
+            versions.setdefault(key, []).append((starts.value(position) or OPEN_START, position))
+    index = {}
+    for key, items in versions.items():
+        items.sort()
+        index[key] = ([start for start, _ in items], [position for _, position in items])
+    return index
+
+
+def join_codes_as_of(fact_keys, fact_times, time_dictionary, version_index_by_key, dim_codes, missing_code):
+    # Point-in-time variant of join_codes: each fact row gets the dimension version in effect at
+    # its time. Facts repeat (key, day) pairs a lot, so each pair is resolved once.
+    codes = array("i", bytes(4 * len(fact_keys)))
+    resolved = {}
+    for position, pair in enumerate(zip(fact_keys, fact_times)):
+        code = resolved.get(pair)
+        if code is None:
+            entry = version_index_by_key.get(pair[0])
+            if entry is None:
+                code = missing_code
+            else:
+                starts, positions = entry
+                code = dim_codes[positions[version_index(starts, time_dictionary.decode(pair[1]))]]
+            resolved[pair] = code
+        codes[position] = code
+    return codes
+
+
+def join_dimension(fact_table, fact_key, dim_table, dim_key, dim_column, fact_time=None):
+    column = dim_table.column(dim_column)
+    missing_code = column.dictionary.encode(None)
+    if fact_time is not None and has_history(dim_table):
+        time_column = fact_table.column(fact_time)
+        codes = join_codes_as_of(
+            fact_table.column(fact_key).data,
+            time_column.data,
+            time_column.dictionary,
+            build_version_index(dim_table, dim_key),
+            column.data,
+            missing_code,
+        )
+        return codes, column.dictionary
+    key_index = build_key_index(dim_table, dim_key)
+    codes = join_codes(fact_table.column(fact_key).data, key_index, column.data, missing_code)
+    return codes, column.dictionary
+
+
+def group_sum(codes, values, group_count):
+    sums = [0] * group_count
+    counts = [0] * group_count
+    for code, value in zip(codes, values):
+        if value == NULL_INT:
+            continue
+        sums[code] += value
+        counts[code] += 1
+    return sums, counts
+
+
+def sales_by_airline_name(bookings, airlines):
+    codes, dictionary = join_dimension(bookings, "airline_id", airlines, "airline_id", "airline_name", "booking_date")
+    sums, counts = group_sum(codes, bookings.column("ticket_cost").data, len(dictionary))
+    return {dictionary.decode(code): sums[code] for code in range(len(sums)) if counts[code]}
+
+
+def load_silver_table(lake_root, table, dictionaries=None, version=None):
+    column_table = ColumnTable(table, SILVER_SCHEMAS[table], dictionaries)
+    return column_table.extend_rows(read_rows(silver_table_dir(lake_root, table), version))
+
+
+def load_silver_tables(lake_root, tables=None):
+    # Country codes are shared so airline, passenger and airport countries compare as integers.
+    dictionaries = {"country": Dictionary(), "country_upper": Dictionary()}
+    return {table: load_silver_table(lake_root, table, dictionaries) for table in tables or SILVER_TABLES}
+
+
+def estimate_row_bytes(rows):
+    total = 0
+    for row in rows:
+        total += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load silver tables into dictionary-encoded columns and report memory.")
+    parser.add_argument("--table", choices=sorted(SILVER_TABLES), action="append", help="Limit to a table")
+    args = parser.parse_args()
+
+    lake_root = get_lake_root()
+    started = time.perf_counter()
+    tables = load_silver_tables(lake_root, args.table)
+    print(f"Loaded {len(tables)} tables in {time.perf_counter() - started:.3f}s")
+    for name, table in tables.items():
+        row_bytes = estimate_row_bytes(read_rows(silver_table_dir(lake_root, name)))
+        print(f"silver.{name}: {len(table)} rows, columnar {table.memory_bytes()} bytes vs {row_bytes} bytes as dicts")
+    if "bookings" in tables and "airline" in tables:
+        started = time.perf_counter()
+        totals = sales_by_airline_name(tables["bookings"], tables["airline"])
+        print(f"Sales by airline_name on integer codes: {len(totals)} groups in {time.perf_counter() - started:.3f}s")
@@ -1,4 +1,5 @@
 import argparse
+import hashlib
 import json
 import secrets
 import shutil
@@ -8,85 +9,45 @@ import urllib.request
 import os
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-DEFAULTS = {
-    "resource_group_name_prefix": "rg-airline",
-    "location": "eastus2",
-    "storage_account_name_prefix": "stairline",
-    "account_replication_type": "LRS",
-    "account_tier": "Standard",
-    "public_network_access_enabled": True,
-    "is_hns_enabled": True,
-    "data_factory_name_prefix": "adf-airline",
-    "http_linked_service_name_prefix": "ls-http-airline",
-    "http_base_url": "https://raw.githubusercontent.com",
-    "http_authentication_type": "Anonymous",
-    "http_enable_certificate_validation": True,
-    "adls_linked_service_name_prefix": "ls-adls-airline",
-    "linked_services_description": "Linked services for HTTP source, SQL, and ADLS Gen2 sink",
-    "sql_linked_service_name_prefix": "ls-sql-airline",
-    "pipeline_name_prefix": "pl-airline-http",
-    "http_dataset_name_prefix": "ds_http_airline",
-    "sink_dataset_name_prefix": "ds_adls_bronze_airline",
-    "sink_file_system": "bronze",
-    "airport_pipeline_name_prefix": "pl-airline-airport-json",
-    "http_airport_dataset_name_prefix": "ds_http_airport_json",
-    "sink_airport_dataset_name_prefix": "ds_adls_bronze_airport_json",
-    "airport_url": "https://raw.githubusercontent.com/Ch3rry-Pi3-Data-Engineering/DataEng-Azure-Airline/refs/heads/main/data/DimAirport.json",
-    "airport_rel_url": "Ch3rry-Pi3-Data-Engineering/DataEng-Azure-Airline/refs/heads/main/data/DimAirport.json",
-    "airport_sink_folder": "airport",
-    "airport_sink_file": "airport.json",
-    "bookings_pipeline_name_prefix": "pl-airline-bookings",
-    "bookings_sql_dataset_name_prefix": "ds_sql_airline",
-    "bookings_json_dataset_name_prefix": "ds_json_airline",
-    "bookings_parquet_dataset_name_prefix": "ds_parquet_airline",
-    "monitor_container": "bronze",
-    "monitor_empty_folder": "monitor/emptyjson",
-    "monitor_empty_file": "empty.json",
-    "monitor_lastload_folder": "monitor/lastload",
-    "monitor_lastload_file": "last_load.json",
-    "bookings_sink_container": "bronze",
-    "bookings_sink_folder": "airport",
-    "bookings_sink_file": "fact_bookings.parquet",
-    "bookings_sql_schema": "dbo",
-    "bookings_sql_table": "FactBookings",
-    "master_pipeline_name_prefix": "pl-airline-master",
-    "silver_pipeline_name_prefix": "pl-airline-silver-dataflow",
-    "gold_pipeline_name_prefix": "pl-airline-gold-dataflow",
-    "dataflow_name_prefix": "df-airline-bronze-silver",
-    "dataflow_source_container": "bronze",
-    "dataflow_source_folder": "airport",
-    "dataflow_airline_source_file": "airline.csv",
-    "dataflow_flight_source_file": "flight.csv",
-    "dataflow_passenger_source_file": "passenger.csv",
-    "dataflow_airport_source_file": "airport.json",
-    "dataflow_bookings_source_file": "fact_bookings.parquet",
-    "dataflow_sink_container": "silver",
-    "dataflow_sink_folder": "airport",
-    "dataflow_airline_sink_file": "airline.parquet",
-    "dataflow_flight_sink_file": "flight.parquet",
-    "dataflow_passenger_sink_file": "passenger.parquet",
-    "dataflow_airport_sink_file": "airport.parquet",
-    "dataflow_bookings_sink_file": "fact_bookings.parquet",
-    "gold_dataflow_name_prefix": "df-airline-gold-sales",
-    "gold_source_container": "silver",
-    "gold_source_folder": "airport",
-    "gold_airline_source_file": "airline.parquet",
-    "gold_bookings_source_file": "fact_bookings.parquet",
-    "gold_sink_container": "gold",
-    "gold_sink_folder": "airport",
-    "gold_sink_name": "airline_sales_top5",
-    "sql_server_name_prefix": "sql-airline",
-    "sql_admin_login": "sqladmin",
-    "sql_database_name": "airline-dev",
-    "sql_database_sku_name": "GP_S_Gen5_1",
-    "sql_max_size_gb": 1,
-    "sql_min_capacity": 0.5,
-    "sql_auto_pause_delay_in_minutes": 60,
-    "sql_public_network_access_enabled": True,
-    "sql_zone_redundant": False,
-}
+from deploy_envs import run_environments, strip_env_args
+from deploy_session import forward_to_session
+from json_stream import read_json_member
+from progress import LOG_DIR_NAME, finish_stack, get_active_board, start_stack, track_progress
+from retries import reset_retry_budget, run_with_retries
+from stacks import (
+    DEFAULTS,
+    STACKS,
+    STORAGE_SETTINGS_FILE_NAME,
+    add_only_arguments,
+    apply_default_overrides,
+    apply_storage_settings,
+    build_stack_tfvars,
+    check_registry,
+    format_output_value,
+    get_az_exe,
+    get_consumed_outputs,
+    get_data_dir,
+    get_env_name,
+    get_extra_files,
+    get_only_stack,
+    get_output_from_state,
+    get_sql_admin_login,
+    get_stack_dir,
+    get_tfstate_path,
+    get_tfvars_path,
+    get_upstream_stacks,
+    get_var_file_args,
+    get_workspace,
+    load_env_file,
+    read_tfvars_value,
+    run_capture_optional,
+    write_tfvars,
+)
 
 SQLCMD_FALLBACK_PATHS = [
     r"C:\Program Files\Microsoft SQL Server\Client SDK\ODBC\180\Tools\Binn\sqlcmd.exe",
@@ -95,76 +56,103 @@ SQLCMD_FALLBACK_PATHS = [
     r"C:\Program Files (x86)\Microsoft SQL Server\Client SDK\ODBC\170\Tools\Binn\sqlcmd.exe",
 ]
 
-
-def run(cmd):
-    print("\n$ " + " ".join(cmd))
-    subprocess.check_call(cmd)
-
-
-def run_capture(cmd):
-    print("\n$ " + " ".join(cmd))
-    return subprocess.check_output(cmd, text=True).strip()
-
-
-def run_capture_optional(cmd):
-    try:
-        return run_capture(cmd)
-    except subprocess.CalledProcessError:
-        return None
+CACHE_FILE_NAME = ".deploy_cache.json"
+CACHE_TTL_SECONDS = int(os.environ.get("DEPLOY_CACHE_TTL_SECONDS", "900"))
+CACHE = {"path": None, "memory": {}, "disk": {}}
+CACHE_LOCK = threading.Lock()
+JOURNAL_FILE_NAME = ".deploy_journal.json"
 
 
-def get_az_exe():
-    return "az.cmd" if os.name == "nt" else "az"
+def run(cmd):
+    run_with_retries(cmd, get_active_board())
 
 
-def resolve_signed_in_user():
-    az_exe = get_az_exe()
-    user_login = run_capture_optional([
-        az_exe,
+def resolve_user_login():
+    return cached("user_login", lambda: run_capture_optional([
+        get_az_exe(),
         "account", "show",
         "--query", "user.name",
         "-o", "tsv",
-    ])
-    user_object_id = run_capture_optional([
-        az_exe,
+    ]) or None)
+
+
+def resolve_user_object_id():
+    return cached("user_object_id", lambda: run_capture_optional([
+        get_az_exe(),
         "ad", "signed-in-user", "show",
         "--query", "id",
         "-o", "tsv",
-    ])
-    return user_login or None, user_object_id or None
+    ]) or None)
 
 
-def hcl_value(value):
-    if value is None:
-        return "null"
-    if isinstance(value, bool):
-        return "true" if value else "false"
-    if isinstance(value, (int, float)):
-        return str(value)
-    if isinstance(value, (list, tuple)):
-        rendered = ", ".join(hcl_value(item) for item in value)
-        return f"[{rendered}]"
-    escaped = str(value).replace("\"", "\\\"")
-    return f"\"{escaped}\""
+def resolve_signed_in_user():
+    return resolve_user_login(), resolve_user_object_id()
 
 
-def write_tfvars(path, items):
-    lines = [f"{key} = {hcl_value(value)}" for key, value in items]
-    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+def get_cache_path(repo_root):
+    env_name = get_env_name()
+    return repo_root / (f".deploy_cache.{env_name}.json" if env_name else CACHE_FILE_NAME)
 
 
-def load_env_file(path):
+def load_cache(path, enabled=True):
+    CACHE["path"] = path
+    if not enabled:
+        CACHE["memory"].clear()
+        CACHE["disk"].clear()
+        return
     if not path.exists():
         return
-    for line in path.read_text(encoding="utf-8").splitlines():
-        stripped = line.strip()
-        if not stripped or stripped.startswith("#") or "=" not in stripped:
-            continue
-        key, value = stripped.split("=", 1)
-        key = key.strip()
-        value = value.strip()
-        if key and key not in os.environ:
-            os.environ[key] = value
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    now = time.time()
+    CACHE["disk"] = {key: entry for key, entry in entries.items() if entry.get("expires", 0) > now}
+
+
+def write_private_json(path, data):
+    payload = json.dumps(data, indent=2) + "\n"
+    tmp_path = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        handle.write(payload)
+    os.replace(tmp_path, path)
+
+
+def save_cache():
+    path = CACHE["path"]
+    if path is None:
+        return
+    with CACHE_LOCK:
+        disk = dict(CACHE["disk"])
+    write_private_json(path, disk)
+
+
+def store_cached(key, value, fingerprint=None, persist=True):
+    entry = {"value": value, "fingerprint": fingerprint, "expires": time.time() + CACHE_TTL_SECONDS}
+    with CACHE_LOCK:
+        CACHE["memory"][key] = entry
+        if persist and value is not None:
+            CACHE["disk"][key] = entry
+    return value
+
+
+def lookup_cached(key, fingerprint=None):
+    with CACHE_LOCK:
+        for entries in (CACHE["memory"], CACHE["disk"]):
+            entry = entries.get(key)
+            if entry is not None and entry.get("fingerprint") == fingerprint and entry["expires"] > time.time():
+                return True, entry["value"]
+    return False, None
+
+
+def cached(key, compute, fingerprint=None, persist=True):
+    # Memoized for the run and, when persist is set, across runs until the TTL expires.
+    # Fingerprinted entries (terraform outputs) are only reused while the state file is unchanged.
+    found, value = lookup_cached(key, fingerprint)
+    if found:
+        return value
+    return store_cached(key, compute(), fingerprint, persist)
 
 
 def run_sensitive(cmd, redacted_indices):
@@ -176,25 +164,6 @@ def run_sensitive(cmd, redacted_indices):
     subprocess.check_call(cmd)
 
 
-def read_tfvars_value(path, key):
-    if not path.exists():
-        return None
-    for line in path.read_text(encoding="utf-8").splitlines():
-        stripped = line.strip()
-        if not stripped or stripped.startswith("#") or "=" not in stripped:
-            continue
-        name, value = stripped.split("=", 1)
-        if name.strip() != key:
-            continue
-        value = value.strip()
-        if value == "null":
-            return None
-        if value.startswith("\"") and value.endswith("\""):
-            return value[1:-1].replace("\\\"", "\"")
-        return value
-    return None
-
-
 def generate_password(length=20):
     symbols = "!@#$%^&*_-+=?"
     alphabet = string.ascii_letters + string.digits + symbols
@@ -209,7 +178,7 @@ def generate_password(length=20):
             return password
 
 
-def detect_public_ip():
+def fetch_public_ip():
     try:
         with urllib.request.urlopen("https://api.ipify.org", timeout=10) as response:
             value = response.read().decode("utf-8").strip()
@@ -218,6 +187,10 @@ def detect_public_ip():
         return None
 
 
+def detect_public_ip():
+    return cached("public_ip", fetch_public_ip)
+
+
 def get_azuread_admin_login():
     env_value = os.environ.get("AZUREAD_ADMIN_LOGIN")
     if env_value:
@@ -240,7 +213,7 @@ def get_sql_admin_password(sql_dir, allow_generate=True):
     env_password = os.environ.get("SQL_ADMIN_PASSWORD")
     if env_password:
         return env_password, False
-    existing = read_tfvars_value(sql_dir / "terraform.tfvars", "sql_admin_password")
+    existing = read_tfvars_value(get_tfvars_path(sql_dir), "sql_admin_password")
     if existing:
         return existing, False
     if allow_generate:
@@ -248,27 +221,18 @@ def get_sql_admin_password(sql_dir, allow_generate=True):
     raise RuntimeError("SQL admin password not found. Set SQL_ADMIN_PASSWORD or deploy SQL first.")
 
 
-def get_sql_admin_login(sql_dir):
-    env_login = os.environ.get("SQL_ADMIN_LOGIN")
-    if env_login:
-        return env_login
-    existing = read_tfvars_value(sql_dir / "terraform.tfvars", "sql_admin_login")
-    if existing:
-        return existing
-    return DEFAULTS["sql_admin_login"]
-
-
 def get_sql_client_ip(sql_dir, allow_detect=True):
     env_ip = os.environ.get("SQL_CLIENT_IP")
     if env_ip:
         return env_ip, False
-    existing = read_tfvars_value(sql_dir / "terraform.tfvars", "client_ip_address")
+    existing = read_tfvars_value(get_tfvars_path(sql_dir), "client_ip_address")
     if existing:
         return existing, False
-    if allow_detect:
-        detected = detect_public_ip()
-        if detected:
-            return detected, True
+    if not allow_detect:
+        return None, False
+    detected = detect_public_ip()
+    if detected:
+        return detected, True
     raise RuntimeError("Could not detect public IP. Set SQL_CLIENT_IP before deploying SQL.")
 
 
@@ -315,678 +279,441 @@ def get_output(tf_dir, output_name):
     return value
 
 
-def get_output_optional(tf_dir, output_name):
+def fetch_output(tf_dir, output_name):
     output = run_capture_optional(["terraform", f"-chdir={tf_dir}", "output", "-raw", output_name])
     if output:
         return output
     return get_output_from_state(tf_dir, output_name)
 
 
-def get_tfstate_path(tf_dir):
-    workspace = run_capture_optional(["terraform", f"-chdir={tf_dir}", "workspace", "show"])
-    if workspace and workspace != "default":
-        workspace_state = tf_dir / "terraform.tfstate.d" / workspace / "terraform.tfstate"
-        if workspace_state.exists():
-            return workspace_state
-    default_state = tf_dir / "terraform.tfstate"
-    if default_state.exists():
-        return default_state
-    return None
+def get_output_optional(tf_dir, output_name):
+    fingerprint = get_state_fingerprint(tf_dir)
+    if fingerprint is None:
+        return fetch_output(tf_dir, output_name)
+    key = f"output:{tf_dir.name}:{output_name}"
+    return cached(key, lambda: fetch_output(tf_dir, output_name), fingerprint, persist=False)
 
 
-def get_output_from_state(tf_dir, output_name):
-    state_path = get_tfstate_path(tf_dir)
-    if not state_path or not state_path.exists():
-        return None
+def prefetch_outputs(tf_dir):
+    fingerprint = get_state_fingerprint(tf_dir)
+    if fingerprint is None:
+        return
+    found, _ = lookup_cached(f"outputs:{tf_dir.name}", fingerprint)
+    if found:
+        return
+    raw = run_capture_optional(["terraform", f"-chdir={tf_dir}", "output", "-json"])
     try:
-        state = json.loads(state_path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        return None
-    outputs = state.get("outputs", {})
-    if output_name not in outputs:
-        return None
-    value = outputs[output_name].get("value")
-    if value is None or value == "null":
+        outputs = json.loads(raw) if raw else read_json_member(get_tfstate_path(tf_dir), "outputs") or {}
+    except ValueError:
+        return
+    for name, output in outputs.items():
+        # Sensitive outputs (keys, passwords) stay in memory and are never written to the cache file.
+        value = format_output_value(output.get("value"))
+        store_cached(f"output:{tf_dir.name}:{name}", value, fingerprint, persist=not output.get("sensitive"))
+    store_cached(f"outputs:{tf_dir.name}", sorted(outputs), fingerprint)
+
+
+def prefetch(upstream_dirs, need_identity=False, need_public_ip=False):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {}
+        if need_identity:
+            futures["user login"] = executor.submit(resolve_user_login)
+            futures["user object id"] = executor.submit(resolve_user_object_id)
+        if need_public_ip:
+            futures["public IP"] = executor.submit(detect_public_ip)
+        for tf_dir in upstream_dirs:
+            futures[f"{tf_dir.name} outputs"] = executor.submit(prefetch_outputs, tf_dir)
+        for future in futures.values():
+            future.result()
+    save_cache()
+    if futures:
+        print(f"Prefetched {', '.join(futures)} in {time.perf_counter() - started:.1f}s")
+
+
+def get_state_fingerprint(tf_dir):
+    state_path = get_tfstate_path(tf_dir)
+    if state_path is None:
         return None
-    if isinstance(value, (dict, list)):
-        return json.dumps(value)
-    return str(value)
+    stat = state_path.stat()
+    return [str(state_path), stat.st_mtime_ns, stat.st_size]
 
 
-def write_rg_tfvars(rg_dir):
-    items = [
-        ("resource_group_name", None),
-        ("resource_group_name_prefix", DEFAULTS["resource_group_name_prefix"]),
-        ("location", DEFAULTS["location"]),
-    ]
-    write_tfvars(rg_dir / "terraform.tfvars", items)
-
-
-def write_storage_tfvars(storage_dir, rg_name):
-    storage_blob_contributor_object_id = os.environ.get("STORAGE_BLOB_CONTRIBUTOR_OBJECT_ID")
-    if not storage_blob_contributor_object_id:
-        _, user_object_id = resolve_signed_in_user()
-        storage_blob_contributor_object_id = user_object_id
-    items = [
-        ("resource_group_name", rg_name),
-        ("location", DEFAULTS["location"]),
-        ("storage_account_name_prefix", DEFAULTS["storage_account_name_prefix"]),
-        ("account_replication_type", DEFAULTS["account_replication_type"]),
-        ("account_tier", DEFAULTS["account_tier"]),
-        ("public_network_access_enabled", DEFAULTS["public_network_access_enabled"]),
-        ("is_hns_enabled", DEFAULTS["is_hns_enabled"]),
-    ]
-    if storage_blob_contributor_object_id:
-        items.append(("storage_blob_contributor_object_id", storage_blob_contributor_object_id))
-    write_tfvars(storage_dir / "terraform.tfvars", items)
+def get_storage_blob_contributor_object_id():
+    env_value = os.environ.get("STORAGE_BLOB_CONTRIBUTOR_OBJECT_ID")
+    if env_value:
+        return env_value
+    _, user_object_id = resolve_signed_in_user()
+    return user_object_id
 
 
-def write_data_factory_tfvars(data_factory_dir, rg_name):
-    items = [
-        ("resource_group_name", rg_name),
-        ("location", DEFAULTS["location"]),
-        ("data_factory_name_prefix", DEFAULTS["data_factory_name_prefix"]),
-    ]
-    write_tfvars(data_factory_dir / "terraform.tfvars", items)
+def resolve_new_sql_admin_password(sql_dir):
+    admin_password, generated_password = get_sql_admin_password(sql_dir, allow_generate=True)
+    if generated_password:
+        print(f"Generated SQL admin password and stored it in {get_tfvars_path(sql_dir)}")
+    return admin_password
 
 
-def write_sql_tfvars(sql_dir, rg_name):
-    admin_login = os.environ.get("SQL_ADMIN_LOGIN", DEFAULTS["sql_admin_login"])
-    admin_password, generated_password = get_sql_admin_password(sql_dir, allow_generate=True)
-    azuread_admin_login = get_azuread_admin_login()
-    azuread_admin_object_id = get_azuread_admin_object_id()
+def resolve_new_sql_client_ip(sql_dir):
     client_ip_address, detected_ip = get_sql_client_ip(sql_dir, allow_detect=True)
-    items = [
-        ("resource_group_name", rg_name),
-        ("location", DEFAULTS["location"]),
-        ("sql_server_name_prefix", DEFAULTS["sql_server_name_prefix"]),
-        ("sql_admin_login", admin_login),
-        ("sql_admin_password", admin_password),
-        ("azuread_admin_login", azuread_admin_login),
-        ("azuread_admin_object_id", azuread_admin_object_id),
-        ("client_ip_address", client_ip_address),
-        ("database_name", DEFAULTS["sql_database_name"]),
-        ("database_sku_name", DEFAULTS["sql_database_sku_name"]),
-        ("max_size_gb", DEFAULTS["sql_max_size_gb"]),
-        ("min_capacity", DEFAULTS["sql_min_capacity"]),
-        ("auto_pause_delay_in_minutes", DEFAULTS["sql_auto_pause_delay_in_minutes"]),
-        ("public_network_access_enabled", DEFAULTS["sql_public_network_access_enabled"]),
-        ("zone_redundant", DEFAULTS["sql_zone_redundant"]),
-    ]
-    write_tfvars(sql_dir / "terraform.tfvars", items)
-    if generated_password:
-        print("Generated SQL admin password and stored it in terraform/07_sql_database/terraform.tfvars")
     if detected_ip:
-        print(f"Detected public IP {client_ip_address} and stored it in terraform/07_sql_database/terraform.tfvars")
-    return admin_login, admin_password
-
-
-def write_adf_linked_services_tfvars(
-    linked_services_dir,
-    data_factory_id,
-    storage_dfs_endpoint,
-    storage_account_key,
-    sql_server_fqdn,
-    sql_database_name,
-    sql_username,
-    sql_password,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("http_linked_service_name_prefix", DEFAULTS["http_linked_service_name_prefix"]),
-        ("http_base_url", DEFAULTS["http_base_url"]),
-        ("http_authentication_type", DEFAULTS["http_authentication_type"]),
-        ("http_enable_certificate_validation", DEFAULTS["http_enable_certificate_validation"]),
-        ("adls_linked_service_name_prefix", DEFAULTS["adls_linked_service_name_prefix"]),
-        ("storage_dfs_endpoint", storage_dfs_endpoint),
-        ("storage_account_key", storage_account_key),
-        ("sql_linked_service_name_prefix", DEFAULTS["sql_linked_service_name_prefix"]),
-        ("sql_server_fqdn", sql_server_fqdn),
-        ("sql_database_name", sql_database_name),
-        ("sql_username", sql_username),
-        ("sql_password", sql_password),
-        ("description", DEFAULTS["linked_services_description"]),
-    ]
-    write_tfvars(linked_services_dir / "terraform.tfvars", items)
-
-
-def write_adf_pipeline_tfvars(
-    pipeline_dir,
-    data_factory_id,
-    http_linked_service_name,
-    adls_linked_service_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("http_linked_service_name", http_linked_service_name),
-        ("adls_linked_service_name", adls_linked_service_name),
-        ("pipeline_name_prefix", DEFAULTS["pipeline_name_prefix"]),
-        ("http_dataset_name_prefix", DEFAULTS["http_dataset_name_prefix"]),
-        ("sink_dataset_name_prefix", DEFAULTS["sink_dataset_name_prefix"]),
-        ("sink_file_system", DEFAULTS["sink_file_system"]),
-    ]
-    write_tfvars(pipeline_dir / "terraform.tfvars", items)
-
-
-def write_adf_airport_pipeline_tfvars(
-    pipeline_dir,
-    data_factory_id,
-    http_linked_service_name,
-    adls_linked_service_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("http_linked_service_name", http_linked_service_name),
-        ("adls_linked_service_name", adls_linked_service_name),
-        ("pipeline_name_prefix", DEFAULTS["airport_pipeline_name_prefix"]),
-        ("http_dataset_name_prefix", DEFAULTS["http_airport_dataset_name_prefix"]),
-        ("sink_dataset_name_prefix", DEFAULTS["sink_airport_dataset_name_prefix"]),
-        ("sink_file_system", DEFAULTS["sink_file_system"]),
-        ("sink_folder", DEFAULTS["airport_sink_folder"]),
-        ("sink_file", DEFAULTS["airport_sink_file"]),
-        ("airport_url", DEFAULTS["airport_url"]),
-        ("airport_rel_url", DEFAULTS["airport_rel_url"]),
-    ]
-    write_tfvars(pipeline_dir / "terraform.tfvars", items)
-
-
-def write_adf_bookings_pipeline_tfvars(
-    pipeline_dir,
-    data_factory_id,
-    sql_linked_service_name,
-    adls_linked_service_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("sql_linked_service_name", sql_linked_service_name),
-        ("adls_linked_service_name", adls_linked_service_name),
-        ("pipeline_name_prefix", DEFAULTS["bookings_pipeline_name_prefix"]),
-        ("sql_dataset_name_prefix", DEFAULTS["bookings_sql_dataset_name_prefix"]),
-        ("json_dataset_name_prefix", DEFAULTS["bookings_json_dataset_name_prefix"]),
-        ("parquet_dataset_name_prefix", DEFAULTS["bookings_parquet_dataset_name_prefix"]),
-        ("monitor_container", DEFAULTS["monitor_container"]),
-        ("monitor_empty_folder", DEFAULTS["monitor_empty_folder"]),
-        ("monitor_empty_file", DEFAULTS["monitor_empty_file"]),
-        ("monitor_lastload_folder", DEFAULTS["monitor_lastload_folder"]),
-        ("monitor_lastload_file", DEFAULTS["monitor_lastload_file"]),
-        ("sink_container", DEFAULTS["bookings_sink_container"]),
-        ("sink_folder", DEFAULTS["bookings_sink_folder"]),
-        ("sink_file", DEFAULTS["bookings_sink_file"]),
-        ("sql_schema", DEFAULTS["bookings_sql_schema"]),
-        ("sql_table", DEFAULTS["bookings_sql_table"]),
-    ]
-    write_tfvars(pipeline_dir / "terraform.tfvars", items)
-
-
-def write_adf_master_pipeline_tfvars(
-    pipeline_dir,
-    data_factory_id,
-    http_pipeline_name,
-    airport_pipeline_name,
-    bookings_pipeline_name,
-    silver_pipeline_name,
-    gold_pipeline_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("http_pipeline_name", http_pipeline_name),
-        ("airport_pipeline_name", airport_pipeline_name),
-        ("bookings_pipeline_name", bookings_pipeline_name),
-        ("silver_pipeline_name", silver_pipeline_name),
-        ("gold_pipeline_name", gold_pipeline_name),
-        ("pipeline_name_prefix", DEFAULTS["master_pipeline_name_prefix"]),
-        ("airport_url", DEFAULTS["airport_url"]),
-        ("airport_rel_url", DEFAULTS["airport_rel_url"]),
-    ]
-    write_tfvars(pipeline_dir / "terraform.tfvars", items)
-
-
-def write_adf_dataflow_tfvars(
-    dataflow_dir,
-    data_factory_id,
-    adls_linked_service_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("adls_linked_service_name", adls_linked_service_name),
-        ("dataflow_name_prefix", DEFAULTS["dataflow_name_prefix"]),
-        ("source_container", DEFAULTS["dataflow_source_container"]),
-        ("source_folder", DEFAULTS["dataflow_source_folder"]),
-        ("airline_source_file", DEFAULTS["dataflow_airline_source_file"]),
-        ("flight_source_file", DEFAULTS["dataflow_flight_source_file"]),
-        ("passenger_source_file", DEFAULTS["dataflow_passenger_source_file"]),
-        ("airport_source_file", DEFAULTS["dataflow_airport_source_file"]),
-        ("bookings_source_file", DEFAULTS["dataflow_bookings_source_file"]),
-        ("sink_container", DEFAULTS["dataflow_sink_container"]),
-        ("sink_folder", DEFAULTS["dataflow_sink_folder"]),
-        ("airline_sink_file", DEFAULTS["dataflow_airline_sink_file"]),
-        ("flight_sink_file", DEFAULTS["dataflow_flight_sink_file"]),
-        ("passenger_sink_file", DEFAULTS["dataflow_passenger_sink_file"]),
-        ("airport_sink_file", DEFAULTS["dataflow_airport_sink_file"]),
-        ("bookings_sink_file", DEFAULTS["dataflow_bookings_sink_file"]),
-    ]
-    write_tfvars(dataflow_dir / "terraform.tfvars", items)
-
-
-def write_adf_gold_dataflow_tfvars(
-    dataflow_dir,
-    data_factory_id,
-    adls_linked_service_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("adls_linked_service_name", adls_linked_service_name),
-        ("dataflow_name_prefix", DEFAULTS["gold_dataflow_name_prefix"]),
-        ("source_container", DEFAULTS["gold_source_container"]),
-        ("source_folder", DEFAULTS["gold_source_folder"]),
-        ("airline_source_file", DEFAULTS["gold_airline_source_file"]),
-        ("bookings_source_file", DEFAULTS["gold_bookings_source_file"]),
-        ("sink_container", DEFAULTS["gold_sink_container"]),
-        ("sink_folder", DEFAULTS["gold_sink_folder"]),
-        ("sink_name", DEFAULTS["gold_sink_name"]),
-    ]
-    write_tfvars(dataflow_dir / "terraform.tfvars", items)
-
-
-def write_adf_silver_pipeline_tfvars(
-    pipeline_dir,
-    data_factory_id,
-    dataflow_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("dataflow_name", dataflow_name),
-        ("pipeline_name_prefix", DEFAULTS["silver_pipeline_name_prefix"]),
-    ]
-    write_tfvars(pipeline_dir / "terraform.tfvars", items)
-
-
-def write_adf_gold_pipeline_tfvars(
-    pipeline_dir,
-    data_factory_id,
-    dataflow_name,
-):
-    items = [
-        ("data_factory_id", data_factory_id),
-        ("dataflow_name", dataflow_name),
-        ("pipeline_name_prefix", DEFAULTS["gold_pipeline_name_prefix"]),
-    ]
-    write_tfvars(pipeline_dir / "terraform.tfvars", items)
+        print(f"Detected public IP {client_ip_address} and stored it in {get_tfvars_path(sql_dir)}")
+    return client_ip_address
+
+
+def get_deploy_resolvers(repo_root):
+    sql_dir = get_stack_dir(repo_root, "07_sql_database")
+    return {
+        "storage_blob_contributor_object_id": get_storage_blob_contributor_object_id,
+        "sql_admin_login": lambda: os.environ.get("SQL_ADMIN_LOGIN", DEFAULTS["sql_admin_login"]),
+        "sql_admin_password": lambda: resolve_new_sql_admin_password(sql_dir),
+        "azuread_admin_login": get_azuread_admin_login,
+        "azuread_admin_object_id": get_azuread_admin_object_id,
+        "client_ip_address": lambda: resolve_new_sql_client_ip(sql_dir),
+        "sql_username": lambda: get_sql_admin_login(sql_dir),
+        "sql_password": lambda: get_sql_admin_password(sql_dir, allow_generate=False)[0],
+    }
+
+
+def get_stack_tfvars(repo_root, name, resolvers, journal=None):
+    checkpointed = journal["stacks"] if journal else {}
+    for upstream, output_names in get_consumed_outputs(name).items():
+        served = checkpointed.get(upstream, {}).get("outputs", {})
+        if not all(output_name in served for output_name in output_names):
+            init_stack(get_stack_dir(repo_root, upstream))
+
+    def read_output(upstream, output_name):
+        served = checkpointed.get(upstream, {}).get("outputs", {})
+        if output_name in served:
+            return served[output_name]
+        return get_output_optional(get_stack_dir(repo_root, upstream), output_name)
+
+    return build_stack_tfvars(name, read_output, resolvers)
+
+
+def write_stack_tfvars(repo_root, name, resolvers):
+    items = get_stack_tfvars(repo_root, name, resolvers)
+    write_tfvars(get_tfvars_path(get_stack_dir(repo_root, name)), items)
+    return items
+
+
+def get_init_fingerprint(tf_dir):
+    data_dir = get_data_dir(tf_dir)
+    if not data_dir.exists():
+        return None
+    tracked = [data_dir, tf_dir / ".terraform.lock.hcl", *sorted(tf_dir.glob("*.tf"))]
+    return [str(data_dir)] + [path.stat().st_mtime_ns for path in tracked if path.exists()]
+
+
+def init_stack(tf_dir):
+    # Within one process (notably a deploy session) a dir is only re-initialised after its
+    # configuration, lock file or data dir changes.
+    key = f"init:{tf_dir}"
+    fingerprint = get_init_fingerprint(tf_dir)
+    if fingerprint is not None and lookup_cached(key, fingerprint)[0]:
+        return
+    workspace = get_workspace(tf_dir)
+    if workspace != "default":
+        # A local-backend workspace is just this directory; creating it lets TF_WORKSPACE select it.
+        (tf_dir / "terraform.tfstate.d" / workspace).mkdir(parents=True, exist_ok=True)
+    run(["terraform", f"-chdir={tf_dir}", "init", "-input=false"])
+    store_cached(key, True, get_init_fingerprint(tf_dir), persist=False)
 
 
 def deploy_stack(tf_dir):
     if not tf_dir.exists():
         raise FileNotFoundError(f"Missing Terraform dir: {tf_dir}")
-    run(["terraform", f"-chdir={tf_dir}", "init"])
-    run(["terraform", f"-chdir={tf_dir}", "apply", "-auto-approve"])
+    init_stack(tf_dir)
+    run(["terraform", f"-chdir={tf_dir}", "apply", *get_var_file_args(tf_dir), "-auto-approve"])
 
 
 def deploy_pipeline_stack(pipeline_dir):
     if not pipeline_dir.exists():
         raise FileNotFoundError(f"Missing Terraform dir: {pipeline_dir}")
-    run(["terraform", f"-chdir={pipeline_dir}", "init"])
-    run(["terraform", f"-chdir={pipeline_dir}", "apply", "-target=azapi_resource.pipeline", "-auto-approve"])
-    run(["terraform", f"-chdir={pipeline_dir}", "apply", "-auto-approve"])
+    init_stack(pipeline_dir)
+    var_file_args = get_var_file_args(pipeline_dir)
+    run(["terraform", f"-chdir={pipeline_dir}", "apply", *var_file_args, "-target=azapi_resource.pipeline", "-auto-approve"])
+    run(["terraform", f"-chdir={pipeline_dir}", "apply", *var_file_args, "-auto-approve"])
 
 
 def deploy_dataflow_stack(dataflow_dir):
     if not dataflow_dir.exists():
         raise FileNotFoundError(f"Missing Terraform dir: {dataflow_dir}")
-    run(["terraform", f"-chdir={dataflow_dir}", "init"])
-    run(["terraform", f"-chdir={dataflow_dir}", "apply", "-target=azapi_resource.dataflow", "-auto-approve"])
-    run(["terraform", f"-chdir={dataflow_dir}", "apply", "-auto-approve"])
+    init_stack(dataflow_dir)
+    var_file_args = get_var_file_args(dataflow_dir)
+    run(["terraform", f"-chdir={dataflow_dir}", "apply", *var_file_args, "-target=azapi_resource.dataflow", "-auto-approve"])
+    run(["terraform", f"-chdir={dataflow_dir}", "apply", *var_file_args, "-auto-approve"])
 
 
-if __name__ == "__main__":
+DEPLOYERS = {
+    "stack": deploy_stack,
+    "pipeline": deploy_pipeline_stack,
+    "dataflow": deploy_dataflow_stack,
+}
+
+
+def apply_registered_stack(repo_root, name, run_sql_init=False):
+    tf_dir = get_stack_dir(repo_root, name)
+    DEPLOYERS[STACKS[name]["kind"]](tf_dir)
+    if name == "07_sql_database" and run_sql_init:
+        script_path = repo_root / "sql_scripts" / "fact_bookings_full.sql"
+        admin_password, _ = get_sql_admin_password(tf_dir, allow_generate=False)
+        run_sql_script(tf_dir, get_sql_admin_login(tf_dir), admin_password, script_path)
+
+
+def deploy_registered_stack(repo_root, name, resolvers, run_sql_init=False):
+    items = write_stack_tfvars(repo_root, name, resolvers)
+    apply_registered_stack(repo_root, name, run_sql_init)
+    return items
+
+
+def get_journal_path(repo_root):
+    env_name = get_env_name()
+    return repo_root / (f".deploy_journal.{env_name}.json" if env_name else JOURNAL_FILE_NAME)
+
+
+def load_journal(path):
+    try:
+        journal = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"stacks": {}}
+    return journal if isinstance(journal.get("stacks"), dict) else {"stacks": {}}
+
+
+def get_stack_fingerprint(repo_root, name, items):
+    # Everything an apply depends on: the resolved tfvars (hashed, they hold secrets),
+    # the stack's Terraform sources and the files it uploads.
+    tf_dir = get_stack_dir(repo_root, name)
+    digest = hashlib.sha256(json.dumps([name, get_workspace(tf_dir), items], default=str).encode("utf-8"))
+    extra_files = [repo_root / relative for relative, stack in get_extra_files().items() if stack == name]
+    for path in [*sorted(tf_dir.glob("*.tf")), *extra_files]:
+        digest.update(path.relative_to(repo_root).as_posix().encode("utf-8"))
+        digest.update(path.read_bytes() if path.exists() else b"")
+    return digest.hexdigest()
+
+
+def read_checkpoint_outputs(tf_dir):
+    state_path = get_tfstate_path(tf_dir)
+    if state_path is None:
+        return {}
+    try:
+        outputs = read_json_member(state_path, "outputs") or {}
+    except ValueError:
+        return {}
+    # Sensitive outputs are left out and read from the state again when a later stack needs them.
+    return {
+        name: format_output_value(output.get("value"))
+        for name, output in outputs.items()
+        if not output.get("sensitive")
+    }
+
+
+def record_checkpoint(repo_root, journal, journal_path, name, items, sql_init=False):
+    journal["stacks"][name] = {
+        "fingerprint": get_stack_fingerprint(repo_root, name, items),
+        "outputs": read_checkpoint_outputs(get_stack_dir(repo_root, name)),
+        "sql_init": sql_init,
+        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    write_private_json(journal_path, journal)
+
+
+def deploy_from_checkpoint(repo_root, targets, resolvers, run_sql_init, journal_path, restart=False):
+    journal = {"stacks": {}} if restart else load_journal(journal_path)
+    # Only the leading stacks that completed with unchanged inputs are skipped; once one stack
+    # is applied, everything after it is applied too, as in a fresh deploy.
+    resuming = bool(journal["stacks"])
+    for name in targets:
+        start_stack(name)
+        items = get_stack_tfvars(repo_root, name, resolvers, journal)
+        entry = journal["stacks"].get(name)
+        needs_sql_init = name == "07_sql_database" and run_sql_init
+        if (
+            resuming
+            and entry
+            and entry["fingerprint"] == get_stack_fingerprint(repo_root, name, items)
+            and (entry["sql_init"] or not needs_sql_init)
+        ):
+            print(f"Skipping {name}: completed by the interrupted deploy ({entry['completed_at']})")
+            finish_stack(name, "skipped")
+            continue
+        if resuming:
+            print(f"Resuming deploy at {name} (journal: {journal_path.name})")
+        resuming = False
+        write_tfvars(get_tfvars_path(get_stack_dir(repo_root, name)), items)
+        apply_registered_stack(repo_root, name, run_sql_init)
+        record_checkpoint(repo_root, journal, journal_path, name, items, sql_init=needs_sql_init)
+        finish_stack(name)
+    journal_path.unlink(missing_ok=True)
+
+
+def snapshot_watched_files(repo_root):
+    # Only stack sources: tfvars, .terraform/ and state files are written by deploys themselves.
+    paths = list((repo_root / "terraform").glob("*/*.tf"))
+    paths += [repo_root / relative for relative in get_extra_files()]
+    snapshot = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def get_changed_stacks(repo_root, paths):
+    extra_files = get_extra_files()
+    stacks = set()
+    for path in paths:
+        relative = path.relative_to(repo_root).as_posix()
+        if relative in extra_files:
+            stacks.add(extra_files[relative])
+        elif relative.startswith("terraform/") and relative.split("/")[1] in STACKS:
+            stacks.add(relative.split("/")[1])
+    return stacks
+
+
+def read_state_outputs(tf_dir):
+    state_path = get_tfstate_path(tf_dir)
+    if state_path is None:
+        return {}
+    outputs = read_json_member(state_path, "outputs") or {}
+    return {name: output.get("value") for name, output in outputs.items()}
+
+
+def apply_only_stack(stack):
+    try:
+        main([STACKS[stack]["flag"]])
+    except SystemExit as exc:
+        return exc.code in (0, None)
+    except (RuntimeError, OSError, ValueError) as exc:
+        print(f"Error: {exc}")
+        return False
+    return True
+
+
+def apply_changed_stacks(repo_root, stacks):
+    # Dependents are only reapplied when an output they consume actually changed.
+    pending = set(stacks)
+    for stack in STACKS:
+        if stack not in pending:
+            continue
+        tf_dir = get_stack_dir(repo_root, stack)
+        before = read_state_outputs(tf_dir)
+        print(f"\n== Applying {stack} ==")
+        if not apply_only_stack(stack):
+            print(f"{stack} failed; its dependents were not reapplied.")
+            continue
+        after = read_state_outputs(tf_dir)
+        changed = {name for name in set(before) | set(after) if before.get(name) != after.get(name)}
+        for dependent in STACKS:
+            consumed_changes = changed.intersection(get_consumed_outputs(dependent).get(stack, []))
+            if consumed_changes and dependent not in pending:
+                print(f"{stack} changed {', '.join(sorted(consumed_changes))}; {dependent} will be reapplied.")
+                pending.add(dependent)
+
+
+def watch_stacks(repo_root, interval, debounce):
+    print(f"Watching terraform/*/*.tf and {', '.join(get_extra_files())} (Ctrl+C to stop)")
+    baseline = snapshot_watched_files(repo_root)
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot_watched_files(repo_root)
+            if current == baseline:
+                continue
+            # Coalesce a burst of saves: wait until the tree has been quiet for the debounce window.
+            quiet_since = time.monotonic()
+            while time.monotonic() - quiet_since < debounce:
+                time.sleep(interval)
+                latest = snapshot_watched_files(repo_root)
+                if latest != current:
+                    current = latest
+                    quiet_since = time.monotonic()
+            changed = {path for path in set(baseline) | set(current) if baseline.get(path) != current.get(path)}
+            baseline = current
+            stacks = get_changed_stacks(repo_root, changed)
+            for path in sorted(changed):
+                print(f"Changed: {path.relative_to(repo_root).as_posix()}")
+            if stacks:
+                apply_changed_stacks(repo_root, stacks)
+                print("\nWaiting for changes...")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+def main(argv=None):
     try:
         parser = argparse.ArgumentParser(description="Deploy Terraform stacks for the Airline project.")
         group = parser.add_mutually_exclusive_group()
-        group.add_argument("--rg-only", action="store_true", help="Deploy only the resource group stack")
-        group.add_argument("--storage-only", action="store_true", help="Deploy only the storage account stack")
-        group.add_argument("--sql-only", action="store_true", help="Deploy only the SQL server + database stack")
-        group.add_argument("--datafactory-only", action="store_true", help="Deploy only the data factory stack")
-        group.add_argument("--adf-links-only", action="store_true", help="Deploy only the ADF linked services stack")
-        group.add_argument("--adf-pipeline-only", action="store_true", help="Deploy only the ADF pipeline stack")
-        group.add_argument(
-            "--adf-airport-pipeline-only",
-            action="store_true",
-            help="Deploy only the ADF airport JSON pipeline stack",
-        )
-        group.add_argument(
-            "--adf-bookings-pipeline-only",
-            action="store_true",
-            help="Deploy only the ADF bookings SQL pipeline stack",
-        )
-        group.add_argument(
-            "--adf-master-pipeline-only",
-            action="store_true",
-            help="Deploy only the ADF master pipeline stack",
-        )
-        group.add_argument(
-            "--adf-dataflow-only",
-            action="store_true",
-            help="Deploy only the ADF bronze-to-silver data flow stack",
-        )
-        group.add_argument(
-            "--adf-silver-pipeline-only",
-            action="store_true",
-            help="Deploy only the ADF silver data flow pipeline stack",
-        )
-        group.add_argument(
-            "--adf-gold-pipeline-only",
-            action="store_true",
-            help="Deploy only the ADF gold data flow pipeline stack",
-        )
-        group.add_argument(
-            "--adf-gold-dataflow-only",
-            action="store_true",
-            help="Deploy only the ADF gold data flow stack",
-        )
+        add_only_arguments(group, "Deploy")
         parser.add_argument("--sql-init", action="store_true", help="Run the SQL init script after SQL deploy")
         parser.add_argument("--skip-sql-init", action="store_true", help="Skip SQL init on full deploy")
-        args = parser.parse_args()
-
-        full_deploy = not (
-            args.rg_only
-            or args.storage_only
-            or args.sql_only
-            or args.datafactory_only
-            or args.adf_links_only
-            or args.adf_pipeline_only
-            or args.adf_airport_pipeline_only
-            or args.adf_bookings_pipeline_only
-            or args.adf_master_pipeline_only
-            or args.adf_dataflow_only
-            or args.adf_silver_pipeline_only
-            or args.adf_gold_pipeline_only
-            or args.adf_gold_dataflow_only
+        parser.add_argument("--no-cache", action="store_true", help=f"Ignore cached identity/IP/outputs in {CACHE_FILE_NAME}")
+        parser.add_argument("--restart", action="store_true", help=f"Ignore {JOURNAL_FILE_NAME} and redeploy every stack")
+        group.add_argument("--watch", action="store_true", help="Redeploy stacks whose Terraform files change")
+        parser.add_argument("--watch-interval", type=float, default=0.5, help="Seconds between file polls in --watch")
+        parser.add_argument("--watch-debounce", type=float, default=1.5, help="Quiet seconds before applying in --watch")
+        parser.add_argument("--progress", action="store_true", help=f"Log each stack to {LOG_DIR_NAME}/ and show a live status view")
+        parser.add_argument("--envs", help="Deploy every environment in this YAML/JSON file concurrently")
+        parser.add_argument("--max-parallel", type=int, help="Environments to deploy at once with --envs")
+        parser.add_argument(
+            "--storage-settings",
+            help=f"Apply codec/compaction settings from a storage_bench.py file (e.g. {STORAGE_SETTINGS_FILE_NAME}, relative to the repo root)",
         )
+        args = parser.parse_args(argv)
+        reset_retry_budget()
+        if args.envs and args.watch:
+            parser.error("--envs cannot be combined with --watch")
+
+        check_registry()
+        only_stack = get_only_stack(args)
+        full_deploy = only_stack is None and not args.watch
         run_sql_init = args.sql_init or (full_deploy and not args.skip_sql_init)
 
         repo_root = Path(__file__).resolve().parent.parent
         load_env_file(repo_root / ".env")
-        rg_dir = repo_root / "terraform" / "01_resource_group"
-        storage_dir = repo_root / "terraform" / "02_storage_account"
-        sql_dir = repo_root / "terraform" / "07_sql_database"
-        data_factory_dir = repo_root / "terraform" / "03_data_factory"
-        linked_services_dir = repo_root / "terraform" / "04_adf_linked_services"
-        pipeline_dir = repo_root / "terraform" / "05_adf_pipeline_http"
-        pipeline_airport_dir = repo_root / "terraform" / "06_adf_pipeline_airport_json"
-        pipeline_bookings_dir = repo_root / "terraform" / "08_adf_pipeline_fact_bookings_incremental"
-        pipeline_master_dir = repo_root / "terraform" / "09_adf_pipeline_master"
-        dataflow_dir = repo_root / "terraform" / "10_adf_dataflow_bronze_silver"
-        pipeline_silver_dir = repo_root / "terraform" / "11_adf_pipeline_silver_dataflow"
-        gold_dataflow_dir = repo_root / "terraform" / "12_adf_dataflow_gold_sales"
-        pipeline_gold_dir = repo_root / "terraform" / "13_adf_pipeline_gold_dataflow"
-
-        if args.rg_only:
-            write_rg_tfvars(rg_dir)
-            deploy_stack(rg_dir)
-            sys.exit(0)
-
-        if args.storage_only:
-            run(["terraform", f"-chdir={rg_dir}", "init"])
-            rg_name = get_output(rg_dir, "resource_group_name")
-            write_storage_tfvars(storage_dir, rg_name)
-            deploy_stack(storage_dir)
-            sys.exit(0)
-
-        if args.sql_only:
-            run(["terraform", f"-chdir={rg_dir}", "init"])
-            rg_name = get_output(rg_dir, "resource_group_name")
-            sql_admin_login, sql_admin_password = write_sql_tfvars(sql_dir, rg_name)
-            deploy_stack(sql_dir)
-            if run_sql_init:
-                script_path = repo_root / "sql_scripts" / "fact_bookings_full.sql"
-                run_sql_script(sql_dir, sql_admin_login, sql_admin_password, script_path)
-            sys.exit(0)
-
-        if args.datafactory_only:
-            run(["terraform", f"-chdir={rg_dir}", "init"])
-            rg_name = get_output(rg_dir, "resource_group_name")
-            write_data_factory_tfvars(data_factory_dir, rg_name)
-            deploy_stack(data_factory_dir)
-            sys.exit(0)
-
-        if args.adf_links_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={storage_dir}", "init"])
-            run(["terraform", f"-chdir={sql_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            storage_dfs_endpoint = get_output(storage_dir, "primary_dfs_endpoint")
-            storage_account_key = get_output(storage_dir, "storage_account_primary_access_key")
-            sql_server_fqdn = get_output(sql_dir, "sql_server_fqdn")
-            sql_database_name = get_output(sql_dir, "sql_database_name")
-            sql_username = get_sql_admin_login(sql_dir)
-            sql_password, _ = get_sql_admin_password(sql_dir, allow_generate=False)
-            write_adf_linked_services_tfvars(
-                linked_services_dir,
-                data_factory_id,
-                storage_dfs_endpoint,
-                storage_account_key,
-                sql_server_fqdn,
-                sql_database_name,
-                sql_username,
-                sql_password,
-            )
-            deploy_stack(linked_services_dir)
-            sys.exit(0)
-
-        if args.adf_pipeline_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={linked_services_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            http_linked_service_name = get_output(linked_services_dir, "http_linked_service_name")
-            adls_linked_service_name = get_output(linked_services_dir, "adls_linked_service_name")
-            write_adf_pipeline_tfvars(
-                pipeline_dir,
-                data_factory_id,
-                http_linked_service_name,
-                adls_linked_service_name,
-            )
-            deploy_pipeline_stack(pipeline_dir)
-            sys.exit(0)
-
-        if args.adf_airport_pipeline_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={linked_services_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            http_linked_service_name = get_output(linked_services_dir, "http_linked_service_name")
-            adls_linked_service_name = get_output(linked_services_dir, "adls_linked_service_name")
-            write_adf_airport_pipeline_tfvars(
-                pipeline_airport_dir,
-                data_factory_id,
-                http_linked_service_name,
-                adls_linked_service_name,
-            )
-            deploy_pipeline_stack(pipeline_airport_dir)
-            sys.exit(0)
-
-        if args.adf_bookings_pipeline_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={linked_services_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            sql_linked_service_name = get_output(linked_services_dir, "sql_linked_service_name")
-            adls_linked_service_name = get_output(linked_services_dir, "adls_linked_service_name")
-            write_adf_bookings_pipeline_tfvars(
-                pipeline_bookings_dir,
-                data_factory_id,
-                sql_linked_service_name,
-                adls_linked_service_name,
-            )
-            deploy_pipeline_stack(pipeline_bookings_dir)
-            sys.exit(0)
-
-        if args.adf_master_pipeline_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={pipeline_dir}", "init"])
-            run(["terraform", f"-chdir={pipeline_airport_dir}", "init"])
-            run(["terraform", f"-chdir={pipeline_bookings_dir}", "init"])
-            run(["terraform", f"-chdir={pipeline_silver_dir}", "init"])
-            run(["terraform", f"-chdir={pipeline_gold_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            http_pipeline_name = get_output(pipeline_dir, "pipeline_name")
-            airport_pipeline_name = get_output(pipeline_airport_dir, "pipeline_name")
-            bookings_pipeline_name = get_output(pipeline_bookings_dir, "pipeline_name")
-            silver_pipeline_name = get_output(pipeline_silver_dir, "pipeline_name")
-            gold_pipeline_name = get_output(pipeline_gold_dir, "pipeline_name")
-            write_adf_master_pipeline_tfvars(
-                pipeline_master_dir,
-                data_factory_id,
-                http_pipeline_name,
-                airport_pipeline_name,
-                bookings_pipeline_name,
-                silver_pipeline_name,
-                gold_pipeline_name,
-            )
-            deploy_pipeline_stack(pipeline_master_dir)
-            sys.exit(0)
-
-        if args.adf_dataflow_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={linked_services_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            adls_linked_service_name = get_output(linked_services_dir, "adls_linked_service_name")
-            write_adf_dataflow_tfvars(
-                dataflow_dir,
-                data_factory_id,
-                adls_linked_service_name,
-            )
-            deploy_dataflow_stack(dataflow_dir)
-            sys.exit(0)
-
-        if args.adf_silver_pipeline_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={dataflow_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            dataflow_name = get_output(dataflow_dir, "dataflow_name")
-            write_adf_silver_pipeline_tfvars(
-                pipeline_silver_dir,
-                data_factory_id,
-                dataflow_name,
-            )
-            deploy_pipeline_stack(pipeline_silver_dir)
-            sys.exit(0)
-
-        if args.adf_gold_pipeline_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={gold_dataflow_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            dataflow_name = get_output(gold_dataflow_dir, "dataflow_name")
-            write_adf_gold_pipeline_tfvars(
-                pipeline_gold_dir,
-                data_factory_id,
-                dataflow_name,
-            )
-            deploy_pipeline_stack(pipeline_gold_dir)
-            sys.exit(0)
-
-        if args.adf_gold_dataflow_only:
-            run(["terraform", f"-chdir={data_factory_dir}", "init"])
-            run(["terraform", f"-chdir={linked_services_dir}", "init"])
-            data_factory_id = get_output(data_factory_dir, "data_factory_id")
-            adls_linked_service_name = get_output(linked_services_dir, "adls_linked_service_name")
-            write_adf_gold_dataflow_tfvars(
-                gold_dataflow_dir,
-                data_factory_id,
-                adls_linked_service_name,
-            )
-            deploy_dataflow_stack(gold_dataflow_dir)
-            sys.exit(0)
-
-        write_rg_tfvars(rg_dir)
-        deploy_stack(rg_dir)
-        rg_name = get_output(rg_dir, "resource_group_name")
-        write_storage_tfvars(storage_dir, rg_name)
-        deploy_stack(storage_dir)
-        sql_admin_login, sql_admin_password = write_sql_tfvars(sql_dir, rg_name)
-        deploy_stack(sql_dir)
-        if run_sql_init:
-            script_path = repo_root / "sql_scripts" / "fact_bookings_full.sql"
-            run_sql_script(sql_dir, sql_admin_login, sql_admin_password, script_path)
-        write_data_factory_tfvars(data_factory_dir, rg_name)
-        deploy_stack(data_factory_dir)
-        data_factory_id = get_output(data_factory_dir, "data_factory_id")
-        storage_dfs_endpoint = get_output(storage_dir, "primary_dfs_endpoint")
-        storage_account_key = get_output(storage_dir, "storage_account_primary_access_key")
-        sql_server_fqdn = get_output(sql_dir, "sql_server_fqdn")
-        sql_database_name = get_output(sql_dir, "sql_database_name")
-        write_adf_linked_services_tfvars(
-            linked_services_dir,
-            data_factory_id,
-            storage_dfs_endpoint,
-            storage_account_key,
-            sql_server_fqdn,
-            sql_database_name,
-            sql_admin_login,
-            sql_admin_password,
-        )
-        deploy_stack(linked_services_dir)
-        http_linked_service_name = get_output(linked_services_dir, "http_linked_service_name")
-        adls_linked_service_name = get_output(linked_services_dir, "adls_linked_service_name")
-        sql_linked_service_name = get_output(linked_services_dir, "sql_linked_service_name")
-        write_adf_pipeline_tfvars(
-            pipeline_dir,
-            data_factory_id,
-            http_linked_service_name,
-            adls_linked_service_name,
-        )
-        deploy_pipeline_stack(pipeline_dir)
-        write_adf_airport_pipeline_tfvars(
-            pipeline_airport_dir,
-            data_factory_id,
-            http_linked_service_name,
-            adls_linked_service_name,
+        if args.envs:
+            child_args = strip_env_args(sys.argv[1:] if argv is None else argv)
+            if not run_environments(repo_root, "deploy", args.envs, child_args, args.max_parallel):
+                sys.exit(1)
+            return
+        apply_default_overrides()
+        if args.storage_settings:
+            apply_storage_settings(repo_root / args.storage_settings)
+        sql_dir = get_stack_dir(repo_root, "07_sql_database")
+
+        load_cache(get_cache_path(repo_root), enabled=not args.no_cache)
+        if args.watch:
+            watch_stacks(repo_root, args.watch_interval, args.watch_debounce)
+            return
+        targets = [only_stack] if only_stack else list(STACKS)
+        upstream_dirs = [get_stack_dir(repo_root, name) for name in get_upstream_stacks(only_stack)] if only_stack else []
+        need_identity = any(name in targets for name in ("02_storage_account", "07_sql_database"))
+        need_public_ip = "07_sql_database" in targets and not (
+            os.environ.get("SQL_CLIENT_IP") or read_tfvars_value(get_tfvars_path(sql_dir), "client_ip_address")
         )
-        deploy_pipeline_stack(pipeline_airport_dir)
-        write_adf_bookings_pipeline_tfvars(
-            pipeline_bookings_dir,
-            data_factory_id,
-            sql_linked_service_name,
-            adls_linked_service_name,
-        )
-        deploy_pipeline_stack(pipeline_bookings_dir)
-        write_adf_dataflow_tfvars(
-            dataflow_dir,
-            data_factory_id,
-            adls_linked_service_name,
-        )
-        deploy_dataflow_stack(dataflow_dir)
-        dataflow_name = get_output(dataflow_dir, "dataflow_name")
-        write_adf_silver_pipeline_tfvars(
-            pipeline_silver_dir,
-            data_factory_id,
-            dataflow_name,
-        )
-        deploy_pipeline_stack(pipeline_silver_dir)
-        write_adf_gold_dataflow_tfvars(
-            gold_dataflow_dir,
-            data_factory_id,
-            adls_linked_service_name,
-        )
-        deploy_dataflow_stack(gold_dataflow_dir)
-        gold_dataflow_name = get_output(gold_dataflow_dir, "dataflow_name")
-        write_adf_gold_pipeline_tfvars(
-            pipeline_gold_dir,
-            data_factory_id,
-            gold_dataflow_name,
-        )
-        deploy_pipeline_stack(pipeline_gold_dir)
-        http_pipeline_name = get_output(pipeline_dir, "pipeline_name")
-        airport_pipeline_name = get_output(pipeline_airport_dir, "pipeline_name")
-        bookings_pipeline_name = get_output(pipeline_bookings_dir, "pipeline_name")
-        silver_pipeline_name = get_output(pipeline_silver_dir, "pipeline_name")
-        gold_pipeline_name = get_output(pipeline_gold_dir, "pipeline_name")
-        write_adf_master_pipeline_tfvars(
-            pipeline_master_dir,
-            data_factory_id,
-            http_pipeline_name,
-            airport_pipeline_name,
-            bookings_pipeline_name,
-            silver_pipeline_name,
-            gold_pipeline_name,
-        )
-        deploy_pipeline_stack(pipeline_master_dir)
+        with track_progress(repo_root, targets, args.progress, get_env_name()):
+            prefetch(upstream_dirs, need_identity, need_public_ip)
+
+            resolvers = get_deploy_resolvers(repo_root)
+            journal_path = get_journal_path(repo_root)
+            if full_deploy:
+                deploy_from_checkpoint(repo_root, targets, resolvers, run_sql_init, journal_path, args.restart)
+                return
+            start_stack(only_stack)
+            items = deploy_registered_stack(repo_root, only_stack, resolvers, run_sql_init)
+            journal = load_journal(journal_path)
+            if only_stack in journal["stacks"]:
+                # Keep an interrupted full deploy's journal in step with this stack's new outputs.
+                sql_init = journal["stacks"][only_stack]["sql_init"] or run_sql_init
+                record_checkpoint(repo_root, journal, journal_path, only_stack, items, sql_init)
+            finish_stack(only_stack)
     except subprocess.CalledProcessError as exc:
         print(f"Command failed: {exc}")
         sys.exit(exc.returncode)
+
+
+if __name__ == "__main__":
+    if not forward_to_session("deploy", sys.argv[1:]):
+        main()
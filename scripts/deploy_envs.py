@@ -0,0 +1,181 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from stacks import STACKS, get_stack_dir
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+ENV_DATA_DIR = ".terraform-envs"
+PLUGIN_CACHE_DIR_NAME = ".terraform-plugin-cache"
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_MAX_PARALLEL_PER_SUBSCRIPTION = 2
+# Names become workspace names, tfvars file names and directory names.
+ENV_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+ENV_ARGS = ("--envs", "--max-parallel")
+
+
+def load_environments(path):
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        config = json.loads(text)
+    elif yaml is not None:
+        config = yaml.safe_load(text)
+    else:
+        try:
+            config = json.loads(text)
+        except ValueError:
+            raise RuntimeError(f"PyYAML is required to read {path}. Install it with 'pip install pyyaml' or use JSON.")
+    environments = (config or {}).get("environments") or []
+    if not environments:
+        raise RuntimeError(f"No environments defined in {path}.")
+    names = set()
+    for environment in environments:
+        name = environment.get("name", "")
+        if not ENV_NAME_PATTERN.match(name):
+            raise RuntimeError(f"Invalid environment name '{name}' in {path}.")
+        if name in names:
+            raise RuntimeError(f"Duplicate environment '{name}' in {path}.")
+        names.add(name)
+    return config
+
+
+def strip_env_args(argv):
+    child_args = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+        elif arg in ENV_ARGS:
+            skip_value = True
+        elif not arg.startswith(tuple(f"{name}=" for name in ENV_ARGS)):
+            child_args.append(arg)
+    return child_args
+
+
+def get_environment_vars(repo_root, environment):
+    name = environment["name"]
+    env_vars = dict(os.environ)
+    env_vars.update({key: str(value) for key, value in (environment.get("env") or {}).items()})
+    defaults = dict(environment.get("defaults") or {})
+    if environment.get("location"):
+        defaults["location"] = environment["location"]
+    env_vars.update({
+        "DEPLOY_ENV": name,
+        "DEPLOY_DEFAULTS": json.dumps(defaults),
+        "DEPLOY_NO_SESSION": "1",
+        "TF_WORKSPACE": name,
+        # Relative to each stack dir, so every environment/stack pair has its own .terraform.
+        "TF_DATA_DIR": f"{ENV_DATA_DIR}/{name}",
+        "TF_PLUGIN_CACHE_DIR": str(repo_root / PLUGIN_CACHE_DIR_NAME),
+        "PYTHONUNBUFFERED": "1",
+    })
+    if environment.get("subscription_id"):
+        env_vars["ARM_SUBSCRIPTION_ID"] = environment["subscription_id"]
+    return env_vars
+
+
+def warm_plugin_cache(repo_root):
+    # The plugin cache is not safe for concurrent installs, so providers are downloaded once
+    # here; the per-environment inits then only link from the cache.
+    cache_dir = repo_root / PLUGIN_CACHE_DIR_NAME
+    cache_dir.mkdir(exist_ok=True)
+    env_vars = dict(os.environ, TF_PLUGIN_CACHE_DIR=str(cache_dir), TF_DATA_DIR=f"{ENV_DATA_DIR}/_plugin_cache")
+    env_vars.pop("TF_WORKSPACE", None)
+    for name in STACKS:
+        cmd = ["terraform", f"-chdir={get_stack_dir(repo_root, name)}", "init", "-backend=false", "-input=false"]
+        print("\n$ " + " ".join(cmd))
+        subprocess.check_call(cmd, env=env_vars, stdout=subprocess.DEVNULL)
+
+
+def run_environment(script_path, child_args, environment, env_vars, semaphores, results, print_lock):
+    name = environment["name"]
+    subscription_semaphore, global_semaphore = semaphores
+    queued = time.perf_counter()
+    # Take the subscription slot first so a throttled subscription never holds a global slot idle.
+    with subscription_semaphore, global_semaphore:
+        started = time.perf_counter()
+        with print_lock:
+            print(f"[{name}] started (waited {started - queued:.1f}s)")
+        process = subprocess.Popen(
+            [sys.executable, str(script_path), *child_args],
+            env=env_vars,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        for line in process.stdout:
+            with print_lock:
+                print(f"[{name}] {line.rstrip()}", flush=True)
+        returncode = process.wait()
+    duration = time.perf_counter() - started
+    results[name] = {"returncode": returncode, "waited": started - queued, "duration": duration}
+    with print_lock:
+        status = "succeeded" if returncode == 0 else f"failed (exit {returncode})"
+        print(f"[{name}] {status} in {duration:.1f}s")
+
+
+def print_environment_report(environments, results, elapsed):
+    print("\nEnvironment report:")
+    print(f"{'environment':<24} {'subscription':<38} {'status':<10} {'waited':>8} {'duration':>9}")
+    for environment in environments:
+        result = results.get(environment["name"], {"returncode": None, "waited": 0.0, "duration": 0.0})
+        status = "ok" if result["returncode"] == 0 else "failed"
+        print(
+            f"{environment['name']:<24} {environment.get('subscription_id') or '(default)':<38} {status:<10} "
+            f"{result['waited']:>7.1f}s {result['duration']:>8.1f}s"
+        )
+    succeeded = sum(1 for result in results.values() if result["returncode"] == 0)
+    busy = sum(result["duration"] for result in results.values())
+    print(f"{succeeded}/{len(environments)} environments succeeded in {elapsed:.1f}s ({busy:.1f}s of environment time)")
+
+
+def run_environments(repo_root, script_name, envs_path, child_args, max_parallel=None):
+    config = load_environments(envs_path)
+    environments = config["environments"]
+    max_parallel = max_parallel or config.get("max_parallel") or DEFAULT_MAX_PARALLEL
+    per_subscription = config.get("max_parallel_per_subscription") or DEFAULT_MAX_PARALLEL_PER_SUBSCRIPTION
+    global_semaphore = threading.BoundedSemaphore(max_parallel)
+    subscription_semaphores = {
+        environment.get("subscription_id"): threading.BoundedSemaphore(per_subscription)
+        for environment in environments
+    }
+    script_path = Path(__file__).resolve().parent / f"{script_name}.py"
+    started = time.perf_counter()
+    warm_plugin_cache(repo_root)
+    print(
+        f"\nRunning {script_name} for {len(environments)} environments "
+        f"(max {max_parallel} at once, {per_subscription} per subscription)"
+    )
+    results = {}
+    print_lock = threading.Lock()
+    threads = []
+    for environment in environments:
+        semaphores = (subscription_semaphores[environment.get("subscription_id")], global_semaphore)
+        thread = threading.Thread(
+            target=run_environment,
+            args=(
+                script_path,
+                child_args,
+                environment,
+                get_environment_vars(repo_root, environment),
+                semaphores,
+                results,
+                print_lock,
+            ),
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    print_environment_report(environments, results, time.perf_counter() - started)
+    return all(results.get(environment["name"], {}).get("returncode") == 0 for environment in environments)
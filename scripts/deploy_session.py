@@ -0,0 +1,261 @@
+import argparse
+import importlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from retries import cancel_commands, clear_cancel
+
+SESSION_SOCKET_NAME = ".deploy_session.sock"
+SESSION_SCRIPTS = ("deploy", "destroy")
+# Reloading on change keeps the session honest when the scripts are edited mid-iteration.
+SESSION_SOURCES = ("deploy.py", "destroy.py", "json_stream.py", "progress.py", "retries.py", "stacks.py")
+MAX_MESSAGE_BYTES = 1 << 20
+
+
+def get_socket_path():
+    override = os.environ.get("DEPLOY_SESSION_SOCKET")
+    if override:
+        return Path(override)
+    return Path(__file__).resolve().parent.parent / SESSION_SOCKET_NAME
+
+
+def sessions_supported():
+    return hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds")
+
+
+def send_message(conn, message, fds=None):
+    payload = (json.dumps(message) + "\n").encode("utf-8")
+    if fds:
+        socket.send_fds(conn, [payload], fds)
+    else:
+        conn.sendall(payload)
+
+
+def read_message(conn, with_fds=False):
+    fds = []
+    data = b""
+    while not data.endswith(b"\n"):
+        if with_fds and not fds:
+            chunk, fds, _, _ = socket.recv_fds(conn, MAX_MESSAGE_BYTES, 3)
+        else:
+            chunk = conn.recv(MAX_MESSAGE_BYTES)
+        if not chunk:
+            raise RuntimeError("Deploy session closed the connection.")
+        data += chunk
+    message = json.loads(data.decode("utf-8"))
+    return (message, fds) if with_fds else message
+
+
+def connect(socket_path):
+    if not sessions_supported() or not socket_path.exists():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(socket_path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        conn.close()
+        return None
+    return conn
+
+
+def forward_to_session(script, argv):
+    # Thin-client path for deploy.py/destroy.py: hand the command line, environment and our
+    # stdio to a running session. Returns False (run locally) when no session is listening.
+    if os.environ.get("DEPLOY_NO_SESSION"):
+        return False
+    conn = connect(get_socket_path())
+    if conn is None:
+        return False
+    with conn:
+        request = {"command": "run", "script": script, "argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+        sys.stdout.flush()
+        sys.stderr.flush()
+        send_message(conn, request, [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()])
+        try:
+            reply = read_message(conn)
+        except KeyboardInterrupt:
+            # Ctrl-C reaches only this client; the session interrupts its terraform and reports back.
+            print("\nInterrupted; stopping the session's run...", file=sys.stderr, flush=True)
+            send_message(conn, {"command": "cancel"})
+            reply = read_message(conn)
+    sys.exit(reply["exit_code"])
+
+
+def watch_client(conn, finished):
+    # A cancel message, or a client that went away, stops the request it is waiting on.
+    try:
+        message = read_message(conn)
+    except (OSError, RuntimeError, ValueError):
+        message = {"command": "cancel"}
+    if message.get("command") == "cancel" and not finished.is_set():
+        print("Client interrupted; cancelling its run.", flush=True)
+        cancel_commands()
+
+
+def request_session(command):
+    conn = connect(get_socket_path())
+    if conn is None:
+        raise RuntimeError(f"No deploy session is listening on {get_socket_path()}.")
+    with conn:
+        send_message(conn, {"command": command})
+        return read_message(conn)
+
+
+class DeploySession:
+    def __init__(self):
+        self.modules = {}
+        self.versions = None
+        self.started = time.time()
+        self.requests = 0
+
+    def source_versions(self):
+        scripts_dir = Path(__file__).resolve().parent
+        return [(scripts_dir / name).stat().st_mtime_ns for name in SESSION_SOURCES]
+
+    def load_modules(self):
+        versions = self.source_versions()
+        if self.modules and versions == self.versions:
+            return
+        if self.modules:
+            print("Scripts changed on disk; reloading (in-memory cache cleared).")
+            for name in ("json_stream", "stacks", "progress", "retries", *SESSION_SCRIPTS):
+                importlib.reload(sys.modules[name])
+        for name in SESSION_SCRIPTS:
+            self.modules[name] = importlib.import_module(name)
+        self.versions = versions
+
+    def status(self):
+        cache = self.modules["deploy"].CACHE if self.modules else {"memory": {}}
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "cached_entries": len(cache["memory"]),
+        }
+
+    def run(self, request, fds):
+        if request["script"] not in SESSION_SCRIPTS or len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            raise RuntimeError(f"Invalid session request for '{request.get('script')}'.")
+        self.requests += 1
+        saved_fds = [os.dup(fd) for fd in (0, 1, 2)]
+        saved_env = dict(os.environ)
+        saved_cwd = os.getcwd()
+        saved_argv = sys.argv
+        saved_defaults = None
+        exit_code = 0
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Point fds 0-2 at the client's terminal so prints and terraform subprocesses stream there.
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        try:
+            os.environ.clear()
+            os.environ.update(request["env"])
+            os.chdir(request["cwd"])
+            sys.argv = [f"{request['script']}.py", *request["argv"]]
+            started = time.perf_counter()
+            self.load_modules()
+            # DEPLOY_DEFAULTS and --storage-settings update stacks.DEFAULTS in place; they belong to
+            # this request only.
+            defaults = sys.modules["stacks"].DEFAULTS
+            saved_defaults = dict(defaults)
+            self.modules[request["script"]].main(request["argv"])
+            print(f"Session run finished in {time.perf_counter() - started:.1f}s")
+        except SystemExit as exc:
+            exit_code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+            if exc.code is not None and not isinstance(exc.code, int):
+                print(exc.code, file=sys.stderr)
+        except KeyboardInterrupt:
+            print("Session run cancelled.", file=sys.stderr)
+            exit_code = 130
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for target, fd in enumerate(saved_fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            for fd in fds:
+                os.close(fd)
+            os.chdir(saved_cwd)
+            sys.argv = saved_argv
+            os.environ.clear()
+            os.environ.update(saved_env)
+            if saved_defaults is not None:
+                defaults.clear()
+                defaults.update(saved_defaults)
+        return exit_code
+
+
+def serve(socket_path):
+    if not sessions_supported():
+        raise RuntimeError("Deploy sessions need Unix domain sockets with fd passing (Linux/macOS).")
+    if connect(socket_path) is not None:
+        raise RuntimeError(f"A deploy session is already listening on {socket_path}.")
+    if socket_path.exists():
+        socket_path.unlink()
+    session = DeploySession()
+    session.load_modules()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(str(socket_path))
+    finally:
+        os.umask(old_umask)
+    server.listen()
+    print(f"Deploy session listening on {socket_path} (pid {os.getpid()})")
+    try:
+        while True:
+            # Requests run one at a time: two terraform applies against the same state would conflict.
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    request, fds = read_message(conn, with_fds=True)
+                except (RuntimeError, ValueError) as exc:
+                    print(f"Dropped malformed request: {exc}")
+                    continue
+                if request["command"] == "stop":
+                    send_message(conn, {"stopped": True, **session.status()})
+                    break
+                if request["command"] == "status":
+                    send_message(conn, session.status())
+                    continue
+                clear_cancel()
+                finished = threading.Event()
+                threading.Thread(target=watch_client, args=(conn, finished), daemon=True).start()
+                try:
+                    exit_code = session.run(request, fds)
+                except RuntimeError as exc:
+                    print(exc)
+                    exit_code = 1
+                finished.set()
+                send_message(conn, {"exit_code": exit_code})
+                print(f"{request['script']} {' '.join(request['argv'])}: exit {exit_code}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if socket_path.exists():
+            socket_path.unlink()
+    print("Deploy session stopped.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep deploy/destroy warm in a long-lived local session.")
+    parser.add_argument("command", choices=["start", "stop", "status"], help="Session action")
+    args = parser.parse_args()
+
+    if args.command == "start":
+        serve(get_socket_path())
+    else:
+        print(json.dumps(request_session(args.command), indent=2))
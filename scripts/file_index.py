@@ -0,0 +1,176 @@
+import base64
+import hashlib
+import json
+import math
+from pathlib import Path
+
+# Per-file data skipping for the local lake. Every data file gets Delta-style min/max/null counts
+# in its add action, and tables that declare bloom columns get a sidecar in _delta_index holding
+# one bloom filter per column, so point lookups open only the files that can hold the key.
+INDEX_DIR_NAME = "_delta_index"
+BLOOM_FPP = 0.01
+STAT_TYPES = (int, float, str)
+
+
+class BloomFilter:
+    __slots__ = ("num_bits", "num_hashes", "bits")
+
+    def __init__(self, num_bits, num_hashes, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_items(cls, count, fpp=BLOOM_FPP):
+        count = max(count, 1)
+        num_bits = max(64, math.ceil(-count * math.log(fpp) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / count * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def positions(self, value):
+        # Values are hashed as text, so 42 and "42" (a CLI argument) hit the same bits.
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self.num_bits for index in range(self.num_hashes)]
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+    def to_json(self):
+        return {
+            "numBits": self.num_bits,
+            "numHashes": self.num_hashes,
+            "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_json(cls, payload):
+        return cls(payload["numBits"], payload["numHashes"], bytearray(base64.b64decode(payload["bits"])))
+
+
+class FileStats:
+    # Collects statistics while a data file is being written; track() passes the rows through.
+    def __init__(self, bloom_columns=()):
+        self.bloom_columns = tuple(bloom_columns)
+        self.bloom_values = {column: [] for column in self.bloom_columns}
+        self.min_values = {}
+        self.max_values = {}
+        self.null_count = {}
+        self.mixed = set()
+
+    def track(self, rows):
+        for row in rows:
+            self.observe(row)
+            yield row
+
+    def observe(self, row):
+        for column, value in row.items():
+            if value is None:
+                self.null_count[column] = self.null_count.get(column, 0) + 1
+                continue
+            self.null_count.setdefault(column, 0)
+            if column in self.bloom_values:
+                self.bloom_values[column].append(value)
+            if column in self.mixed:
+                continue
+            # bool is an int subclass but has no useful range; other types have no total order here.
+            if type(value) not in STAT_TYPES:
+                self.mixed.add(column)
+                continue
+            current = self.min_values.get(column)
+            if current is None:
+                self.min_values[column] = value
+                self.max_values[column] = value
+            elif type(current) is not type(value):
+                self.mixed.add(column)
+            elif value < current:
+                self.min_values[column] = value
+            elif value > self.max_values[column]:
+                self.max_values[column] = value
+
+    def finish(self, table_dir, rel_path):
+        stats = {
+            "minValues": {column: value for column, value in self.min_values.items() if column not in self.mixed},
+            "maxValues": {column: value for column, value in self.max_values.items() if column not in self.mixed},
+            "nullCount": self.null_count,
+        }
+        if not self.bloom_columns:
+            return stats, None
+        columns = {}
+        for column, values in self.bloom_values.items():
+            bloom = BloomFilter.for_items(len(values))
+            for value in values:
+                bloom.add(value)
+            columns[column] = bloom.to_json()
+        index_path = get_index_path(rel_path)
+        target = Path(table_dir) / index_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps({"path": rel_path, "columns": columns}, separators=(",", ":")) + "\n", encoding="utf-8")
+        return stats, index_path
+
+
+def get_index_path(rel_path):
+    return f"{INDEX_DIR_NAME}/{Path(rel_path).stem}.json"
+
+
+def read_blooms(table_dir, index_path):
+    path = Path(table_dir) / index_path
+    if not path.exists():
+        return {}
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    return {column: BloomFilter.from_json(bloom) for column, bloom in payload["columns"].items()}
+
+
+def coerce_to_stats(value, bound):
+    # Lookups from the command line arrive as text; compare them as the type the file recorded.
+    if isinstance(value, str) and isinstance(bound, int) and not isinstance(bound, bool):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def outside_range(stats, column, value):
+    low = stats.get("minValues", {}).get(column)
+    high = stats.get("maxValues", {}).get(column)
+    if low is None or high is None:
+        return False
+    probe = coerce_to_stats(value, low)
+    return type(probe) is type(low) and not low <= probe <= high
+
+
+def get_bloom(table_dir, add, column):
+    index_path = (add.get("tags") or {}).get("bloomIndex")
+    return read_blooms(table_dir, index_path).get(column) if index_path else None
+
+
+def can_skip(table_dir, add, column, value, report=None):
+    if outside_range(json.loads(add.get("stats") or "{}"), column, value):
+        if report is not None:
+            report["minmax_pruned"] += 1
+        return True
+    bloom = get_bloom(table_dir, add, column)
+    if bloom is not None and not bloom.might_contain(value):
+        if report is not None:
+            report["bloom_pruned"] += 1
+        return True
+    return False
+
+
+def may_hold_any(table_dir, add, column, values):
+    stats = json.loads(add.get("stats") or "{}")
+    candidates = [value for value in values if not outside_range(stats, column, value)]
+    if not candidates:
+        return False
+    bloom = get_bloom(table_dir, add, column)
+    return bloom is None or any(bloom.might_contain(value) for value in candidates)
+
+
+def new_report():
+    return {"files": 0, "minmax_pruned": 0, "bloom_pruned": 0, "files_read": 0, "rows_read": 0}
@@ -0,0 +1,244 @@
+import argparse
+import itertools
+import shutil
+import time
+from decimal import Decimal
+
+from arrow_cache import load_cached_table
+from bookings_enriched import ENRICHED_TABLE, refresh_enriched
+from columnar import NULL_INT, load_silver_table
+from gold_sales import gold_sink_dir
+from local_lake import get_lake_root, read_json_optional, write_json_atomic
+
+CUBE_NAME = "bookings_cube"
+# Format 2 keeps cube.json as a manifest and every rollup in its own file, so a query reads only
+# the rollup it answers from.
+CUBE_FORMAT = 2
+ROLLUPS_DIR_NAME = "rollups"
+DIMENSIONS = ["airline", "route", "booking_year", "booking_month", "age_band", "is_paid"]
+MEASURES = ["bookings", "sales_cents", "duration_sum", "duration_count"]
+METRICS = ["bookings", "total_sales", "avg_flight_duration_mins"]
+
+
+def get_cube_path(lake_root):
+    return gold_sink_dir(lake_root, CUBE_NAME) / "cube.json"
+
+
+def get_rollups_dir(lake_root):
+    return gold_sink_dir(lake_root, CUBE_NAME) / ROLLUPS_DIR_NAME
+
+
+def build_base_cuboid(bookings):
+    # Group on integer codes from the columnar bookings_enriched table and decode only the final
+    # cells. Its airline name and age band are already the ones in effect on each booking_date.
+    airline_names = bookings.column("airline_name").dictionary
+    age_bands = bookings.column("age_band").dictionary
+    columns = [
+        bookings.column("airline_name").data,
+        bookings.column("origin_airport_id").data,
+        bookings.column("destination_airport_id").data,
+        bookings.column("booking_year").data,
+        bookings.column("booking_month").data,
+        bookings.column("age_band").data,
+        bookings.column("is_paid").data,
+    ]
+    costs = bookings.column("ticket_cost").data
+    durations = bookings.column("flight_duration_mins").data
+    coded_cells = {}
+    for position, key in enumerate(zip(*columns)):
+        cell = coded_cells.get(key)
+        if cell is None:
+            cell = [0, 0, 0, 0]
+            coded_cells[key] = cell
+        cell[0] += 1
+        cost = costs[position]
+        if cost != NULL_INT:
+            cell[1] += cost
+        duration = durations[position]
+        if duration != NULL_INT:
+            cell[2] += duration
+            cell[3] += 1
+
+    cells = {}
+    for (airline, origin, destination, year, month, band, is_paid), measures in coded_cells.items():
+        key = (
+            airline_names.decode(airline),
+            f"{decode_int(origin)}->{decode_int(destination)}",
+            decode_int(year),
+            decode_int(month),
+            age_bands.decode(band),
+            is_paid == 1,
+        )
+        cells[key] = measures
+    return cells
+
+
+def decode_int(value):
+    return None if value == NULL_INT else value
+
+
+def roll_up(base_cells, dim_indexes):
+    cells = {}
+    for key, measures in base_cells.items():
+        rolled_key = tuple(key[index] for index in dim_indexes)
+        cell = cells.get(rolled_key)
+        if cell is None:
+            cells[rolled_key] = list(measures)
+            continue
+        for position, value in enumerate(measures):
+            cell[position] += value
+    return cells
+
+
+def all_groupings():
+    for size in range(len(DIMENSIONS) + 1):
+        for combo in itertools.combinations(range(len(DIMENSIONS)), size):
+            yield combo
+
+
+def grouping_name(dims):
+    return ",".join(dims) if dims else "*"
+
+
+def rollup_file(version, dim_indexes):
+    # Rollups of one build share a directory named after the enriched version they were built from.
+    return f"v{version}/{sum(1 << index for index in dim_indexes):02d}.json"
+
+
+def write_rollups(lake_root, version, base_cells):
+    rollups = {}
+    for dim_indexes in all_groupings():
+        dims = [DIMENSIONS[index] for index in dim_indexes]
+        cells = roll_up(base_cells, dim_indexes)
+        file_name = rollup_file(version, dim_indexes)
+        write_json_atomic(get_rollups_dir(lake_root) / file_name, [list(key) + measures for key, measures in cells.items()])
+        rollups[grouping_name(dims)] = {"dims": dims, "file": file_name, "rows": len(cells)}
+    return rollups
+
+
+def remove_old_rollups(lake_root, version):
+    for path in get_rollups_dir(lake_root).glob("v*"):
+        if path.name != f"v{version}":
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def build_cube(lake_root, force=False, arrow_cache=False):
+    started = time.perf_counter()
+    # The enriched version moves when bookings or any dimension they join to change.
+    version = refresh_enriched(lake_root)["version"]
+    cube_path = get_cube_path(lake_root)
+    existing = read_json_optional(cube_path)
+    if existing and existing.get("format") == CUBE_FORMAT and existing.get("enriched_version") == version and not force:
+        print(f"gold.{CUBE_NAME}: up to date at {ENRICHED_TABLE} version {version}")
+        return existing
+
+    load = load_cached_table if arrow_cache else load_silver_table
+    base_cells = build_base_cuboid(load(lake_root, ENRICHED_TABLE, version=version))
+
+    # The manifest is replaced after its rollups are written, so readers never see a partial build.
+    rollups = write_rollups(lake_root, version, base_cells)
+    cube = {"format": CUBE_FORMAT, "enriched_version": version, "dimensions": DIMENSIONS, "measures": MEASURES, "rollups": rollups}
+    write_json_atomic(cube_path, cube)
+    remove_old_rollups(lake_root, version)
+    elapsed = time.perf_counter() - started
+    print(f"gold.{CUBE_NAME}: built {len(base_cells)} base cells, {len(rollups)} rollups in {elapsed:.3f}s")
+    return cube
+
+
+def load_cube(lake_root):
+    cube = read_json_optional(get_cube_path(lake_root))
+    if cube is None or cube.get("format") != CUBE_FORMAT:
+        raise RuntimeError("Gold cube not found. Run scripts/gold_cube.py build first.")
+    return cube
+
+
+def load_rollup(lake_root, entry):
+    rows = read_json_optional(get_rollups_dir(lake_root) / entry["file"])
+    if rows is None:
+        raise RuntimeError(f"Gold cube rollup {entry['file']} is missing. Run scripts/gold_cube.py build --force.")
+    return dict(entry, rows=rows)
+
+
+def metric_values(measures):
+    bookings, sales_cents, duration_sum, duration_count = measures
+    return {
+        "bookings": bookings,
+        "total_sales": (Decimal(sales_cents) / 100).quantize(Decimal("0.01")),
+        "avg_flight_duration_mins": round(duration_sum / duration_count, 2) if duration_count else None,
+    }
+
+
+def select_rollup(cube, by, where):
+    unknown = [dim for dim in list(by) + list(where) if dim not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown cube dimension(s): {', '.join(unknown)}")
+    wanted = set(by) | set(where)
+    return cube["rollups"][grouping_name([dim for dim in DIMENSIONS if dim in wanted])]
+
+
+def query_cube(lake_root, cube, by=(), where=None, order_by="total_sales", limit=None):
+    where = where or {}
+    rollup = load_rollup(lake_root, select_rollup(cube, by, where))
+    positions = {dim: index for index, dim in enumerate(rollup["dims"])}
+
+    merged = {}
+    for row in rollup["rows"]:
+        if any(str(row[positions[dim]]).lower() != str(value).lower() for dim, value in where.items()):
+            continue
+        key = tuple(row[positions[dim]] for dim in by)
+        measures = row[len(rollup["dims"]):]
+        cell = merged.get(key)
+        if cell is None:
+            merged[key] = list(measures)
+        else:
+            for position, value in enumerate(measures):
+                cell[position] += value
+
+    results = [dict(zip(by, key), **metric_values(measures)) for key, measures in merged.items()]
+    if order_by:
+        results.sort(key=lambda item: (item[order_by] is not None, item[order_by] or 0), reverse=True)
+    return results[:limit] if limit else results
+
+
+def parse_where(items):
+    where = {}
+    for item in items or []:
+        if "=" not in item:
+            raise ValueError(f"Filters must look like dimension=value, got '{item}'.")
+        key, value = item.split("=", 1)
+        where[key.strip()] = value.strip()
+    return where
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the local gold bookings cube.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Build the cube and its rollups from silver")
+    build_parser.add_argument("--force", action="store_true", help="Rebuild even if silver bookings are unchanged")
+    build_parser.add_argument("--arrow-cache", action="store_true", help="Read silver through the mapped Arrow cache (needs pyarrow)")
+    query_parser = subparsers.add_parser("query", help="Answer a question from the precomputed rollups")
+    query_parser.add_argument("--by", choices=DIMENSIONS, action="append", default=[], help="Group-by dimension")
+    query_parser.add_argument("--where", action="append", help="Filter as dimension=value")
+    query_parser.add_argument("--order-by", choices=METRICS, default="total_sales", help="Metric to sort by")
+    query_parser.add_argument("--limit", type=int, help="Maximum rows to return")
+    args = parser.parse_args()
+
+    lake_root = get_lake_root()
+    if args.command == "build":
+        build_cube(lake_root, force=args.force, arrow_cache=args.arrow_cache)
+    else:
+        # A query answers from the cube of the current bookings_enriched version; a stale cube is
+        # rebuilt first, as the Arrow cache is on first read after a silver commit. That check and any
+        # rebuild are timed apart from the query itself.
+        started = time.perf_counter()
+        build_cube(lake_root)
+        refresh_ms = (time.perf_counter() - started) * 1000
+        where = parse_where(args.where)
+        started = time.perf_counter()
+        cube = load_cube(lake_root)
+        results = query_cube(lake_root, cube, args.by, where, args.order_by, args.limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for item in results:
+            print(", ".join(f"{key}={value}" for key, value in item.items()))
+        rollup_name = grouping_name(select_rollup(cube, args.by, where)["dims"])
+        print(f"{len(results)} rows from rollup '{rollup_name}' in {elapsed_ms:.2f} ms (freshness check and rebuild: {refresh_ms:.2f} ms)")
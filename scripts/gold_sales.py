@@ -0,0 +1,142 @@
+import argparse
+import time
+from decimal import Decimal
+
+from bookings_enriched import ENRICHED_TABLE, refresh_enriched
+from local_lake import (
+    CHANGE_TYPE_FIELD,
+    DELETE,
+    INSERT,
+    UPDATE_POSTIMAGE,
+    UPDATE_PREIMAGE,
+    get_lake_root,
+    has_full_change_feed,
+    overwrite_table,
+    read_changes,
+    read_json_optional,
+    read_rows,
+    silver_table_dir,
+    table_path,
+    to_cents,
+    write_json_atomic,
+)
+from stacks import DEFAULTS
+
+CHANGE_SIGNS = {
+    INSERT: 1,
+    UPDATE_POSTIMAGE: 1,
+    UPDATE_PREIMAGE: -1,
+    DELETE: -1,
+}
+TOTALS_TABLE_NAME = "airline_sales_totals"
+TOP_N = 5
+# Totals are kept per airline_name from the bookings_enriched change feed, which already carries
+# the name in effect on each booking date and is re-emitted when an airline changes; older states
+# are rebuilt.
+STATE_FORMAT = 3
+
+
+def gold_sink_dir(lake_root, name):
+    return table_path(lake_root, DEFAULTS["gold_sink_container"], DEFAULTS["gold_sink_folder"], name)
+
+
+def get_state_path(lake_root):
+    return gold_sink_dir(lake_root, TOTALS_TABLE_NAME) / "_state.json"
+
+
+def empty_state():
+    return {"format": STATE_FORMAT, "enriched_version": -1, "totals": {}, "counts": {}}
+
+
+def load_state(lake_root):
+    state = read_json_optional(get_state_path(lake_root))
+    if not state or "totals" not in state or state.get("format") != STATE_FORMAT:
+        return None
+    return state
+
+
+def apply_booking(state, row, sign):
+    # Bookings without a matching airline are totalled under "".
+    sales_key = row.get("airline_name") or ""
+    totals = state["totals"]
+    counts = state["counts"]
+    totals[sales_key] = totals.get(sales_key, 0) + sign * to_cents(row.get("ticket_cost"))
+    counts[sales_key] = counts.get(sales_key, 0) + sign
+    if counts[sales_key] == 0:
+        del counts[sales_key]
+        totals.pop(sales_key, None)
+
+
+def rebuild_state(enriched_dir, version):
+    state = empty_state()
+    scanned = 0
+    for row in read_rows(enriched_dir, version):
+        apply_booking(state, row, 1)
+        scanned += 1
+    state["enriched_version"] = version
+    return state, scanned
+
+
+def apply_changes(state, enriched_dir, version):
+    applied = 0
+    for row in read_changes(enriched_dir, state["enriched_version"], version):
+        sign = CHANGE_SIGNS.get(row.get(CHANGE_TYPE_FIELD))
+        if sign is None:
+            continue
+        apply_booking(state, row, sign)
+        applied += 1
+    state["enriched_version"] = version
+    return applied
+
+
+def rank_airlines(state, top_n=TOP_N):
+    ordered = sorted(state["totals"].items(), key=lambda item: item[1], reverse=True)
+    ranked = []
+    previous = None
+    rank = 0
+    for position, (name, cents) in enumerate(ordered, start=1):
+        if cents != previous:
+            rank = position
+            previous = cents
+        if rank > top_n:
+            break
+        ranked.append({
+            "airline_name": name or None,
+            "total_sales": str((Decimal(cents) / 100).quantize(Decimal("0.01"))),
+            "top_sales_rank": rank,
+        })
+    return ranked
+
+
+def refresh_gold_sales(lake_root, full=False):
+    started = time.perf_counter()
+    enriched_dir = silver_table_dir(lake_root, ENRICHED_TABLE)
+    version = refresh_enriched(lake_root)["version"]
+
+    state = None if full else load_state(lake_root)
+    mode = "incremental"
+    rows = 0
+    if state is None or state["enriched_version"] > version:
+        mode = "full"
+    elif not has_full_change_feed(enriched_dir, state["enriched_version"], version):
+        mode = "full"
+    if mode == "full":
+        state, rows = rebuild_state(enriched_dir, version)
+    else:
+        rows = apply_changes(state, enriched_dir, version)
+
+    top_rows = rank_airlines(state)
+    write_json_atomic(get_state_path(lake_root), state)
+    overwrite_table(gold_sink_dir(lake_root, DEFAULTS["gold_sink_name"]), top_rows)
+    elapsed = time.perf_counter() - started
+    print(f"gold.{DEFAULTS['gold_sink_name']}: {mode} refresh to {ENRICHED_TABLE} version {version}, {rows} rows read in {elapsed:.3f}s")
+    return top_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the gold airline sales top 5 from the local silver lake.")
+    parser.add_argument("--full", action="store_true", help="Rebuild running totals from a full scan of silver bookings")
+    args = parser.parse_args()
+
+    for row in refresh_gold_sales(get_lake_root(), full=args.full):
+        print(f"{row['top_sales_rank']}. {row['airline_name']}: {row['total_sales']}")
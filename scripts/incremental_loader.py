@@ -0,0 +1,142 @@
+import argparse
+import sqlite3
+import time
+from collections import Counter
+
+from adf_expressions import add_days, ticks
+from json_stream import iter_json_values
+from local_lake import (
+    CHANGE_TYPE_FIELD,
+    INSERT,
+    UPDATE_POSTIMAGE,
+    bronze_path,
+    get_lake_root,
+    get_repo_root,
+    get_table_version,
+    read_changes,
+    silver_table_dir,
+    to_int,
+)
+from pipeline_runner import get_sqlite_path, seed_monitor, seed_sql, sql_to_sqlite
+from silver_flow import normalize_booking, run_silver_flow, write_bookings_csv
+from stacks import DEFAULTS
+from watermark_store import advance_watermark, get_lastload_path, get_state, write_checkpoint
+
+# Same queries as the watermark mode of 08_adf_pipeline_fact_bookings_incremental.
+LATEST_LOAD_QUERY = "SELECT CAST(MAX(booking_date) AS datetime2) as latestload FROM {table}"
+INCREMENTAL_QUERY = "SELECT * FROM {table} WHERE booking_date > '{lookback_from}' AND booking_date <= '{latest_load}'"
+
+
+def read_last_load(path):
+    if not path.exists():
+        raise RuntimeError(f"Missing {path}; run with --seed first.")
+    for value in iter_json_values(path):
+        if isinstance(value, dict) and value.get("lastload"):
+            return value["lastload"]
+    raise RuntimeError(f"No lastload value in {path}.")
+
+
+def read_window(sqlite_path, last_load, lookback_days):
+    schema = DEFAULTS["bookings_sql_schema"]
+    table = f"{schema}.{DEFAULTS['bookings_sql_table']}"
+    with sqlite3.connect(sqlite_path) as connection:
+        connection.row_factory = sqlite3.Row
+        latest_load = connection.execute(sql_to_sqlite(LATEST_LOAD_QUERY.format(table=table), schema)).fetchone()["latestload"]
+        lookback_from = add_days(last_load, -lookback_days)
+        # The window is re-read even when MAX(booking_date) has not moved past the watermark, so a
+        # booking committed late for an already-loaded date is picked up by the next run.
+        if latest_load is None or ticks(latest_load) <= ticks(lookback_from):
+            return latest_load, lookback_from, []
+        query = INCREMENTAL_QUERY.format(table=table, lookback_from=lookback_from, latest_load=latest_load)
+        rows = [dict(row) for row in connection.execute(sql_to_sqlite(query, schema))]
+    return latest_load, lookback_from, rows
+
+
+def run_incremental_load(lake_root, sqlite_path, lookback_days):
+    source = DEFAULTS["bookings_sql_table"]
+    lastload_path = get_lastload_path(lake_root)
+    state = get_state(lake_root, source)
+    # The state store is the source of truth; last_load.json only seeds a source it has not seen.
+    last_load = state["value"] if state else read_last_load(lastload_path)
+    started = time.perf_counter()
+    latest_load, lookback_from, rows = read_window(sqlite_path, last_load, lookback_days)
+    read_seconds = time.perf_counter() - started
+    if not rows:
+        print(f"No bookings after {lookback_from}; watermark unchanged.")
+        return None
+    # MAX(booking_date) can sit at the watermark when only late rows arrived; it never moves back.
+    if ticks(latest_load) < ticks(last_load):
+        latest_load = last_load
+
+    # Bronze gets the whole window, as the Copy activity writes it; silver dedups on booking_id.
+    bronze_file = bronze_path(lake_root, "dataflow_bookings_source_file").with_suffix(".csv")
+    write_bookings_csv(bronze_file, (normalize_booking(row) for row in rows))
+    table_dir = silver_table_dir(lake_root, "bookings")
+    base_version = get_table_version(table_dir)
+    result = run_silver_flow(lake_root, ["bookings"])["bookings"]
+
+    last_load_ticks = ticks(last_load)
+    overlap_keys = {row["booking_id"] for row in rows if ticks(row["booking_date"]) <= last_load_ticks}
+    overlap_changes = Counter(
+        change[CHANGE_TYPE_FIELD]
+        for change in read_changes(table_dir, base_version)
+        if to_int(change["booking_id"]) in overlap_keys
+    )
+    report = {
+        "lastload": latest_load,
+        "lookbackfrom": lookback_from,
+        "rowscopied": len(rows),
+        "overlaprows": len(overlap_keys),
+        "latearrivals": overlap_changes[INSERT],
+        "corrections": overlap_changes[UPDATE_POSTIMAGE],
+        "readseconds": round(read_seconds, 3),
+        "silverversion": result["version"],
+    }
+    # The watermark only moves once the silver upsert has committed; a failed run re-reads the window.
+    advance_watermark(
+        lake_root,
+        source,
+        state["version"] if state else -1,
+        latest_load,
+        rows=len(rows),
+        bytes_written=bronze_file.stat().st_size,
+        duration_seconds=time.perf_counter() - started,
+        details={
+            "lookbackFrom": lookback_from,
+            "overlapRows": report["overlaprows"],
+            "lateArrivals": report["latearrivals"],
+            "corrections": report["corrections"],
+            "silverVersion": result["version"],
+        },
+    )
+    # Same checkpoint the ADF pipeline keeps, so pipeline_runner.py picks up where this left off.
+    write_checkpoint(lake_root, report)
+    print_overlap_report(report, lookback_days)
+    return report
+
+
+def print_overlap_report(report, lookback_days):
+    overlap = report["overlaprows"]
+    share = overlap / report["rowscopied"] if report["rowscopied"] else 0.0
+    print(f"Window {report['lookbackfrom']} .. {report['lastload']} ({lookback_days} day lookback)")
+    print(f"Rows copied: {report['rowscopied']}, of which re-read overlap: {overlap} ({share:.0%})")
+    print(f"Overlap rows that changed silver: {report['latearrivals']} late arrivals, {report['corrections']} corrections")
+    print(f"Overlap rows skipped as duplicates: {overlap - report['latearrivals'] - report['corrections']}")
+    print(f"Read time: {report['readseconds']:.3f}s; silver.bookings version {report['silverversion']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the watermark bookings load locally and report what the lookback overlap cost.")
+    parser.add_argument("--lookback-days", type=int, default=DEFAULTS["bookings_lookback_days"], help="Days re-read before the watermark")
+    parser.add_argument("--seed", action="store_true", help="Reset the SQLite bookings table and monitor files first")
+    args = parser.parse_args()
+
+    if args.lookback_days < 0:
+        raise RuntimeError("--lookback-days must be 0 or more.")
+    repo_root = get_repo_root()
+    lake_root = get_lake_root(repo_root)
+    sqlite_path = get_sqlite_path(lake_root)
+    if args.seed:
+        seed_sql(repo_root, sqlite_path)
+        seed_monitor(repo_root, lake_root)
+    run_incremental_load(lake_root, sqlite_path, args.lookback_days)
@@ -0,0 +1,184 @@
+import codecs
+import json
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\r\n"
+NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JsonStreamReader:
+    # Incremental reader for a top-level JSON array or object. Memory is bounded by the
+    # largest single element plus one chunk, regardless of the document size.
+    def __init__(self, stream, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.byte_decoder = None
+
+    def _read_chunk(self):
+        raw = self.stream.read(self.chunk_size)
+        if not isinstance(raw, bytes):
+            return raw, not raw
+        if self.byte_decoder is None:
+            self.byte_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        return self.byte_decoder.decode(raw, final=not raw), not raw
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk, raw_empty = self._read_chunk()
+        if raw_empty:
+            self.eof = True
+            return False
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found '{found or 'end of input'}'.")
+        self.pos += 1
+
+    def _number_may_continue(self, value, end):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return end == len(self.buffer) or self.buffer[end] in NUMBER_CHARS
+
+    def _decode_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if self._number_may_continue(value, end) and self._fill():
+                # A number cut at the chunk edge ("-1." of "-1.5e3") decodes as a shorter value.
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            separator = self._peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found '{separator or 'end of input'}'.")
+
+    def iter_records(self):
+        # A top-level array yields its elements; otherwise consecutive top-level values
+        # (a single object or ADF's setOfObjects JSON lines) are yielded in order.
+        if self._peek() == "[":
+            yield from self.iter_array()
+            return
+        while self._peek():
+            yield self._decode_value()
+
+    def iter_object_members(self):
+        self._expect("{")
+        if self._peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self._decode_value()
+            self._expect(":")
+            yield key, self._decode_value()
+            separator = self._peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON object, found '{separator or 'end of input'}'.")
+
+
+def is_url(source):
+    return isinstance(source, str) and source.lower().startswith(("http://", "https://"))
+
+
+@contextmanager
+def open_json_source(source, timeout=60):
+    if hasattr(source, "read"):
+        yield source
+        return
+    if is_url(source):
+        with urllib.request.urlopen(source, timeout=timeout) as response:
+            yield response
+        return
+    with Path(source).open("rb") as handle:
+        yield handle
+
+
+def iter_json_array(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    with open_json_source(source) as stream:
+        yield from JsonStreamReader(stream, chunk_size).iter_array()
+
+
+def iter_json_values(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    with open_json_source(source) as stream:
+        yield from JsonStreamReader(stream, chunk_size).iter_records()
+
+
+def iter_json_array_batches(source, batch_size=1000, chunk_size=DEFAULT_CHUNK_SIZE):
+    batch = []
+    for item in iter_json_array(source, chunk_size):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_object_members(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    with open_json_source(source) as stream:
+        yield from JsonStreamReader(stream, chunk_size).iter_object_members()
+
+
+def read_json_member(source, member_name, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Stops at the requested member, so large trailing members (e.g. tfstate "resources") are never parsed.
+    for key, value in iter_json_object_members(source, chunk_size):
+        if key == member_name:
+            return value
+    return None
+
+
+def write_json_array(path, items, indent=None):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    count = 0
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        handle.write("[")
+        for item in items:
+            handle.write(",\n" if count else "\n")
+            handle.write(json.dumps(item, indent=indent))
+            count += 1
+        handle.write("\n]\n" if count else "]\n")
+    tmp_path.replace(path)
+    return count
@@ -0,0 +1,408 @@
+import json
+import os
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+from file_index import FileStats, can_skip, may_hold_any, new_report
+from stacks import DEFAULTS
+
+LOG_DIR_NAME = "_delta_log"
+CHANGE_DIR_NAME = "_change_data"
+CHANGE_TYPE_FIELD = "_change_type"
+COMMIT_VERSION_FIELD = "_commit_version"
+
+INSERT = "insert"
+UPDATE_PREIMAGE = "update_preimage"
+UPDATE_POSTIMAGE = "update_postimage"
+DELETE = "delete"
+
+SILVER_TABLES = {
+    "airline": {
+        "keys": ["airline_id"],
+        "source": "dataflow_airline_source_file",
+        "sink": "dataflow_airline_sink_file",
+        "bloom": ["airline_id"],
+    },
+    "flight": {"keys": ["flight_id"], "source": "dataflow_flight_source_file", "sink": "dataflow_flight_sink_file"},
+    "passenger": {
+        "keys": ["passenger_id"],
+        "source": "dataflow_passenger_source_file",
+        "sink": "dataflow_passenger_sink_file",
+        "bloom": ["passenger_id"],
+    },
+    "airport": {"keys": ["airport_id"], "source": "dataflow_airport_source_file", "sink": "dataflow_airport_sink_file"},
+    "bookings": {
+        "keys": ["booking_id"],
+        "source": "dataflow_bookings_source_file",
+        "sink": "dataflow_bookings_sink_file",
+        # Point lookups by booking or passenger prune files through per-file bloom filters.
+        "bloom": ["booking_id", "passenger_id"],
+    },
+}
+# Silver tables built from other silver tables by scripts/bookings_enriched.py, not from bronze.
+DERIVED_TABLES = {
+    "bookings_enriched": {
+        "keys": ["booking_id"],
+        "sink": "dataflow_bookings_enriched_sink_file",
+        "bloom": ["booking_id", "passenger_id"],
+    },
+}
+
+
+def get_repo_root():
+    return Path(__file__).resolve().parent.parent
+
+
+def get_lake_root(repo_root=None):
+    env_value = os.environ.get("LOCAL_LAKE_DIR")
+    if env_value:
+        return Path(env_value)
+    return (repo_root or get_repo_root()) / ".local_lake"
+
+
+def table_path(lake_root, container, folder, name):
+    return Path(lake_root) / container / folder / name
+
+
+def bronze_path(lake_root, file_key):
+    return table_path(
+        lake_root,
+        DEFAULTS["dataflow_source_container"],
+        DEFAULTS["dataflow_source_folder"],
+        DEFAULTS[file_key],
+    )
+
+
+def bronze_source_path(lake_root, table):
+    path = bronze_path(lake_root, SILVER_TABLES[table]["source"])
+    # Without a local parquet writer the seeded bookings land as CSV next to the parquet name.
+    if not path.exists() and path.with_suffix(".csv").exists():
+        return path.with_suffix(".csv")
+    return path
+
+
+def silver_table_dir(lake_root, table):
+    spec = SILVER_TABLES.get(table) or DERIVED_TABLES[table]
+    return table_path(
+        lake_root,
+        DEFAULTS["dataflow_sink_container"],
+        DEFAULTS["dataflow_sink_folder"],
+        DEFAULTS[spec["sink"]],
+    )
+
+
+def to_int(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return int(value) if value else None
+
+
+def to_decimal_text(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return str(Decimal(str(value).strip()).quantize(Decimal("0.01")))
+
+
+def to_cents(value):
+    if value is None or str(value).strip() == "":
+        return 0
+    return int((Decimal(str(value).strip()) * 100).to_integral_value())
+
+
+def log_file_name(version):
+    return f"{version:020d}.json"
+
+
+def list_versions(table_dir):
+    log_dir = Path(table_dir) / LOG_DIR_NAME
+    if not log_dir.exists():
+        return []
+    versions = []
+    for path in log_dir.glob("*.json"):
+        if path.stem.isdigit():
+            versions.append(int(path.stem))
+    return sorted(versions)
+
+
+def get_table_version(table_dir):
+    versions = list_versions(table_dir)
+    return versions[-1] if versions else -1
+
+
+def table_exists(table_dir):
+    return get_table_version(table_dir) >= 0
+
+
+def read_commit(table_dir, version):
+    path = Path(table_dir) / LOG_DIR_NAME / log_file_name(version)
+    actions = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            actions.append(json.loads(line))
+    return actions
+
+
+class ConcurrentWriteError(RuntimeError):
+    pass
+
+
+def commit(table_dir, actions, operation, expected_version=None):
+    # A stale expected_version and a lost race on the version file raise the same error.
+    log_dir = Path(table_dir) / LOG_DIR_NAME
+    log_dir.mkdir(parents=True, exist_ok=True)
+    current = get_table_version(table_dir)
+    if expected_version is not None and current != expected_version:
+        raise ConcurrentWriteError(
+            f"Concurrent write to {table_dir}: expected version {expected_version}, found {current}."
+        )
+    version = current + 1
+    commit_info = {"commitInfo": {"timestamp": int(time.time() * 1000), "operation": operation}}
+    lines = [json.dumps(action, separators=(",", ":")) for action in list(actions) + [commit_info]]
+    path = log_dir / log_file_name(version)
+    # O_EXCL makes the version file the commit point: a racing writer fails instead of overwriting.
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        raise ConcurrentWriteError(
+            f"Concurrent write to {table_dir}: version {version} was committed by another writer."
+        ) from None
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        handle.write("\n".join(lines) + "\n")
+    return version
+
+
+def active_files(table_dir, version=None):
+    files = {}
+    for current in list_versions(table_dir):
+        if version is not None and current > version:
+            break
+        for action in read_commit(table_dir, current):
+            if "add" in action:
+                files[action["add"]["path"]] = action["add"]
+            elif "remove" in action:
+                files.pop(action["remove"]["path"], None)
+    return files
+
+
+def read_file_rows(table_dir, rel_path):
+    with (Path(table_dir) / rel_path).open("r", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_rows(table_dir, version=None):
+    for rel_path in active_files(table_dir, version):
+        yield from read_file_rows(table_dir, rel_path)
+
+
+def read_rows_where(table_dir, column, value, version=None, report=None):
+    # Equality lookup that skips files by their min/max stats and bloom filters before opening them.
+    report = report if report is not None else new_report()
+    for rel_path, add in active_files(table_dir, version).items():
+        report["files"] += 1
+        if can_skip(table_dir, add, column, value, report):
+            continue
+        report["files_read"] += 1
+        for row in read_file_rows(table_dir, rel_path):
+            report["rows_read"] += 1
+            if row.get(column) == value or str(row.get(column)) == str(value):
+                yield row
+
+
+def read_rows_in(table_dir, column, values, version=None):
+    # Rows whose column holds one of values; files whose stats and bloom filters rule out every
+    # value are not opened.
+    values = {value for value in values if value is not None}
+    if not values:
+        return
+    for rel_path, add in active_files(table_dir, version).items():
+        if not may_hold_any(table_dir, add, column, list(values)):
+            continue
+        for row in read_file_rows(table_dir, rel_path):
+            if row.get(column) in values:
+                yield row
+
+
+def write_rows_file(table_dir, rel_dir, rows, prefix="part"):
+    target_dir = Path(table_dir) / rel_dir if rel_dir else Path(table_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    file_name = f"{prefix}-{uuid.uuid4().hex}.jsonl"
+    path = target_dir / file_name
+    count = 0
+    with path.open("w", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row, separators=(",", ":")) + "\n")
+            count += 1
+    rel_path = f"{rel_dir}/{file_name}" if rel_dir else file_name
+    return rel_path, count, path.stat().st_size
+
+
+def add_action(rel_path, count, size, stats=None, index_path=None, tags=None):
+    add = {
+        "path": rel_path,
+        "size": size,
+        "modificationTime": int(time.time() * 1000),
+        "dataChange": True,
+        "stats": json.dumps({"numRecords": count, **(stats or {})}),
+    }
+    tags = dict(tags or {}, **({"bloomIndex": index_path} if index_path else {}))
+    if tags:
+        add["tags"] = tags
+    return {"add": add}
+
+
+def write_data_file(table_dir, rows, bloom_columns=(), tags=None):
+    file_stats = FileStats(bloom_columns)
+    rel_path, count, size = write_rows_file(table_dir, "", file_stats.track(rows))
+    return add_action(rel_path, count, size, *file_stats.finish(table_dir, rel_path), tags)
+
+
+def remove_action(rel_path):
+    return {"remove": {"path": rel_path, "deletionTimestamp": int(time.time() * 1000), "dataChange": True}}
+
+
+def overwrite_table(table_dir, rows, bloom_columns=()):
+    existing = active_files(table_dir)
+    file_stats = FileStats(bloom_columns)
+    rel_path, count, size = write_rows_file(table_dir, "", file_stats.track(rows))
+    actions = [remove_action(path) for path in existing]
+    actions.append(add_action(rel_path, count, size, *file_stats.finish(table_dir, rel_path)))
+    commit(table_dir, actions, "WRITE")
+    return count
+
+
+def row_key(row, keys):
+    return tuple(row.get(key) for key in keys)
+
+
+def upsert_table(table_dir, rows, keys, deletes=(), bloom_columns=()):
+    # Mirrors the silver delta sinks (alterRow upsertIf + keys): only files holding a matched
+    # key are rewritten, unchanged rows are skipped and every change is recorded in _change_data.
+    incoming = {}
+    for row in rows:
+        incoming[row_key(row, keys)] = row
+    delete_keys = {row_key(row, keys) for row in deletes}
+    touched_keys = set(incoming) | delete_keys
+    base_version = get_table_version(table_dir)
+
+    # With a bloom filter on a single-column key, files that cannot hold a touched key are not read.
+    key_column = keys[0] if len(keys) == 1 and keys[0] in bloom_columns else None
+    touched_values = [key[0] for key in touched_keys] if key_column else []
+
+    changes = []
+    actions = []
+    kept_unchanged = set()
+    for rel_path, add in active_files(table_dir).items():
+        if key_column and not may_hold_any(table_dir, add, key_column, touched_values):
+            continue
+        file_rows = list(read_file_rows(table_dir, rel_path))
+        if not any(row_key(row, keys) in touched_keys for row in file_rows):
+            continue
+        survivors = []
+        rewritten = False
+        for row in file_rows:
+            key = row_key(row, keys)
+            if key in delete_keys:
+                changes.append(dict(row, **{CHANGE_TYPE_FIELD: DELETE}))
+                rewritten = True
+            elif key in incoming:
+                new_row = incoming[key]
+                if new_row == row:
+                    kept_unchanged.add(key)
+                    survivors.append(row)
+                    continue
+                changes.append(dict(row, **{CHANGE_TYPE_FIELD: UPDATE_PREIMAGE}))
+                changes.append(dict(new_row, **{CHANGE_TYPE_FIELD: UPDATE_POSTIMAGE}))
+                kept_unchanged.add(key)
+                survivors.append(new_row)
+                rewritten = True
+            else:
+                survivors.append(row)
+        if not rewritten:
+            continue
+        actions.append(remove_action(rel_path))
+        if survivors:
+            actions.append(write_data_file(table_dir, survivors, bloom_columns))
+
+    inserted = [row for key, row in incoming.items() if key not in kept_unchanged]
+    for row in inserted:
+        changes.append(dict(row, **{CHANGE_TYPE_FIELD: INSERT}))
+    if inserted:
+        actions.append(write_data_file(table_dir, inserted, bloom_columns))
+
+    if not changes and table_exists(table_dir):
+        return {"version": base_version, "changes": 0}
+    if changes:
+        rel_path, count, size = write_rows_file(table_dir, CHANGE_DIR_NAME, changes, prefix="cdc")
+        actions.append({"cdc": {"path": rel_path, "size": size, "dataChange": False}})
+    version = commit(table_dir, actions, "MERGE", expected_version=base_version)
+    return {"version": version, "changes": len(changes)}
+
+
+def read_changes(table_dir, start_version, end_version=None):
+    for version in list_versions(table_dir):
+        if version <= start_version:
+            continue
+        if end_version is not None and version > end_version:
+            break
+        for action in read_commit(table_dir, version):
+            if "cdc" not in action:
+                continue
+            for row in read_file_rows(table_dir, action["cdc"]["path"]):
+                row[COMMIT_VERSION_FIELD] = version
+                yield row
+
+
+def has_full_change_feed(table_dir, start_version, end_version=None):
+    # A plain overwrite leaves no change data behind, so consumers must fall back to a full scan.
+    for version in list_versions(table_dir):
+        if version <= start_version:
+            continue
+        if end_version is not None and version > end_version:
+            break
+        actions = read_commit(table_dir, version)
+        data_changed = any("add" in action or "remove" in action for action in actions)
+        has_cdc = any("cdc" in action for action in actions)
+        if data_changed and not has_cdc:
+            return False
+    return True
+
+
+def write_file_atomic(path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8", newline="") as handle:
+        count = write(handle)
+    tmp_path.replace(path)
+    return count
+
+
+def write_json_lines(handle, rows):
+    # JsonSink writes the setOfObjects pattern: one object per line.
+    count = 0
+    for row in rows:
+        handle.write(json.dumps(row, default=str) + "\n")
+        count += 1
+    return count
+
+
+def write_json_atomic(path, payload):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def read_json_optional(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,68 @@
+import argparse
+import time
+
+from airport_ingest import ingest_airports
+from gold_sales import refresh_gold_sales
+from local_lake import bronze_path, get_lake_root, get_repo_root
+from pipeline_dag import COMPLETED, SUCCEEDED, Activity, pipeline_status, print_report, run_dag
+from silver_flow import run_silver_flow, seed_bookings, seed_http_files
+from stacks import DEFAULTS
+
+# Same activity names and fan-in as terraform/09_adf_pipeline_master.
+BRONZE_BRANCHES = {
+    "http": "ExecuteHttpCsvPipeline",
+    "airport": "ExecuteAirportJsonPipeline",
+    "bookings": "ExecuteBookingsPipeline",
+}
+SILVER_ACTIVITY = "ExecuteSilverDataflowPipeline"
+GOLD_ACTIVITY = "ExecuteGoldDataflowPipeline"
+
+
+def parse_policy(values):
+    policy = dict(DEFAULTS["master_bronze_failure_policy"])
+    for value in values or []:
+        branch, _, condition = value.partition("=")
+        if branch not in BRONZE_BRANCHES or condition not in (SUCCEEDED, COMPLETED):
+            raise RuntimeError(f"Invalid policy '{value}'; expected <http|airport|bookings>=<Succeeded|Completed>.")
+        policy[branch] = condition
+    return policy
+
+
+def failing(branch):
+    def action():
+        raise RuntimeError(f"Injected failure in the {branch} branch.")
+
+    return action
+
+
+def build_master_dag(repo_root, lake_root, policy, airport_source=None, fail=()):
+    airport_source = airport_source or repo_root / "data" / "DimAirport.json"
+    actions = {
+        "http": lambda: seed_http_files(repo_root, lake_root),
+        "airport": lambda: ingest_airports(airport_source, bronze_path(lake_root, "dataflow_airport_source_file")),
+        "bookings": lambda: seed_bookings(repo_root, lake_root),
+    }
+    activities = []
+    for branch, name in BRONZE_BRANCHES.items():
+        activities.append(Activity(name, failing(branch) if branch in fail else actions[branch]))
+    fan_in = {name: [policy.get(branch, SUCCEEDED)] for branch, name in BRONZE_BRANCHES.items()}
+    activities.append(Activity(SILVER_ACTIVITY, lambda: run_silver_flow(lake_root), fan_in))
+    activities.append(Activity(GOLD_ACTIVITY, lambda: refresh_gold_sales(lake_root), {SILVER_ACTIVITY: [SUCCEEDED]}))
+    return activities
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the master pipeline DAG against the local lake.")
+    parser.add_argument("--policy", action="append", help="Override a bronze failure policy, e.g. airport=Succeeded")
+    parser.add_argument("--airport-source", help="Airport JSON URL or file (default: data/DimAirport.json)")
+    parser.add_argument("--fail", choices=sorted(BRONZE_BRANCHES), action="append", default=[], help="Inject a failure into a bronze branch")
+    parser.add_argument("--max-concurrency", type=int, help="Limit concurrently running activities")
+    args = parser.parse_args()
+
+    repo_root = get_repo_root()
+    activities = build_master_dag(repo_root, get_lake_root(repo_root), parse_policy(args.policy), args.airport_source, args.fail)
+    started = time.perf_counter()
+    results = run_dag(activities, args.max_concurrency)
+    print_report(activities, results, time.perf_counter() - started)
+    if pipeline_status(activities, results) != SUCCEEDED:
+        raise SystemExit(1)
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+SUCCEEDED = "Succeeded"
+FAILED = "Failed"
+SKIPPED = "Skipped"
+COMPLETED = "Completed"
+
+
+class Activity:
+    __slots__ = ("name", "action", "depends_on")
+
+    def __init__(self, name, action, depends_on=None):
+        # depends_on maps an upstream activity name to its ADF dependencyConditions.
+        self.name = name
+        self.action = action
+        self.depends_on = dict(depends_on or {})
+
+
+def condition_met(status, conditions):
+    for condition in conditions:
+        if condition == status:
+            return True
+        if condition == COMPLETED and status in (SUCCEEDED, FAILED):
+            return True
+    return False
+
+
+def topological_order(activities):
+    by_name = {activity.name: activity for activity in activities}
+    if len(by_name) != len(activities):
+        raise RuntimeError("Activity names must be unique.")
+    for activity in activities:
+        for upstream in activity.depends_on:
+            if upstream not in by_name:
+                raise RuntimeError(f"Activity '{activity.name}' depends on unknown activity '{upstream}'.")
+    ordered = []
+    visiting = set()
+    done = set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise RuntimeError(f"Dependency cycle through activity '{name}'.")
+        visiting.add(name)
+        for upstream in by_name[name].depends_on:
+            visit(upstream)
+        visiting.discard(name)
+        done.add(name)
+        ordered.append(by_name[name])
+
+    for activity in activities:
+        visit(activity.name)
+    return ordered
+
+
+async def run_dag_async(activities, max_concurrency=None):
+    ordered = topological_order(activities)
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    results = {}
+    tasks = {}
+    origin = time.perf_counter()
+
+    async def run_activity(activity):
+        for upstream in activity.depends_on:
+            await tasks[upstream]
+        blocked = [
+            upstream
+            for upstream, conditions in activity.depends_on.items()
+            if not condition_met(results[upstream]["status"], conditions)
+        ]
+        if blocked:
+            results[activity.name] = {"status": SKIPPED, "blocked_by": blocked, "start": None, "duration": 0.0}
+            return
+        if semaphore:
+            await semaphore.acquire()
+        start = time.perf_counter() - origin
+        try:
+            if asyncio.iscoroutinefunction(activity.action):
+                output = await activity.action()
+            else:
+                # Blocking stand-ins (file copies, lake writes) each get a worker thread.
+                output = await asyncio.to_thread(activity.action)
+            results[activity.name] = {"status": SUCCEEDED, "output": output}
+        except Exception as exc:
+            results[activity.name] = {"status": FAILED, "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            if semaphore:
+                semaphore.release()
+        results[activity.name]["start"] = start
+        results[activity.name]["duration"] = time.perf_counter() - origin - start
+
+    for activity in ordered:
+        tasks[activity.name] = asyncio.create_task(run_activity(activity))
+    await asyncio.gather(*tasks.values())
+    return results
+
+
+def run_dag(activities, max_concurrency=None):
+    return asyncio.run(run_dag_async(activities, max_concurrency))
+
+
+def pipeline_status(activities, results):
+    # Like ADF, a failure only fails the pipeline when no downstream activity ran on its failure path.
+    for activity in activities:
+        if results[activity.name]["status"] != FAILED:
+            continue
+        handled = any(
+            activity.name in downstream.depends_on
+            and condition_met(FAILED, downstream.depends_on[activity.name])
+            and results[downstream.name]["status"] != SKIPPED
+            for downstream in activities
+        )
+        if not handled:
+            return FAILED
+    return SUCCEEDED
+
+
+def print_report(activities, results, elapsed):
+    for activity in topological_order(activities):
+        result = results[activity.name]
+        line = f"{activity.name}: {result['status']}"
+        if result["start"] is not None:
+            line += f" at +{result['start']:.3f}s for {result['duration']:.3f}s"
+        if result.get("error"):
+            line += f" ({result['error']})"
+        if result.get("blocked_by"):
+            line += f" (blocked by {', '.join(result['blocked_by'])})"
+        print(line)
+    busy = sum(result["duration"] for result in results.values())
+    print(f"Pipeline {pipeline_status(activities, results)} in {elapsed:.3f}s ({busy:.3f}s of activity time)")
@@ -0,0 +1,526 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import re
+import shutil
+import sqlite3
+import time
+import urllib.request
+import uuid
+from collections import ChainMap
+from pathlib import Path
+
+from adf_expressions import evaluate
+from gold_sales import refresh_gold_sales
+from json_stream import iter_json_values, read_json_member
+from local_lake import get_lake_root, get_repo_root, table_path, write_file_atomic, write_json_lines
+from pipeline_dag import FAILED, SKIPPED, SUCCEEDED, Activity, pipeline_status, run_dag_async
+from silver_flow import BOOKING_COLUMNS, BOOKING_INT_COLUMNS, read_seed_bookings, run_silver_flow
+from stacks import DEFAULTS
+
+PIPELINE_RESOURCE_TYPE = "Microsoft.DataFactory/factories/pipelines"
+DATASET_RESOURCE_TYPE = "Microsoft.DataFactory/factories/datasets"
+AZURERM_DATASET_TYPES = {
+    "azurerm_data_factory_dataset_json": "Json",
+    "azurerm_data_factory_dataset_parquet": "Parquet",
+    "azurerm_data_factory_dataset_delimited_text": "DelimitedText",
+    "azurerm_data_factory_dataset_azure_sql_table": "AzureSqlTable",
+}
+# ExecuteDataFlow activities are matched to the local engine by data flow name prefix.
+DATAFLOW_RUNNERS = {
+    "dataflow_name_prefix": run_silver_flow,
+    "gold_dataflow_name_prefix": refresh_gold_sales,
+}
+RAW_URL_PATTERN = re.compile(r"/refs/heads/[^/]+/(.+)$")
+SQL_DATETIME_CAST = re.compile(r"\bAS\s+(?:datetime2|datetime|smalldatetime|date)\s*\)", re.IGNORECASE)
+# SQL Server change tracking, emulated in SQLite by the triggers from enable_change_tracking.
+CHANGETABLE_PATTERN = re.compile(r"CHANGETABLE\(\s*CHANGES\s+(\w+)\s*,\s*(-?\d+)\s*\)", re.IGNORECASE)
+CHANGE_TRACKING_FUNCTIONS = [
+    (re.compile(r"CHANGE_TRACKING_CURRENT_VERSION\(\s*\)", re.IGNORECASE), "(SELECT current_version FROM change_tracking_version)"),
+    (re.compile(r"CHANGE_TRACKING_MIN_VALID_VERSION\(\s*OBJECT_ID\('[\w.]+'\)\s*\)", re.IGNORECASE), "(SELECT min_valid_version FROM change_tracking_version)"),
+]
+
+
+def parse_body(body):
+    return json.loads(body) if isinstance(body, str) else body
+
+
+def azurerm_location(attributes):
+    for block_name, location_type, root_name in (
+        ("azure_blob_fs_location", "AzureBlobFSLocation", "file_system"),
+        ("azure_blob_storage_location", "AzureBlobStorageLocation", "container"),
+    ):
+        blocks = attributes.get(block_name) or []
+        if blocks:
+            return {
+                "type": location_type,
+                "container": blocks[0].get(root_name),
+                "folderPath": blocks[0].get("path"),
+                "fileName": blocks[0].get("filename"),
+            }
+    blocks = attributes.get("http_server_location") or []
+    if blocks:
+        parts = [blocks[0].get(name) for name in ("relative_url", "path", "filename")]
+        return {"type": "HttpServerLocation", "relativeUrl": "/".join(part.strip("/") for part in parts if part)}
+    return {}
+
+
+def azurerm_dataset(resource_type, attributes):
+    # azurerm datasets are stored as provider attributes; reshape them like the ADF JSON the azapi ones use.
+    dataset_type = AZURERM_DATASET_TYPES[resource_type]
+    parameters = {name: {"type": kind} for name, kind in (attributes.get("parameters") or {}).items()}
+    if dataset_type == "AzureSqlTable":
+        type_properties = {"schema": attributes.get("schema"), "table": attributes.get("table")}
+    else:
+        type_properties = {"location": azurerm_location(attributes)}
+    return {"type": dataset_type, "parameters": parameters, "typeProperties": type_properties}
+
+
+def load_definitions_from_state(repo_root, workspace=None):
+    pipelines = {}
+    datasets = {}
+    for tf_dir in sorted((repo_root / "terraform").iterdir()):
+        if workspace:
+            state_path = tf_dir / "terraform.tfstate.d" / workspace / "terraform.tfstate"
+        else:
+            state_path = tf_dir / "terraform.tfstate"
+        if not state_path.exists():
+            continue
+        for resource in read_json_member(state_path, "resources") or []:
+            for instance in resource.get("instances", []):
+                attributes = instance.get("attributes") or {}
+                if resource.get("type") in AZURERM_DATASET_TYPES:
+                    datasets[attributes["name"]] = azurerm_dataset(resource["type"], attributes)
+                elif resource.get("type") == "azapi_resource":
+                    azure_type = (attributes.get("type") or "").split("@")[0]
+                    if azure_type == PIPELINE_RESOURCE_TYPE:
+                        pipelines[attributes["name"]] = parse_body(attributes["body"])["properties"]
+                    elif azure_type == DATASET_RESOURCE_TYPE:
+                        datasets[attributes["name"]] = parse_body(attributes["body"])["properties"]
+    return pipelines, datasets
+
+
+def load_definitions_from_dir(path):
+    # Same layout as an ADF git repository: pipeline/<name>.json and dataset/<name>.json.
+    loaded = {}
+    for folder in ("pipeline", "dataset"):
+        loaded[folder] = {}
+        for file_path in sorted((Path(path) / folder).glob("*.json")):
+            document = json.loads(file_path.read_text(encoding="utf-8-sig"))
+            loaded[folder][document.get("name", file_path.stem)] = document["properties"]
+    return loaded["pipeline"], loaded["dataset"]
+
+
+def sql_to_sqlite(query, schema):
+    query = SQL_DATETIME_CAST.sub("AS TEXT)", query)
+    if schema:
+        query = re.sub(rf"\b{re.escape(schema)}\.", "", query)
+    query = CHANGETABLE_PATTERN.sub(
+        lambda match: f"(SELECT * FROM {match.group(1)}_changes WHERE SYS_CHANGE_VERSION > {match.group(2)})", query
+    )
+    for pattern, replacement in CHANGE_TRACKING_FUNCTIONS:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+def get_sqlite_path(lake_root):
+    return Path(lake_root) / "sql" / f"{DEFAULTS['sql_database_name']}.db"
+
+
+def create_bookings_table(connection, table, with_index=True):
+    columns = []
+    for column in BOOKING_COLUMNS:
+        if column == "booking_id":
+            columns.append(f"{column} INTEGER PRIMARY KEY")
+        elif column in BOOKING_INT_COLUMNS:
+            columns.append(f"{column} INTEGER")
+        elif column == "ticket_cost":
+            columns.append(f"{column} REAL")
+        else:
+            columns.append(f"{column} TEXT")
+    connection.execute(f"DROP TABLE IF EXISTS {table}")
+    connection.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+    if with_index:
+        create_booking_date_index(connection, table)
+
+
+def create_booking_date_index(connection, table):
+    # Same index as IX_FactBookings_booking_date in sql_scripts/fact_bookings_full.sql.
+    connection.execute(f"CREATE INDEX IF NOT EXISTS IX_{table}_booking_date ON {table} (booking_date)")
+
+
+def enable_change_tracking(connection, table):
+    # Stand-in for ENABLE CHANGE_TRACKING in fact_bookings_full.sql: every changed row bumps the
+    # version and keeps the last operation per booking_id, like CHANGETABLE(CHANGES ...).
+    connection.executescript(f"""
+        DROP TABLE IF EXISTS change_tracking_version;
+        CREATE TABLE change_tracking_version (current_version INTEGER, min_valid_version INTEGER);
+        INSERT INTO change_tracking_version VALUES (0, 0);
+        DROP TABLE IF EXISTS {table}_changes;
+        CREATE TABLE {table}_changes (booking_id INTEGER PRIMARY KEY, SYS_CHANGE_VERSION INTEGER, SYS_CHANGE_OPERATION TEXT);
+    """)
+    for event, row, operation in (("INSERT", "NEW", "I"), ("UPDATE", "NEW", "U"), ("DELETE", "OLD", "D")):
+        connection.execute(f"""
+            CREATE TRIGGER {table}_track_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE change_tracking_version SET current_version = current_version + 1;
+                INSERT OR REPLACE INTO {table}_changes
+                SELECT {row}.booking_id, current_version, '{operation}' FROM change_tracking_version;
+            END
+        """)
+
+
+def seed_sql(repo_root, sqlite_path):
+    # Stand-in for sql_scripts/fact_bookings_full.sql against the Azure SQL database.
+    sqlite_path.parent.mkdir(parents=True, exist_ok=True)
+    table = DEFAULTS["bookings_sql_table"]
+    with sqlite3.connect(sqlite_path) as connection:
+        create_bookings_table(connection, table)
+        rows = read_seed_bookings(repo_root / "sql_scripts" / "fact_bookings_full.sql")
+        connection.executemany(
+            f"INSERT INTO {table} VALUES ({', '.join('?' for _ in BOOKING_COLUMNS)})",
+            ([row[column] for column in BOOKING_COLUMNS] for row in rows),
+        )
+        enable_change_tracking(connection, table)
+    print(f"Seeded {sqlite_path}")
+
+
+def seed_monitor(repo_root, lake_root):
+    # Stand-in for the monitor blobs uploaded by 02_storage_account.
+    for folder_key, file_key in (
+        ("monitor_empty_folder", "monitor_empty_file"),
+        ("monitor_lastload_folder", "monitor_lastload_file"),
+        ("monitor_lastversion_folder", "monitor_lastversion_file"),
+    ):
+        target = table_path(lake_root, DEFAULTS["monitor_container"], DEFAULTS[folder_key], DEFAULTS[file_key])
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(repo_root / "sql_scripts" / DEFAULTS[file_key], target)
+        print(f"Seeded {target}")
+
+
+def write_csv_rows(handle, rows):
+    writer = None
+    count = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(handle, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def apply_translator(row, translator):
+    if not isinstance(translator, dict) or not translator.get("mappings"):
+        return row
+    return {mapping["sink"]["name"]: row.get(mapping["source"]["name"]) for mapping in translator["mappings"]}
+
+
+def iteration_state(state):
+    # ADF scopes the results of a ForEach's inner activities to their iteration; activities
+    # outside the loop stay visible through the parent map.
+    return dict(state, activities=ChainMap({}, state["activities"]))
+
+
+class PipelineRunner:
+    def __init__(self, pipelines, datasets, lake_root, repo_root, sqlite_path, online=False, max_concurrency=None):
+        self.pipelines = pipelines
+        self.datasets = datasets
+        self.lake_root = Path(lake_root)
+        self.repo_root = Path(repo_root)
+        self.sqlite_path = Path(sqlite_path)
+        self.online = online
+        self.max_concurrency = max_concurrency
+        self.runs = []
+        self.origin = time.perf_counter()
+        self.handlers = {
+            "Lookup": self.lookup,
+            "IfCondition": self.if_condition,
+            "Copy": self.copy,
+            "ForEach": self.for_each,
+            "ExecutePipeline": self.execute_pipeline,
+            "ExecuteDataFlow": self.execute_data_flow,
+            "WebActivity": self.web_activity,
+        }
+
+    def find_pipeline(self, name):
+        if name in self.pipelines:
+            return name
+        # Deployed names carry a random suffix, so a unique prefix is accepted too.
+        matches = [candidate for candidate in self.pipelines if candidate.startswith(name)]
+        if len(matches) != 1:
+            raise RuntimeError(f"Pipeline '{name}' matched {len(matches)} loaded pipelines: {sorted(self.pipelines)}")
+        return matches[0]
+
+    async def run_pipeline(self, name, parameters=None, parent_path=""):
+        name = self.find_pipeline(name)
+        properties = self.pipelines[name]
+        values = {key: spec.get("defaultValue") for key, spec in (properties.get("parameters") or {}).items()}
+        values.update(parameters or {})
+        state = {"pipeline": {"Pipeline": name, "RunId": str(uuid.uuid4()), "parameters": values}, "activities": {}}
+        path = f"{parent_path}/{name}" if parent_path else name
+        return await self.run_activities(properties.get("activities") or [], state, path)
+
+    def make_scope(self, state, item=None):
+        return {
+            "pipeline": lambda: state["pipeline"],
+            "activity": lambda name: self.activity_result(state, name),
+            "item": lambda: item,
+        }
+
+    def activity_result(self, state, name):
+        if name not in state["activities"]:
+            raise ValueError(f"Activity '{name}' has not run in this pipeline.")
+        return state["activities"][name]
+
+    async def run_activities(self, definitions, state, path, item=None):
+        activities = []
+        for definition in definitions:
+            depends_on = {
+                dependency["activity"]: dependency.get("dependencyConditions") or [SUCCEEDED]
+                for dependency in definition.get("dependsOn") or []
+            }
+            activities.append(Activity(definition["name"], self.activity_action(definition, state, path, item), depends_on))
+        results = await run_dag_async(activities, self.max_concurrency)
+        for activity in activities:
+            if results[activity.name]["status"] == SKIPPED:
+                self.runs.append((None, 0.0, SKIPPED, "", f"{path}/{activity.name}", ""))
+        return pipeline_status(activities, results)
+
+    def activity_action(self, definition, state, path, item):
+        async def action():
+            handler = self.handlers.get(definition["type"])
+            if handler is None:
+                raise RuntimeError(f"Unsupported activity type '{definition['type']}' for '{definition['name']}'.")
+            activity_path = f"{path}/{definition['name']}"
+            started = time.perf_counter()
+            output = None
+            status = FAILED
+            error = ""
+            try:
+                output = await handler(definition, state, activity_path, item)
+                status = SUCCEEDED
+                return output
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                raise
+            finally:
+                state["activities"][definition["name"]] = {"status": status, "output": output}
+                self.runs.append(
+                    (started - self.origin, time.perf_counter() - started, status, definition["type"], activity_path, error)
+                )
+
+        return action
+
+    def resolve_dataset(self, reference, scope):
+        name = reference["referenceName"]
+        if name not in self.datasets:
+            raise RuntimeError(f"Dataset '{name}' not found in the loaded definitions.")
+        definition = self.datasets[name]
+        parameters = {key: spec.get("defaultValue") for key, spec in (definition.get("parameters") or {}).items()}
+        parameters.update(evaluate(reference.get("parameters") or {}, scope))
+        type_properties = evaluate(definition.get("typeProperties") or {}, dict(scope, dataset=lambda: parameters))
+        return {"name": name, "type": definition.get("type"), "typeProperties": type_properties}
+
+    def resolve_url(self, url):
+        if self.online:
+            return url
+        # Offline, raw GitHub URLs for this repository resolve to the checked-out file.
+        match = RAW_URL_PATTERN.search(url)
+        local_path = self.repo_root / match.group(1) if match else None
+        if local_path is None or not local_path.exists():
+            raise RuntimeError(f"No local copy of {url}; rerun with --online.")
+        return local_path
+
+    def dataset_location(self, dataset):
+        location = dataset["typeProperties"].get("location") or {}
+        if location.get("type") == "HttpServerLocation":
+            return self.resolve_url(f"{DEFAULTS['http_base_url'].rstrip('/')}/{location['relativeUrl'].lstrip('/')}")
+        container = location.get("fileSystem") or location.get("container")
+        return table_path(self.lake_root, container, location.get("folderPath") or "", location["fileName"])
+
+    def open_text(self, location):
+        if isinstance(location, Path):
+            return location.open("r", encoding="utf-8-sig", newline="")
+        return io.TextIOWrapper(urllib.request.urlopen(location, timeout=60), encoding="utf-8-sig", newline="")
+
+    def query_sql(self, dataset, source):
+        properties = dataset["typeProperties"]
+        query = source.get("sqlReaderQuery") or f"SELECT * FROM {properties['table']}"
+        with sqlite3.connect(self.sqlite_path) as connection:
+            connection.row_factory = sqlite3.Row
+            cursor = connection.execute(sql_to_sqlite(query, properties.get("schema")))
+            return [dict(row) for row in cursor]
+
+    def read_rows(self, dataset, source):
+        if dataset["type"] == "AzureSqlTable":
+            yield from self.query_sql(dataset, source)
+            return
+        location = self.dataset_location(dataset)
+        if dataset["type"] == "Json":
+            yield from iter_json_values(location)
+            return
+        if dataset["type"] == "Parquet":
+            location = location.with_suffix(".csv") if not location.exists() else location
+            if location.suffix == ".parquet":
+                raise RuntimeError(f"Reading parquet stand-ins is not supported: {location}")
+        with self.open_text(location) as handle:
+            yield from csv.DictReader(handle)
+
+    def write_rows(self, dataset, rows):
+        if dataset["type"] == "AzureSqlTable":
+            raise RuntimeError(f"SQL sinks are not supported locally ({dataset['name']}).")
+        path = self.dataset_location(dataset)
+        if dataset["type"] == "Json":
+            return path, write_file_atomic(path, lambda handle: write_json_lines(handle, rows))
+        if dataset["type"] == "Parquet":
+            # Without a parquet writer the rows land as CSV next to the parquet name, which the
+            # local bronze readers pick up (see local_lake.bronze_source_path).
+            path = path.with_suffix(".csv")
+        return path, write_file_atomic(path, lambda handle: write_csv_rows(handle, rows))
+
+    def copy_rows(self, source_dataset, sink_dataset, properties):
+        started = time.perf_counter()
+        source = properties.get("source") or {}
+        extra = {column["name"]: column.get("value") for column in source.get("additionalColumns") or []}
+        translator = properties.get("translator")
+        rows = (dict(apply_translator(row, translator), **extra) for row in self.read_rows(source_dataset, source))
+        path, count = self.write_rows(sink_dataset, rows)
+        return {
+            "rowsRead": count,
+            "rowsCopied": count,
+            "dataWritten": path.stat().st_size,
+            "copyDuration": round(time.perf_counter() - started),
+            "sink": str(path),
+        }
+
+    async def lookup(self, definition, state, path, item):
+        scope = self.make_scope(state, item)
+        properties = evaluate(definition["typeProperties"], scope)
+        dataset = self.resolve_dataset(definition["typeProperties"]["dataset"], scope)
+        source = properties.get("source") or {}
+        if properties.get("firstRowOnly", True):
+            row = await asyncio.to_thread(lambda: next(self.read_rows(dataset, source), None))
+            return {"firstRow": row} if row is not None else {}
+        rows = await asyncio.to_thread(lambda: list(self.read_rows(dataset, source)))
+        return {"count": len(rows), "value": rows}
+
+    async def if_condition(self, definition, state, path, item):
+        properties = definition["typeProperties"]
+        outcome = bool(evaluate(properties["expression"], self.make_scope(state, item)))
+        branch = properties.get("ifTrueActivities" if outcome else "ifFalseActivities") or []
+        if await self.run_activities(branch, state, path, item) != SUCCEEDED:
+            raise RuntimeError(f"The {'true' if outcome else 'false'} branch failed.")
+        return {"expression": outcome}
+
+    async def copy(self, definition, state, path, item):
+        scope = self.make_scope(state, item)
+        properties = evaluate(definition["typeProperties"], scope)
+        source_dataset = self.resolve_dataset(definition["inputs"][0], scope)
+        sink_dataset = self.resolve_dataset(definition["outputs"][0], scope)
+        return await asyncio.to_thread(self.copy_rows, source_dataset, sink_dataset, properties)
+
+    async def for_each(self, definition, state, path, item):
+        properties = definition["typeProperties"]
+        items = evaluate(properties["items"], self.make_scope(state, item)) or []
+        inner = properties.get("activities") or []
+        if properties.get("isSequential"):
+            statuses = []
+            for index, value in enumerate(items):
+                statuses.append(await self.run_activities(inner, iteration_state(state), f"{path}[{index}]", value))
+        else:
+            batch = asyncio.Semaphore(properties.get("batchCount") or 20)
+
+            async def run_item(index, value):
+                async with batch:
+                    return await self.run_activities(inner, iteration_state(state), f"{path}[{index}]", value)
+
+            statuses = await asyncio.gather(*(run_item(index, value) for index, value in enumerate(items)))
+        failed = statuses.count(FAILED)
+        if failed:
+            raise RuntimeError(f"{failed} of {len(items)} iterations failed.")
+        return {"iterations": len(items)}
+
+    async def execute_pipeline(self, definition, state, path, item):
+        properties = definition["typeProperties"]
+        scope = self.make_scope(state, item)
+        name = properties["pipeline"]["referenceName"]
+        parameters = evaluate(properties.get("parameters") or {}, scope)
+        status = await self.run_pipeline(name, parameters, path)
+        if status != SUCCEEDED:
+            raise RuntimeError(f"Pipeline '{name}' {status.lower()}.")
+        return {"pipelineName": name, "status": status}
+
+    async def execute_data_flow(self, definition, state, path, item):
+        name = evaluate(definition["typeProperties"]["dataflow"]["referenceName"], self.make_scope(state, item))
+        for prefix_key, runner in DATAFLOW_RUNNERS.items():
+            if name.startswith(DEFAULTS[prefix_key]):
+                await asyncio.to_thread(runner, self.lake_root)
+                return {"dataflow": name}
+        raise RuntimeError(f"No local stand-in for data flow '{name}'.")
+
+    async def web_activity(self, definition, state, path, item):
+        properties = evaluate(definition["typeProperties"], self.make_scope(state, item))
+        location = self.resolve_url(properties["url"])
+        if isinstance(location, Path):
+            size = location.stat().st_size
+        else:
+            with urllib.request.urlopen(location, timeout=60) as response:
+                size = len(response.read())
+        return {"url": properties["url"], "bytes": size}
+
+    def print_report(self):
+        for start, duration, status, activity_type, path, error in sorted(self.runs, key=lambda run: (run[0] is None, run[0] or 0)):
+            timing = f"+{start:.3f}s {duration:8.3f}s" if start is not None else " " * 17
+            print(f"{timing}  {status:<9} {activity_type:<16} {path}" + (f" ({error})" if error else ""))
+
+
+def parse_parameters(values):
+    parameters = {}
+    for value in values or []:
+        key, _, raw = value.partition("=")
+        try:
+            parameters[key] = json.loads(raw)
+        except json.JSONDecodeError:
+            parameters[key] = raw
+    return parameters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the deployed ADF pipeline definitions against local stand-ins.")
+    parser.add_argument("pipeline", nargs="?", default=DEFAULTS["master_pipeline_name_prefix"], help="Pipeline name or unique prefix")
+    parser.add_argument("--definitions", help="Folder with pipeline/*.json and dataset/*.json (default: read terraform state)")
+    parser.add_argument("--workspace", help="Terraform workspace whose state holds the definitions")
+    parser.add_argument("--param", action="append", help="Pipeline parameter override, key=value (JSON values allowed)")
+    parser.add_argument("--online", action="store_true", help="Fetch HTTP sources instead of using the repository copies")
+    parser.add_argument("--seed", action="store_true", help="Reset the SQLite bookings table and monitor files first")
+    parser.add_argument("--max-concurrency", type=int, help="Limit concurrently running activities per container")
+    parser.add_argument("--list", action="store_true", help="List loaded pipelines and exit")
+    args = parser.parse_args()
+
+    repo_root = get_repo_root()
+    lake_root = get_lake_root(repo_root)
+    if args.definitions:
+        pipelines, datasets = load_definitions_from_dir(args.definitions)
+    else:
+        pipelines, datasets = load_definitions_from_state(repo_root, args.workspace)
+    if not pipelines:
+        raise RuntimeError("No pipeline definitions found. Deploy the stacks or pass --definitions.")
+    if args.list:
+        for name in sorted(pipelines):
+            print(name)
+        raise SystemExit(0)
+
+    sqlite_path = get_sqlite_path(lake_root)
+    if args.seed:
+        seed_sql(repo_root, sqlite_path)
+        seed_monitor(repo_root, lake_root)
+    runner = PipelineRunner(pipelines, datasets, lake_root, repo_root, sqlite_path, args.online, args.max_concurrency)
+    started = time.perf_counter()
+    status = asyncio.run(runner.run_pipeline(args.pipeline, parse_parameters(args.param)))
+    runner.print_report()
+    print(f"Pipeline {runner.find_pipeline(args.pipeline)}: {status} in {time.perf_counter() - started:.3f}s")
+    if status != SUCCEEDED:
+        raise SystemExit(1)
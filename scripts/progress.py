@@ -0,0 +1,205 @@
+import contextlib
+import re
+import sys
+import threading
+import time
+
+from stacks import get_upstream_stacks
+
+LOG_DIR_NAME = ".deploy_logs"
+REFRESH_SECONDS = 1.0
+# Phases are read off the commands being run and the Terraform output they produce.
+COMMAND_PHASES = {"init": "initing", "apply": "planning", "destroy": "planning"}
+OUTPUT_PHASES = [
+    ("applying", re.compile(r": (?:Creating|Modifying|Destroying|Still \w+)\.\.\.")),
+    ("planning", re.compile(r": Refreshing state\.\.\.|Terraform will perform")),
+]
+APPLY_SUMMARY = re.compile(r"Apply complete! Resources: (\d+) added, (\d+) changed, (\d+) destroyed")
+ACTIVE = {"board": None}
+
+
+class ProgressBoard:
+    def __init__(self, stacks, log_dir, console):
+        self.rows = {name: {"phase": "queued", "started": None, "finished": None, "changes": [0, 0, 0]} for name in stacks}
+        self.log_dir = log_dir
+        self.console = console
+        self.live = console.isatty()
+        self.current = None
+        self.log = None
+        self.drawn = 0
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def start_stack(self, name):
+        with self.lock:
+            self.close_log()
+            self.current = name
+            self.log = (self.log_dir / f"{name}.log").open("a", encoding="utf-8")
+            self.rows[name]["started"] = time.perf_counter()
+            self.set_phase(name, "initing")
+
+    def finish_stack(self, name, phase):
+        with self.lock:
+            row = self.rows[name]
+            row["started"] = row["started"] or time.perf_counter()
+            row["finished"] = time.perf_counter()
+            if name == self.current:
+                self.close_log()
+                self.current = None
+            self.set_phase(name, phase)
+
+    def command(self, cmd):
+        with self.lock:
+            self.write_log("\n$ " + " ".join(cmd) + "\n")
+            verb = next((part for part in cmd if part in COMMAND_PHASES), None)
+            if self.current and verb:
+                self.set_phase(self.current, COMMAND_PHASES[verb])
+
+    def write(self, line):
+        with self.lock:
+            self.write_log(line)
+            if not self.current:
+                return
+            summary = APPLY_SUMMARY.search(line)
+            if summary:
+                changes = self.rows[self.current]["changes"]
+                for index, count in enumerate(summary.groups()):
+                    changes[index] += int(count)
+            for phase, pattern in OUTPUT_PHASES:
+                if pattern.search(line) and self.rows[self.current]["phase"] != phase:
+                    self.set_phase(self.current, phase)
+                    break
+
+    def write_log(self, text):
+        if self.log is not None:
+            self.log.write(text)
+            self.log.flush()
+
+    def close_log(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def set_phase(self, name, phase):
+        self.rows[name]["phase"] = phase
+        if self.live:
+            self.render()
+        else:
+            # Piped output (CI, --envs children) gets one line per transition instead of redraws.
+            self.console.write(f"[+{time.perf_counter() - self.origin:6.1f}s] {name}: {self.describe(name)}\n")
+            self.console.flush()
+
+    def describe(self, name):
+        row = self.rows[name]
+        text = row["phase"]
+        if row["started"] is not None:
+            text += f" {(row['finished'] or time.perf_counter()) - row['started']:.1f}s"
+        if row["phase"] == "done":
+            text += " +{} ~{} -{}".format(*row["changes"])
+        return text
+
+    def render(self):
+        lines = [f"{name:<42} {self.describe(name)}" for name in self.rows]
+        lines.append(f"{'elapsed':<42} {time.perf_counter() - self.origin:.1f}s  (logs: {self.log_dir})")
+        if self.drawn:
+            self.console.write(f"\x1b[{self.drawn}F\x1b[J")
+        self.console.write("\n".join(lines) + "\n")
+        self.console.flush()
+        self.drawn = len(lines)
+
+    def refresh(self, stop):
+        while not stop.wait(REFRESH_SECONDS):
+            with self.lock:
+                self.render()
+
+
+def get_durations(rows):
+    return {
+        name: (row["finished"] or row["started"] or 0) - (row["started"] or 0)
+        for name, row in rows.items()
+    }
+
+
+def get_critical_path(rows):
+    # Longest chain through the registry's output dependencies: the wall-clock floor for this
+    # set of stacks, and the chain to shorten first to make deploys faster.
+    durations = get_durations(rows)
+    finish = {}
+    previous = {}
+    for name in rows:
+        upstreams = [upstream for upstream in get_upstream_stacks(name) if upstream in finish]
+        slowest = max(upstreams, key=finish.get, default=None)
+        previous[name] = slowest
+        finish[name] = durations[name] + (finish[slowest] if slowest else 0.0)
+    name = max(finish, key=finish.get, default=None)
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return list(reversed(path)), max(finish.values(), default=0.0)
+
+
+def print_progress_report(board, elapsed):
+    durations = get_durations(board.rows)
+    print("\nStack report:")
+    print(f"{'stack':<42} {'status':<8} {'duration':>9}  {'added':>5} {'changed':>7} {'destroyed':>9}")
+    for name, row in board.rows.items():
+        added, changed, destroyed = row["changes"]
+        print(f"{name:<42} {row['phase']:<8} {durations[name]:>8.1f}s  {added:>5} {changed:>7} {destroyed:>9}")
+    for name, row in board.rows.items():
+        if row["phase"] == "failed":
+            print(f"{name} failed; see {board.log_dir / (name + '.log')}")
+    path, length = get_critical_path(board.rows)
+    if path:
+        print(f"Critical path: {' -> '.join(path)} ({length:.1f}s)")
+    print(f"Wall clock: {elapsed:.1f}s (stacks are applied one at a time; the critical path is the floor)")
+    print(f"Logs: {board.log_dir}")
+
+
+def get_active_board():
+    return ACTIVE["board"]
+
+
+def start_stack(name):
+    if ACTIVE["board"] is not None:
+        ACTIVE["board"].start_stack(name)
+
+
+def finish_stack(name, phase="done"):
+    if ACTIVE["board"] is not None:
+        ACTIVE["board"].finish_stack(name, phase)
+
+
+@contextlib.contextmanager
+def track_progress(repo_root, stacks, enabled, label=None):
+    if not enabled:
+        yield None
+        return
+    run_name = time.strftime("%Y%m%d-%H%M%S") + (f"-{label}" if label else "")
+    log_dir = repo_root / LOG_DIR_NAME / run_name
+    log_dir.mkdir(parents=True, exist_ok=True)
+    board = ProgressBoard(stacks, log_dir, sys.stdout)
+    ACTIVE["board"] = board
+    stop = threading.Event()
+    ticker = threading.Thread(target=board.refresh, args=(stop,), daemon=True) if board.live else None
+    if board.live:
+        board.render()
+        ticker.start()
+    try:
+        # Everything else the deploy prints goes to the run log so the console only shows the board.
+        with (log_dir / "deploy.log").open("a", encoding="utf-8") as run_log, contextlib.redirect_stdout(run_log):
+            yield board
+    except BaseException:
+        if board.current is not None:
+            board.finish_stack(board.current, "failed")
+        raise
+    finally:
+        stop.set()
+        if ticker is not None:
+            ticker.join()
+        ACTIVE["board"] = None
+        with board.lock:
+            board.close_log()
+            if board.live:
+                board.render()
+        print_progress_report(board, time.perf_counter() - board.origin)
@@ -0,0 +1,78 @@
+import argparse
+import csv
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from bronze_readers import DEFAULT_BATCH_SIZE, RejectSink, load_dataflow_schemas, read_csv_batches
+from quality_gate import MAX_QUARANTINE_RATE, QUALITY_RULES, QualityGate, print_metrics
+from silver_flow import BOOKING_COLUMNS
+from watermark_bench import generate_bookings
+
+# Dimension keys generate_bookings draws from.
+REFERENCE_KEYS = {
+    ("airline", "airline_id"): set(range(1, 11)),
+    ("airport", "airport_id"): set(range(1, 11)),
+    ("passenger", "passenger_id"): set(range(1, 101)),
+    ("flight", "flight_id"): set(range(100, 201)),
+}
+# (column position, bad value) pairs cycled through the broken rows.
+BAD_VALUES = [
+    (7, -5.0),
+    (9, "Maybe"),
+    (8, 0),
+    (3, 99),
+    (1, 0),
+    (6, ""),
+]
+
+
+def write_bookings(path, rows, bad_rate, seed):
+    rng = random.Random(seed + 1)
+    broken = 0
+    started = time.perf_counter()
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(BOOKING_COLUMNS)
+        for booking in generate_bookings(rows, seed):
+            if rng.random() < bad_rate:
+                position, value = BAD_VALUES[broken % len(BAD_VALUES)]
+                booking = booking[:position] + (value,) + booking[position + 1:]
+                broken += 1
+            writer.writerow(booking)
+    print(f"Wrote {rows:,} bookings ({broken:,} broken) to {path.stat().st_size / 1e6:.0f} MB of CSV in {time.perf_counter() - started:.1f}s")
+
+
+def run_benchmark(rows, bad_rate, batch_size, seed):
+    work_dir = Path(tempfile.mkdtemp(prefix="quality_bench_"))
+    try:
+        path = work_dir / "fact_bookings.csv"
+        write_bookings(path, rows, bad_rate, seed)
+        schema = load_dataflow_schemas()["bookings"]
+        gate = QualityGate("bookings", QUALITY_RULES["bookings"], REFERENCE_KEYS)
+        started = time.perf_counter()
+        with RejectSink(work_dir / "quarantine.jsonl") as quarantine:
+            # The gate runs inside the read loop, so its own time is split off the total.
+            batches = sum(1 for _ in gate.stream(read_csv_batches(path, "bookings", schema, batch_size), quarantine, path))
+        elapsed = time.perf_counter() - started
+        read_seconds = elapsed - gate.seconds
+        print_metrics(gate.metrics(MAX_QUARANTINE_RATE))
+        print(
+            f"{batches} batches: bronze read {read_seconds:.1f}s, quality gate {gate.seconds:.2f}s "
+            f"({gate.seconds / read_seconds:.1%} overhead)"
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the quality gate against the bronze read on generated bookings.")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Bookings to generate")
+    parser.add_argument("--bad-rate", type=float, default=0.001, help="Share of rows given a bad value")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per typed bronze batch")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the generated bookings")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.bad_rate, args.batch_size, args.seed)
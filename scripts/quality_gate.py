@@ -0,0 +1,286 @@
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from bronze_readers import DEFAULT_BATCH_SIZE, RejectSink, load_dataflow_schemas, read_bronze_batches
+from columnar import BOOL, CENTS, DICT, INT, NULL_BOOL, NULL_INT
+from local_lake import SILVER_TABLES, bronze_source_path, get_lake_root, table_path, to_cents
+from stacks import DEFAULTS
+
+NOT_NULL = "not_null"
+RANGE = "range"
+ALLOWED = "allowed"
+EXISTS = "exists"
+QUARANTINE = "quarantine"
+WARN = "warn"
+QUALITY_FOLDER = "monitor/quality"
+# Share of a source's rows that may be quarantined before the gate stops its silver write.
+MAX_QUARANTINE_RATE = 0.01
+
+# Same rule ids as the assert transformations of 10_adf_dataflow_bronze_silver. Range, allowed and
+# exists rules let nulls through; the not_null rules catch those.
+QUALITY_RULES = {
+    "airline": [
+        {"id": "airline_id_not_null", "check": NOT_NULL, "column": "airline_id"},
+    ],
+    "flight": [
+        {"id": "flight_id_not_null", "check": NOT_NULL, "column": "flight_id"},
+    ],
+    "passenger": [
+        {"id": "passenger_id_not_null", "check": NOT_NULL, "column": "passenger_id"},
+        {"id": "gender_allowed", "check": ALLOWED, "column": "gender", "values": ["M", "F"]},
+        {"id": "age_range", "check": RANGE, "column": "age", "min": 0, "max": 120},
+    ],
+    "airport": [
+        {"id": "airport_id_not_null", "check": NOT_NULL, "column": "airport_id"},
+    ],
+    "bookings": [
+        {"id": "booking_id_not_null", "check": NOT_NULL, "column": "booking_id"},
+        {"id": "passenger_id_not_null", "check": NOT_NULL, "column": "passenger_id"},
+        {"id": "flight_id_not_null", "check": NOT_NULL, "column": "flight_id"},
+        {"id": "airline_id_not_null", "check": NOT_NULL, "column": "airline_id"},
+        {"id": "booking_date_not_null", "check": NOT_NULL, "column": "booking_date"},
+        {"id": "ticket_cost_range", "check": RANGE, "column": "ticket_cost", "min": "0.00", "max": "100000.00"},
+        {"id": "flight_duration_mins_range", "check": RANGE, "column": "flight_duration_mins", "min": 1, "max": 1440},
+        {"id": "checkin_status_allowed", "check": ALLOWED, "column": "checkin_status", "values": ["Yes", "No"]},
+        {"id": "airline_id_exists", "check": EXISTS, "column": "airline_id", "references": ("airline", "airline_id")},
+        {"id": "origin_airport_id_exists", "check": EXISTS, "column": "origin_airport_id", "references": ("airport", "airport_id")},
+        {"id": "destination_airport_id_exists", "check": EXISTS, "column": "destination_airport_id", "references": ("airport", "airport_id")},
+        # The sample facts reference 100 passengers and flights while the dimension files hold 10,
+        # so missing members are counted but the bookings still load (gold joins them to nulls).
+        {"id": "passenger_id_exists", "check": EXISTS, "column": "passenger_id", "references": ("passenger", "passenger_id"), "action": WARN},
+        {"id": "flight_id_exists", "check": EXISTS, "column": "flight_id", "references": ("flight", "flight_id"), "action": WARN},
+    ],
+}
+
+
+def get_quarantine_path(lake_root, table):
+    return table_path(lake_root, DEFAULTS["dataflow_source_container"], DEFAULTS["silver_quarantine_folder"], f"{table}.jsonl")
+
+
+def get_metrics_path(lake_root, table):
+    return table_path(lake_root, DEFAULTS["monitor_container"], QUALITY_FOLDER, f"{table}.jsonl")
+
+
+def load_reference_keys(lake_root, rules, schemas, batch_size=DEFAULT_BATCH_SIZE):
+    # Keys of the bronze dimension rows that pass their own rules, the same rows the ok<Stream>
+    # outputs of 10_adf_dataflow_bronze_silver hand to the bookings asserts. Dimensions without a
+    # bronze file are left out.
+    keys = {}
+    for rule in rules:
+        if rule["check"] == EXISTS and rule["references"] not in keys:
+            table, column = rule["references"]
+            path = bronze_source_path(lake_root, table)
+            if not path.exists():
+                continue
+            gate = QualityGate(table)
+            checked = gate.stream(read_bronze_batches(path, table, schemas[table], batch_size), RejectSink(), path)
+            keys[rule["references"]] = {row.get(column) for row in passed_rows(checked)}
+    return keys
+
+
+def null_value(column):
+    if column.kind in (INT, CENTS):
+        return NULL_INT
+    if column.kind == BOOL:
+        return NULL_BOOL
+    if column.kind == DICT:
+        return column.dictionary.codes.get(None)
+    return None
+
+
+def positions_in(data, bad):
+    if not bad:
+        return []
+    return [position for position, value in enumerate(data) if value in bad]
+
+
+def bad_codes(column, is_valid):
+    # Dictionary columns are checked once per distinct value, then matched on their integer codes.
+    return {code for code, value in enumerate(column.dictionary.values) if value is not None and not is_valid(value)}
+
+
+def check_not_null(column, rule, reference_keys):
+    null = null_value(column)
+    if null is None and column.kind == DICT:
+        return []
+    return positions_in(column.data, {null} if null in column.data else set())
+
+
+def check_range(column, rule, reference_keys):
+    low, high = rule["min"], rule["max"]
+    if column.kind == DICT:
+        return positions_in(column.data, bad_codes(column, lambda value: low <= value <= high))
+    if column.kind == CENTS:
+        low, high = to_cents(low), to_cents(high)
+    data = column.data
+    if not len(data):
+        return []
+    # min/max run in C; rows are only visited when a batch holds a value outside the range.
+    smallest = min(data)
+    if low <= smallest and max(data) <= high:
+        return []
+    null = null_value(column)
+    return [position for position, value in enumerate(data) if value != null and not low <= value <= high]
+
+
+def check_allowed(column, rule, reference_keys):
+    allowed = set(rule["values"])
+    if column.kind == DICT:
+        return positions_in(column.data, bad_codes(column, lambda value: value in allowed))
+    bad = set(column.data) - allowed
+    bad.discard(null_value(column))
+    return positions_in(column.data, bad)
+
+
+def check_exists(column, rule, reference_keys):
+    keys = reference_keys[rule["references"]]
+    if column.kind == DICT:
+        return positions_in(column.data, bad_codes(column, lambda value: value in keys))
+    bad = set(column.data) - keys
+    bad.discard(null_value(column))
+    return positions_in(column.data, bad)
+
+
+CHECKS = {
+    NOT_NULL: check_not_null,
+    RANGE: check_range,
+    ALLOWED: check_allowed,
+    EXISTS: check_exists,
+}
+
+
+class QualityGate:
+    def __init__(self, table, rules=None, reference_keys=None, skipped=()):
+        self.table = table
+        self.rules = QUALITY_RULES.get(table, []) if rules is None else rules
+        self.reference_keys = reference_keys or {}
+        self.skipped = list(skipped)
+        self.rows = 0
+        self.quarantined = 0
+        self.seconds = 0.0
+        self.failed = {rule["id"]: 0 for rule in self.rules}
+
+    def evaluate(self, batch):
+        # position -> ids of the quarantine rules the row failed; warn rules are only counted.
+        failed = {}
+        for rule in self.rules:
+            positions = CHECKS[rule["check"]](batch.column(rule["column"]), rule, self.reference_keys)
+            self.failed[rule["id"]] += len(positions)
+            if rule.get("action", QUARANTINE) == QUARANTINE:
+                for position in positions:
+                    failed.setdefault(position, []).append(rule["id"])
+        return failed
+
+    def stream(self, batches, quarantine, source=None):
+        # Yields each batch with the positions that failed as soon as it is checked; nothing is
+        # held back, so memory stays at one batch.
+        for batch in batches:
+            started = time.perf_counter()
+            failed = self.evaluate(batch)
+            for position in sorted(failed):
+                quarantine.write(source or self.table, self.rows + position + 1, ", ".join(failed[position]), batch.row(position).as_dict())
+            self.rows += len(batch)
+            self.quarantined += len(failed)
+            self.seconds += time.perf_counter() - started
+            yield batch, failed
+
+    def rate(self):
+        return self.quarantined / self.rows if self.rows else 0.0
+
+    def passed(self, max_rate):
+        return self.rate() <= max_rate
+
+    def metrics(self, max_rate):
+        return {
+            "table": self.table,
+            "checked_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rows": self.rows,
+            "quarantined": self.quarantined,
+            "max_quarantine_rate": max_rate,
+            "status": "passed" if self.passed(max_rate) else "blocked",
+            "gate_ms": round(self.seconds * 1000, 1),
+            "rules": {
+                rule["id"]: {"check": rule["check"], "column": rule["column"], "action": rule.get("action", QUARANTINE), "failed": self.failed[rule["id"]]}
+                for rule in self.rules
+            },
+            "skipped": self.skipped,
+        }
+
+
+def passed_rows(checked):
+    for batch, failed in checked:
+        for position in range(len(batch)):
+            if position not in failed:
+                yield batch.row(position).as_dict()
+
+
+def record_metrics(lake_root, metrics):
+    path = get_metrics_path(lake_root, metrics["table"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(metrics) + "\n")
+
+
+def new_gate(lake_root, table, schemas, batch_size=DEFAULT_BATCH_SIZE):
+    rules = QUALITY_RULES.get(table, [])
+    reference_keys = load_reference_keys(lake_root, rules, schemas, batch_size)
+    # An exists rule against a dimension without a bronze file would fail every row, e.g. when
+    # bookings are loaded on their own into a fresh lake; it is skipped until the file lands.
+    checked = []
+    skipped = []
+    for rule in rules:
+        if rule["check"] == EXISTS and rule["references"] not in reference_keys:
+            print(f"Warning: skipping {table} rule {rule['id']} because the bronze {rule['references'][0]} source is missing.")
+            skipped.append(rule["id"])
+        else:
+            checked.append(rule)
+    return QualityGate(table, checked, reference_keys, skipped)
+
+
+def gate_bronze(lake_root, table, schemas, batch_size, rejects, quarantine, max_rate=MAX_QUARANTINE_RATE):
+    # Passed rows stream to the silver writer batch by batch. upsert_table and merge_scd2 stage
+    # every row before they write a file, so the error raised after the last batch discards the
+    # staged write and leaves silver untouched.
+    path = bronze_source_path(lake_root, table)
+    gate = new_gate(lake_root, table, schemas, batch_size)
+
+    def checked_rows():
+        yield from passed_rows(gate.stream(read_bronze_batches(path, table, schemas[table], batch_size, rejects), quarantine, path))
+        record_metrics(lake_root, gate.metrics(max_rate))
+        if not gate.passed(max_rate):
+            raise RuntimeError(
+                f"Quality gate stopped silver.{table}: {gate.quarantined} of {gate.rows} rows ({gate.rate():.2%}) "
+                f"failed a quarantine rule, above {max_rate:.2%}. See {quarantine.path}."
+            )
+
+    return checked_rows(), gate
+
+
+def print_metrics(metrics):
+    print(
+        f"{metrics['table']}: {metrics['status']}, {metrics['quarantined']} of {metrics['rows']} rows quarantined, "
+        f"gate {metrics['gate_ms']:.1f} ms"
+    )
+    for rule_id, rule in metrics["rules"].items():
+        print(f"  {rule_id:<32} {rule['action']:<10} {rule['failed']:>10} failed")
+    for rule_id in metrics.get("skipped", []):
+        print(f"  {rule_id:<32} {'skipped':<10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the bronze sources against the silver data-quality rules without writing silver.")
+    parser.add_argument("--table", choices=sorted(SILVER_TABLES), action="append", help="Limit to a table")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per typed bronze batch")
+    parser.add_argument("--max-quarantine-rate", type=float, default=MAX_QUARANTINE_RATE, help="Share of rows that may fail")
+    args = parser.parse_args()
+
+    lake_root = get_lake_root()
+    schemas = load_dataflow_schemas()
+    for table in args.table or SILVER_TABLES:
+        gate = new_gate(lake_root, table, schemas, args.batch_size)
+        path = bronze_source_path(lake_root, table)
+        for _ in gate.stream(read_bronze_batches(path, table, schemas[table], args.batch_size), RejectSink(), path):
+            pass
+        print_metrics(gate.metrics(args.max_quarantine_rate))
@@ -0,0 +1,129 @@
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+RETRY_ATTEMPTS = int(os.environ.get("DEPLOY_RETRY_ATTEMPTS", "5"))
+RETRY_BUDGET = int(os.environ.get("DEPLOY_RETRY_BUDGET", "10"))
+RETRY_BASE_SECONDS = float(os.environ.get("DEPLOY_RETRY_BASE_SECONDS", "5"))
+RETRY_MAX_SECONDS = float(os.environ.get("DEPLOY_RETRY_MAX_SECONDS", "120"))
+# Only errors that go away on their own are retried; anything else (bad config, quota,
+# names already taken, which ARM also reports as 409) fails on the first attempt.
+TRANSIENT_ERRORS = [
+    ("throttled", re.compile(r"StatusCode=429|Status(?:Code)?:? 429|TooManyRequests|RequestsThrottled|RetryableError")),
+    ("conflict", re.compile(r"AnotherOperationInProgress|another operation is in progress|OperationPreempted", re.IGNORECASE)),
+    # Just-created resources and principals are not visible everywhere yet; only creates hit this.
+    ("not yet visible", re.compile(r"ParentResourceNotFound|PrincipalNotFound|ResourceGroupNotFound|StatusCode=404")),
+]
+BUDGET = {"remaining": RETRY_BUDGET, "used": 0}
+BUDGET_LOCK = threading.Lock()
+COMMANDS = {"running": set(), "cancelled": False}
+COMMANDS_LOCK = threading.Lock()
+
+
+def reset_retry_budget():
+    with BUDGET_LOCK:
+        BUDGET["remaining"] = RETRY_BUDGET
+        BUDGET["used"] = 0
+
+
+def take_retry():
+    with BUDGET_LOCK:
+        if BUDGET["remaining"] <= 0:
+            return False
+        BUDGET["remaining"] -= 1
+        BUDGET["used"] += 1
+        return True
+
+
+def clear_cancel():
+    with COMMANDS_LOCK:
+        COMMANDS["cancelled"] = False
+
+
+def cancel_commands():
+    # Used by the deploy session when its client is interrupted: running commands get the SIGINT
+    # the terminal would have sent (terraform then stops cleanly and releases its state lock),
+    # and no further command starts.
+    with COMMANDS_LOCK:
+        COMMANDS["cancelled"] = True
+        running = list(COMMANDS["running"])
+    for process in running:
+        process.send_signal(signal.SIGINT)
+
+
+def check_cancelled():
+    if COMMANDS["cancelled"]:
+        raise KeyboardInterrupt
+
+
+def classify_error(cmd, stderr):
+    for category, pattern in TRANSIENT_ERRORS:
+        if category == "not yet visible" and "apply" not in cmd:
+            continue
+        if pattern.search(stderr):
+            return category
+    return None
+
+
+def get_backoff_delay(attempt):
+    # Full jitter: parallel applies that were throttled together do not retry together.
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def run_streaming(cmd, output=None):
+    with COMMANDS_LOCK:
+        check_cancelled()
+        if output is not None:
+            # Captured runs (deploy --progress) send both streams to the output's log.
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+            stream = process.stdout
+        else:
+            # stdout goes straight to the terminal; stderr is echoed and kept for classification.
+            process = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True, errors="replace")
+            stream = process.stderr
+        COMMANDS["running"].add(process)
+    try:
+        lines = []
+        for line in stream:
+            if output is not None:
+                output.write(line)
+            else:
+                sys.stderr.write(line)
+                sys.stderr.flush()
+            lines.append(line)
+        returncode = process.wait()
+    finally:
+        with COMMANDS_LOCK:
+            COMMANDS["running"].discard(process)
+    check_cancelled()
+    return returncode, "".join(lines)
+
+
+def run_with_retries(cmd, output=None):
+    attempt = 0
+    while True:
+        if output is not None:
+            output.command(cmd)
+        else:
+            print("\n$ " + " ".join(cmd), flush=True)
+        returncode, stderr = run_streaming(cmd, output)
+        if returncode == 0:
+            return
+        category = classify_error(cmd, stderr)
+        if category is None or attempt + 1 >= RETRY_ATTEMPTS or not take_retry():
+            if category is not None:
+                print(f"Giving up after {attempt + 1} attempts ({BUDGET['used']} retries used this run).")
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+        delay = get_backoff_delay(attempt)
+        attempt += 1
+        print(
+            f"Transient error ({category}); retrying in {delay:.1f}s "
+            f"(attempt {attempt + 1}/{RETRY_ATTEMPTS}, {BUDGET['remaining']} retries left this run)"
+        )
+        time.sleep(delay)
+        check_cancelled()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+from local_lake import (
+    CHANGE_DIR_NAME,
+    CHANGE_TYPE_FIELD,
+    INSERT,
+    UPDATE_POSTIMAGE,
+    UPDATE_PREIMAGE,
+    active_files,
+    commit,
+    get_table_version,
+    read_file_rows,
+    remove_action,
+    row_key,
+    table_exists,
+    write_data_file,
+    write_rows_file,
+)
+from file_index import may_hold_any
+
+# Type 2 history for the silver dimensions, same columns as the scd2 sinks of
+# 10_adf_dataflow_bronze_silver. A key's first version is open towards the past, so bookings
+# older than the first load still find it; every later version starts when its change was loaded.
+EFFECTIVE_FROM = "effective_from"
+EFFECTIVE_TO = "effective_to"
+IS_CURRENT = "is_current"
+ROW_HASH = "row_hash"
+SCD2_COLUMNS = (EFFECTIVE_FROM, EFFECTIVE_TO, IS_CURRENT, ROW_HASH)
+OPEN_START = "1900-01-01 00:00:00"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Closed versions go to history files that later merges never open; only current files are
+# pruned by key, read and rewritten.
+SCD_TAG = "scd"
+CURRENT_FILES = "current"
+HISTORY_FILES = "history"
+
+
+def get_load_timestamp():
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def row_hash(row, tracked_columns):
+    payload = json.dumps([row.get(column) for column in tracked_columns], separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def current_version(row, tracked_columns, effective_from):
+    return dict(row, **{EFFECTIVE_FROM: effective_from, EFFECTIVE_TO: None, IS_CURRENT: True, ROW_HASH: row_hash(row, tracked_columns)})
+
+
+def get_file_kind(add):
+    return (add.get("tags") or {}).get(SCD_TAG)
+
+
+def merge_scd2(table_dir, rows, keys, tracked_columns, loaded_at=None, bloom_columns=()):
+    loaded_at = loaded_at or get_load_timestamp()
+    incoming = {}
+    for row in rows:
+        incoming[row_key(row, keys)] = row
+    hashes = {key: row_hash(row, tracked_columns) for key, row in incoming.items()}
+    base_version = get_table_version(table_dir)
+    key_column = keys[0] if len(keys) == 1 and keys[0] in bloom_columns else None
+    incoming_values = [key[0] for key in incoming] if key_column else []
+
+    changes = []
+    actions = []
+    closed = []
+    new_versions = []
+    seen = set()
+    converted = 0
+    for rel_path, add in active_files(table_dir).items():
+        kind = get_file_kind(add)
+        if kind == HISTORY_FILES:
+            continue
+        # Untagged files were written by the plain upsert sink and are converted on the first merge.
+        if kind == CURRENT_FILES and key_column and not may_hold_any(table_dir, add, key_column, incoming_values):
+            continue
+        survivors = []
+        rewritten = kind is None
+        for row in read_file_rows(table_dir, rel_path):
+            key = row_key(row, keys)
+            if IS_CURRENT not in row:
+                row = current_version(row, tracked_columns, OPEN_START)
+                converted += 1
+            if key not in incoming:
+                survivors.append(row)
+                continue
+            seen.add(key)
+            if row[ROW_HASH] == hashes[key]:
+                survivors.append(row)
+                continue
+            expired = dict(row, **{EFFECTIVE_TO: loaded_at, IS_CURRENT: False})
+            replacement = current_version(incoming[key], tracked_columns, loaded_at)
+            changes.append(dict(row, **{CHANGE_TYPE_FIELD: UPDATE_PREIMAGE}))
+            changes.append(dict(expired, **{CHANGE_TYPE_FIELD: UPDATE_POSTIMAGE}))
+            changes.append(dict(replacement, **{CHANGE_TYPE_FIELD: INSERT}))
+            closed.append(expired)
+            new_versions.append(replacement)
+            rewritten = True
+        if not rewritten:
+            continue
+        actions.append(remove_action(rel_path))
+        if survivors:
+            actions.append(write_data_file(table_dir, survivors, bloom_columns, {SCD_TAG: CURRENT_FILES}))
+
+    for key, row in incoming.items():
+        if key not in seen:
+            first = current_version(row, tracked_columns, OPEN_START)
+            changes.append(dict(first, **{CHANGE_TYPE_FIELD: INSERT}))
+            new_versions.append(first)
+    if new_versions:
+        actions.append(write_data_file(table_dir, new_versions, bloom_columns, {SCD_TAG: CURRENT_FILES}))
+    if closed:
+        actions.append(write_data_file(table_dir, closed, bloom_columns, {SCD_TAG: HISTORY_FILES}))
+
+    result = {"version": base_version, "changes": len(changes), "expired": len(closed), "converted": converted}
+    if not actions and table_exists(table_dir):
+        return result
+    if changes:
+        rel_path, count, size = write_rows_file(table_dir, CHANGE_DIR_NAME, changes, prefix="cdc")
+        actions.append({"cdc": {"path": rel_path, "size": size, "dataChange": False}})
+    result["version"] = commit(table_dir, actions, "MERGE", expected_version=base_version)
+    return result
+
+
+def build_history(rows, key_column):
+    # key -> (sorted effective_from values, matching rows); tables without history have one
+    # version per key.
+    versions = {}
+    for row in rows:
+        if row.get(key_column) is None:
+            continue
+        versions.setdefault(row[key_column], []).append((row.get(EFFECTIVE_FROM) or OPEN_START, row))
+    history = {}
+    for key, items in versions.items():
+        items.sort(key=lambda item: item[0])
+        history[key] = ([start for start, _ in items], [row for _, row in items])
+    return history
+
+
+def version_index(starts, moment):
+    # The version whose effective_from is the latest one at or before moment; a moment before the
+    # first version falls back to it.
+    return max(bisect_right(starts, moment or OPEN_START) - 1, 0)
+
+
+def row_as_of(history, key, moment):
+    entry = history.get(key)
+    if entry is None:
+        return None
+    starts, rows = entry
+    return rows[version_index(starts, moment)]
@@ -0,0 +1,275 @@
+import argparse
+import csv
+import re
+import shutil
+from pathlib import Path
+
+from bookings_enriched import ENRICHED_TABLE, refresh_enriched
+from bronze_readers import CHANGE_CAPTURE_COLUMNS, DEFAULT_BATCH_SIZE, RejectSink, load_dataflow_schemas
+from local_lake import (
+    SILVER_TABLES,
+    bronze_path,
+    bronze_source_path,
+    get_lake_root,
+    get_repo_root,
+    silver_table_dir,
+    table_exists,
+    to_decimal_text,
+    to_int,
+    upsert_table,
+)
+from quality_gate import MAX_QUARANTINE_RATE, gate_bronze, get_quarantine_path
+from scd2 import get_load_timestamp, merge_scd2
+from stacks import DEFAULTS
+
+BOOKING_COLUMNS = [
+    "booking_id",
+    "passenger_id",
+    "flight_id",
+    "airline_id",
+    "origin_airport_id",
+    "destination_airport_id",
+    "booking_date",
+    "ticket_cost",
+    "flight_duration_mins",
+    "checkin_status",
+]
+BOOKING_INT_COLUMNS = {
+    "booking_id",
+    "passenger_id",
+    "flight_id",
+    "airline_id",
+    "origin_airport_id",
+    "destination_airport_id",
+    "flight_duration_mins",
+}
+INSERT_PATTERN = re.compile(r"INSERT\s+INTO\s+\S*FactBookings\s+VALUES\s*\((.*)\)\s*;", re.IGNORECASE)
+
+
+def split_sql_values(text):
+    values = []
+    current = []
+    quoted = False
+    for char in text:
+        if char == "'":
+            quoted = not quoted
+            continue
+        if char == "," and not quoted:
+            values.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    values.append("".join(current).strip())
+    return values
+
+
+def read_seed_bookings(sql_path):
+    with Path(sql_path).open("r", encoding="utf-8") as handle:
+        for line in handle:
+            match = INSERT_PATTERN.search(line)
+            if not match:
+                continue
+            values = split_sql_values(match.group(1))
+            yield normalize_booking(dict(zip(BOOKING_COLUMNS, values)))
+
+
+def normalize_booking(row):
+    booking = {}
+    for column in BOOKING_COLUMNS:
+        value = row.get(column)
+        if column in BOOKING_INT_COLUMNS:
+            booking[column] = to_int(value)
+        elif column == "ticket_cost":
+            booking[column] = to_decimal_text(value)
+        else:
+            booking[column] = value
+    return booking
+
+
+def write_bookings_csv(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=BOOKING_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+HTTP_SEED_FILES = [
+    ("DimAirline.csv", "dataflow_airline_source_file"),
+    ("DimFlight.csv", "dataflow_flight_source_file"),
+    ("DimPassenger.csv", "dataflow_passenger_source_file"),
+]
+
+
+def seed_file(source, target):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, target)
+    print(f"Seeded {target}")
+
+
+def seed_http_files(repo_root, lake_root):
+    for file_name, file_key in HTTP_SEED_FILES:
+        seed_file(repo_root / "data" / file_name, bronze_path(lake_root, file_key))
+
+
+def seed_airport(repo_root, lake_root):
+    seed_file(repo_root / "data" / "DimAirport.json", bronze_path(lake_root, "dataflow_airport_source_file"))
+
+
+def seed_bookings(repo_root, lake_root):
+    bookings_target = bronze_path(lake_root, "dataflow_bookings_source_file").with_suffix(".csv")
+    write_bookings_csv(bookings_target, read_seed_bookings(repo_root / "sql_scripts" / "fact_bookings_full.sql"))
+    print(f"Seeded {bookings_target}")
+
+
+def seed_bronze(repo_root, lake_root):
+    seed_http_files(repo_root, lake_root)
+    seed_airport(repo_root, lake_root)
+    seed_bookings(repo_root, lake_root)
+
+
+def derive_airline(row):
+    return dict(
+        row,
+        airline_name_clean=(row.get("airline_name") or "").strip(),
+        country_upper=(row.get("country") or "").upper(),
+    )
+
+
+def derive_flight(row):
+    departure = row.get("departure_time")
+    arrival = row.get("arrival_time")
+    return dict(
+        row,
+        flight_prefix=(row.get("flight_number") or "")[:2],
+        departure_ts=f"1970-01-01 {departure}:00" if departure else None,
+        arrival_ts=f"1970-01-01 {arrival}:00" if arrival else None,
+    )
+
+
+# Codes outside the map (already quarantined by the gender_allowed rule) stay null instead of
+# defaulting to Female.
+GENDER_NAMES = {"M": "Male", "F": "Female"}
+
+
+def age_band(age):
+    if age is None:
+        return None
+    if age < 18:
+        return "child"
+    if age < 65:
+        return "adult"
+    return "senior"
+
+
+def derive_passenger(row):
+    return dict(
+        row,
+        full_name_clean=(row.get("full_name") or "").strip(),
+        gender_full=GENDER_NAMES.get(row.get("gender")),
+        age_band=age_band(row.get("age")),
+    )
+
+
+def derive_airport(row):
+    return dict(
+        row,
+        airport_name_clean=(row.get("airport_name") or "").strip(),
+        city_upper=(row.get("city") or "").upper(),
+    )
+
+
+def derive_booking(row):
+    booking_date = row.get("booking_date") or ""
+    return dict(
+        row,
+        ticket_cost=to_decimal_text(row.get("ticket_cost")),
+        booking_year=int(booking_date[:4]) if booking_date else None,
+        booking_month=int(booking_date[5:7]) if booking_date else None,
+        is_paid=row.get("checkin_status") == "Yes",
+    )
+
+
+DERIVATIONS = {
+    "airline": derive_airline,
+    "flight": derive_flight,
+    "passenger": derive_passenger,
+    "airport": derive_airport,
+    "bookings": derive_booking,
+}
+
+
+def get_rejects_path(lake_root, table):
+    return bronze_source_path(lake_root, table).parent / "_rejects" / f"{table}.jsonl"
+
+
+def read_bronze(lake_root, table, schemas, batch_size, rejects, quarantine, max_quarantine_rate):
+    # Rows stream through the derivations; the silver write is discarded unless the whole source
+    # passes the quality gate.
+    rows, gate = gate_bronze(lake_root, table, schemas, batch_size, rejects, quarantine, max_quarantine_rate)
+    derive = DERIVATIONS[table]
+    return (derive(row) for row in rows), gate
+
+
+def split_tombstones(rows):
+    # Same as the bookings sink's alterRow(deleteIf(is_deleted), upsertIf(true())) followed by
+    # the select that drops the change-capture columns.
+    upserts = []
+    deletes = []
+    for row in rows:
+        deleted = row.get("is_deleted")
+        row = {column: value for column, value in row.items() if column not in CHANGE_CAPTURE_COLUMNS}
+        (deletes if deleted else upserts).append(row)
+    return upserts, deletes
+
+
+def write_silver(lake_root, table, rows, schemas, loaded_at):
+    spec = SILVER_TABLES[table]
+    table_dir = silver_table_dir(lake_root, table)
+    bloom_columns = spec.get("bloom", ())
+    if table in DEFAULTS["silver_scd2_dimensions"]:
+        # Same as the scd2 branch of 10_adf_dataflow_bronze_silver: the row hash covers the source
+        # columns, the derived ones follow from them.
+        tracked = [field.name for field in schemas[table] if field.name not in spec["keys"]]
+        return merge_scd2(table_dir, rows, spec["keys"], tracked, loaded_at, bloom_columns)
+    upserts, deletes = split_tombstones(rows)
+    return upsert_table(table_dir, upserts, spec["keys"], deletes, bloom_columns)
+
+
+def run_silver_flow(lake_root, tables=None, batch_size=DEFAULT_BATCH_SIZE, loaded_at=None, max_quarantine_rate=MAX_QUARANTINE_RATE):
+    schemas = load_dataflow_schemas()
+    # One load timestamp per run, like currentUTC() in the data flow.
+    loaded_at = loaded_at or get_load_timestamp()
+    results = {}
+    for table in tables or SILVER_TABLES:
+        with RejectSink(get_rejects_path(lake_root, table)) as rejects, RejectSink(get_quarantine_path(lake_root, table)) as quarantine:
+            rows, gate = read_bronze(lake_root, table, schemas, batch_size, rejects, quarantine, max_quarantine_rate)
+            result = write_silver(lake_root, table, rows, schemas, loaded_at)
+            result["rejected"] = rejects.count
+            result["quarantined"] = gate.quarantined
+        results[table] = result
+        print(
+            f"silver.{table}: version {result['version']}, {result['changes']} change rows, "
+            f"{result['rejected']} rejected, {result['quarantined']} quarantined"
+        )
+    # Keeps the join index gold reads from in step with the tables just written.
+    if table_exists(silver_table_dir(lake_root, "bookings")):
+        results[ENRICHED_TABLE] = refresh_enriched(lake_root)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the bronze-to-silver data flow against the local lake.")
+    parser.add_argument("--seed", action="store_true", help="Copy data/ and the SQL seed rows into local bronze first")
+    parser.add_argument("--table", choices=sorted(SILVER_TABLES), action="append", help="Limit the run to a table")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per typed bronze batch")
+    parser.add_argument("--loaded-at", help="Load timestamp for new SCD2 versions (yyyy-MM-dd HH:mm:ss UTC, default now)")
+    parser.add_argument("--max-quarantine-rate", type=float, default=MAX_QUARANTINE_RATE, help="Share of a source's rows that may fail a quality rule before its silver write is stopped")
+    args = parser.parse_args()
+
+    repo_root = get_repo_root()
+    lake_root = get_lake_root(repo_root)
+    if args.seed:
+        seed_bronze(repo_root, lake_root)
+    run_silver_flow(lake_root, args.table, args.batch_size, args.loaded_at, args.max_quarantine_rate)
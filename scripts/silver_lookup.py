@@ -0,0 +1,140 @@
+import argparse
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from file_index import INDEX_DIR_NAME, new_report
+from local_lake import (
+    DERIVED_TABLES,
+    SILVER_TABLES,
+    commit,
+    get_lake_root,
+    read_rows,
+    read_rows_where,
+    silver_table_dir,
+    write_data_file,
+)
+from silver_flow import BOOKING_COLUMNS
+from watermark_bench import generate_bookings
+
+BENCH_FILES = 200
+# A passenger books about this many times, so their rows are spread over that many files.
+BOOKINGS_PER_PASSENGER = 20
+
+
+def full_scan(table_dir, column, value):
+    report = new_report()
+    started = time.perf_counter()
+    rows = []
+    for row in read_rows(table_dir):
+        report["rows_read"] += 1
+        if str(row.get(column)) == str(value):
+            rows.append(row)
+    report["ms"] = (time.perf_counter() - started) * 1000
+    return rows, report
+
+
+def pruned_scan(table_dir, column, value):
+    report = new_report()
+    started = time.perf_counter()
+    rows = list(read_rows_where(table_dir, column, value, report=report))
+    report["ms"] = (time.perf_counter() - started) * 1000
+    return rows, report
+
+
+def write_bench_table(table_dir, rows, files, seed):
+    # Files arrive in booking_id order, as incremental loads append them; passengers are spread out.
+    rng = random.Random(seed + 1)
+    passengers = max(1, rows // BOOKINGS_PER_PASSENGER)
+    bloom_columns = SILVER_TABLES["bookings"]["bloom"]
+    bookings = generate_bookings(rows, seed)
+    per_file = -(-rows // files)
+    started = time.perf_counter()
+    written = 0
+    while written < rows:
+        batch = []
+        for booking in bookings:
+            row = dict(zip(BOOKING_COLUMNS, booking))
+            row["passenger_id"] = rng.randint(1, passengers)
+            batch.append(row)
+            if len(batch) == per_file:
+                break
+        commit(table_dir, [write_data_file(table_dir, batch, bloom_columns)], "WRITE")
+        written += len(batch)
+    elapsed = time.perf_counter() - started
+    data_bytes = sum(path.stat().st_size for path in table_dir.glob("*.jsonl"))
+    index_bytes = sum(path.stat().st_size for path in (table_dir / INDEX_DIR_NAME).glob("*.json"))
+    print(f"Wrote {rows:,} bookings in {files} files in {elapsed:.1f}s: {data_bytes / 1e6:.1f} MB data, {index_bytes / 1e6:.2f} MB bloom index")
+    return passengers
+
+
+def measure(table_dir, column, values, scan_repeat):
+    results = {"full scan": [], "pruned": []}
+    for position, value in enumerate(values):
+        if position < scan_repeat:
+            results["full scan"].append(full_scan(table_dir, column, value))
+        results["pruned"].append(pruned_scan(table_dir, column, value))
+    # A pruned lookup must return exactly what the full scan finds.
+    for (expected, _), (actual, _) in zip(results["full scan"], results["pruned"]):
+        if sorted(row["booking_id"] for row in expected) != sorted(row["booking_id"] for row in actual):
+            raise RuntimeError(f"Pruned lookup on {column} returned different rows than the full scan.")
+    return results
+
+
+def print_results(column, results, files):
+    print(f"\n{column} lookups:")
+    print(f"  {'reader':<10} {'median ms':>10} {'files read':>11} {'rows read':>12} {'min/max skipped':>16} {'bloom skipped':>14}")
+    for label, runs in results.items():
+        reports = [report for _, report in runs]
+        files_read = statistics.mean(report["files_read"] for report in reports) if label == "pruned" else files
+        print(
+            f"  {label:<10} {statistics.median(report['ms'] for report in reports):>10.1f} {files_read:>11.1f} "
+            f"{statistics.mean(report['rows_read'] for report in reports):>12,.0f} "
+            f"{statistics.mean(report['minmax_pruned'] for report in reports):>16.1f} "
+            f"{statistics.mean(report['bloom_pruned'] for report in reports):>14.1f}"
+        )
+
+
+def run_benchmark(rows, files, lookups, scan_repeat, seed):
+    work_dir = Path(tempfile.mkdtemp(prefix="silver_lookup_bench_"))
+    try:
+        table_dir = work_dir / "fact_bookings"
+        passengers = write_bench_table(table_dir, rows, files, seed)
+        rng = random.Random(seed + 2)
+        booking_ids = [rng.randint(1, rows) for _ in range(lookups)]
+        passenger_ids = [rng.randint(1, passengers) for _ in range(lookups)]
+        for column, values in (("booking_id", booking_ids), ("passenger_id", passenger_ids)):
+            print_results(column, measure(table_dir, column, values, min(scan_repeat, lookups)), files)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point lookups on silver tables using per-file stats and bloom filters.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    find_parser = subparsers.add_parser("find", help="Rows of a silver table where column = value")
+    find_parser.add_argument("column", help="Column to match, e.g. booking_id or passenger_id")
+    find_parser.add_argument("value", help="Value to match")
+    find_parser.add_argument("--table", choices=sorted([*SILVER_TABLES, *DERIVED_TABLES]), default="bookings", help="Silver table")
+    bench_parser = subparsers.add_parser("bench", help="Compare pruned lookups with a full scan on generated bookings")
+    bench_parser.add_argument("--rows", type=int, default=10_000_000, help="Bookings to generate")
+    bench_parser.add_argument("--files", type=int, default=BENCH_FILES, help="Data files to spread them over")
+    bench_parser.add_argument("--lookups", type=int, default=20, help="Lookups per column")
+    bench_parser.add_argument("--scan-repeat", type=int, default=2, help="Full scans per column (they are slow)")
+    bench_parser.add_argument("--seed", type=int, default=7, help="Random seed for the generated bookings")
+    args = parser.parse_args()
+
+    if args.command == "find":
+        rows, report = pruned_scan(silver_table_dir(get_lake_root(), args.table), args.column, args.value)
+        for row in rows:
+            print(json.dumps(row))
+        print(
+            f"{len(rows)} rows in {report['ms']:.1f} ms: read {report['files_read']} of {report['files']} files "
+            f"({report['minmax_pruned']} skipped by min/max, {report['bloom_pruned']} by bloom filter)"
+        )
+    else:
+        run_benchmark(args.rows, args.files, args.lookups, args.scan_repeat, args.seed)
@@ -0,0 +1,648 @@
+import json
+import os
+import subprocess
+from pathlib import Path
+
+from json_stream import read_json_member
+
+# Written by scripts/storage_bench.py; applied with deploy.py --storage-settings.
+STORAGE_SETTINGS_FILE_NAME = "storage_settings.json"
+STORAGE_SETTING_KEYS = ("bookings_parquet_compression_codec", "silver_delta_optimized_write", "silver_delta_auto_compact")
+DEFAULTS = {
+    "resource_group_name_prefix": "rg-airline",
+    "location": "eastus2",
+    "storage_account_name_prefix": "stairline",
+    "account_replication_type": "LRS",
+    "account_tier": "Standard",
+    "public_network_access_enabled": True,
+    "is_hns_enabled": True,
+    "data_factory_name_prefix": "adf-airline",
+    "http_linked_service_name_prefix": "ls-http-airline",
+    "http_base_url": "https://raw.githubusercontent.com",
+    "http_authentication_type": "Anonymous",
+    "http_enable_certificate_validation": True,
+    "adls_linked_service_name_prefix": "ls-adls-airline",
+    "linked_services_description": "Linked services for HTTP source, SQL, and ADLS Gen2 sink",
+    "sql_linked_service_name_prefix": "ls-sql-airline",
+    "pipeline_name_prefix": "pl-airline-http",
+    "http_dataset_name_prefix": "ds_http_airline",
+    "sink_dataset_name_prefix": "ds_adls_bronze_airline",
+    "sink_file_system": "bronze",
+    "airport_pipeline_name_prefix": "pl-airline-airport-json",
+    "http_airport_dataset_name_prefix": "ds_http_airport_json",
+    "sink_airport_dataset_name_prefix": "ds_adls_bronze_airport_json",
+    "airport_url": "https://raw.githubusercontent.com/Ch3rry-Pi3-Data-Engineering/DataEng-Azure-Airline/refs/heads/main/data/DimAirport.json",
+    "airport_rel_url": "Ch3rry-Pi3-Data-Engineering/DataEng-Azure-Airline/refs/heads/main/data/DimAirport.json",
+    "airport_sink_folder": "airport",
+    "airport_sink_file": "airport.json",
+    "bookings_pipeline_name_prefix": "pl-airline-bookings",
+    "bookings_sql_dataset_name_prefix": "ds_sql_airline",
+    "bookings_json_dataset_name_prefix": "ds_json_airline",
+    "bookings_parquet_dataset_name_prefix": "ds_parquet_airline",
+    "monitor_container": "bronze",
+    "monitor_empty_folder": "monitor/emptyjson",
+    "monitor_empty_file": "empty.json",
+    "monitor_lastload_folder": "monitor/lastload",
+    "monitor_lastload_file": "last_load.json",
+    "monitor_lastversion_folder": "monitor/lastversion",
+    "monitor_lastversion_file": "last_version.json",
+    "monitor_state_folder": "monitor/state",
+    "bookings_sink_container": "bronze",
+    "bookings_sink_folder": "airport",
+    "bookings_sink_file": "fact_bookings.parquet",
+    "bookings_sql_schema": "dbo",
+    "bookings_sql_table": "FactBookings",
+    "bookings_change_capture_mode": "watermark",
+    "bookings_lookback_days": 3,
+    "bookings_parquet_compression_codec": "snappy",
+    "master_pipeline_name_prefix": "pl-airline-master",
+    "master_bronze_failure_policy": {"http": "Succeeded", "airport": "Completed", "bookings": "Succeeded"},
+    "silver_pipeline_name_prefix": "pl-airline-silver-dataflow",
+    "gold_pipeline_name_prefix": "pl-airline-gold-dataflow",
+    "dataflow_name_prefix": "df-airline-bronze-silver",
+    "dataflow_source_container": "bronze",
+    "dataflow_source_folder": "airport",
+    "dataflow_airline_source_file": "airline.csv",
+    "dataflow_flight_source_file": "flight.csv",
+    "dataflow_passenger_source_file": "passenger.csv",
+    "dataflow_airport_source_file": "airport.json",
+    "dataflow_bookings_source_file": "fact_bookings.parquet",
+    "dataflow_sink_container": "silver",
+    "dataflow_sink_folder": "airport",
+    "dataflow_airline_sink_file": "airline.parquet",
+    "dataflow_flight_sink_file": "flight.parquet",
+    "dataflow_passenger_sink_file": "passenger.parquet",
+    "dataflow_airport_sink_file": "airport.parquet",
+    "dataflow_bookings_sink_file": "fact_bookings.parquet",
+    "dataflow_bookings_enriched_sink_file": "bookings_enriched.parquet",
+    "silver_delta_optimized_write": False,
+    "silver_delta_auto_compact": False,
+    # Silver dimensions kept as SCD type 2 (effective_from/effective_to/is_current) instead of upserts.
+    "silver_scd2_dimensions": ["airline", "passenger"],
+    # Bronze sources must carry every column their source schema declares.
+    "silver_validate_schema": True,
+    # Rows failing a data-quality rule land here (source container) instead of silver.
+    "silver_quarantine_folder": "airport/_quarantine",
+    "gold_dataflow_name_prefix": "df-airline-gold-sales",
+    "gold_source_container": "silver",
+    "gold_source_folder": "airport",
+    "gold_airline_source_file": "airline.parquet",
+    "gold_bookings_source_file": "fact_bookings.parquet",
+    "gold_sink_container": "gold",
+    "gold_sink_folder": "airport",
+    "gold_sink_name": "airline_sales_top5",
+    "sql_server_name_prefix": "sql-airline",
+    "sql_admin_login": "sqladmin",
+    "sql_database_name": "airline-dev",
+    "sql_database_sku_name": "GP_S_Gen5_1",
+    "sql_max_size_gb": 1,
+    "sql_min_capacity": 0.5,
+    "sql_auto_pause_delay_in_minutes": 60,
+    "sql_public_network_access_enabled": True,
+    "sql_zone_redundant": False,
+}
+
+
+def default(key):
+    return ("default", key)
+
+
+def output(stack, name, fallback=None):
+    # fallback names a DEFAULTS key destroy may use once the upstream state is already gone.
+    return ("output", stack, name, fallback)
+
+
+def resolved(name, optional=False):
+    # Supplied by the calling script (secrets, identity, client IP); optional ones are omitted when None.
+    return ("resolve", name, optional)
+
+
+def literal(value):
+    return ("literal", value)
+
+
+# One spec per stack, in deploy order (every stack follows the stacks it reads outputs from).
+#   kind: how deploy applies it (pipeline/dataflow stacks target their azapi resource first)
+#   variables: terraform.tfvars entries and where each value comes from
+#   outputs: what the stack's outputs.tf produces
+#   destroy: always | if_state | allow_references (skip when ADF reports the resource still referenced)
+#   destroy_first: downstream stacks torn down before an --*-only destroy of this one
+STACKS = {
+    "01_resource_group": {
+        "flag": "--rg-only",
+        "description": "resource group stack",
+        "kind": "stack",
+        "variables": [
+            ("resource_group_name", literal(None)),
+            ("resource_group_name_prefix", default("resource_group_name_prefix")),
+            ("location", default("location")),
+        ],
+        "outputs": ["resource_group_name"],
+        "destroy": "always",
+    },
+    "02_storage_account": {
+        "flag": "--storage-only",
+        "description": "storage account stack",
+        "kind": "stack",
+        "variables": [
+            ("resource_group_name", output("01_resource_group", "resource_group_name")),
+            ("location", default("location")),
+            ("storage_account_name_prefix", default("storage_account_name_prefix")),
+            ("account_replication_type", default("account_replication_type")),
+            ("account_tier", default("account_tier")),
+            ("public_network_access_enabled", default("public_network_access_enabled")),
+            ("is_hns_enabled", default("is_hns_enabled")),
+            ("storage_blob_contributor_object_id", resolved("storage_blob_contributor_object_id", optional=True)),
+        ],
+        "outputs": [
+            "storage_account_name",
+            "storage_account_primary_access_key",
+            "primary_blob_endpoint",
+            "primary_dfs_endpoint",
+            "medallion_container_names",
+        ],
+        # Files outside terraform/ the stack uploads.
+        "extra_files": ["parameters/parameters.json", "sql_scripts/empty.json", "sql_scripts/last_load.json", "sql_scripts/last_version.json"],
+        "destroy": "always",
+    },
+    "07_sql_database": {
+        "flag": "--sql-only",
+        "description": "SQL server + database stack",
+        "kind": "stack",
+        "variables": [
+            ("resource_group_name", output("01_resource_group", "resource_group_name")),
+            ("location", default("location")),
+            ("sql_server_name_prefix", default("sql_server_name_prefix")),
+            ("sql_admin_login", resolved("sql_admin_login")),
+            ("sql_admin_password", resolved("sql_admin_password")),
+            ("azuread_admin_login", resolved("azuread_admin_login")),
+            ("azuread_admin_object_id", resolved("azuread_admin_object_id")),
+            ("client_ip_address", resolved("client_ip_address")),
+            ("database_name", default("sql_database_name")),
+            ("database_sku_name", default("sql_database_sku_name")),
+            ("max_size_gb", default("sql_max_size_gb")),
+            ("min_capacity", default("sql_min_capacity")),
+            ("auto_pause_delay_in_minutes", default("sql_auto_pause_delay_in_minutes")),
+            ("public_network_access_enabled", default("sql_public_network_access_enabled")),
+            ("zone_redundant", default("sql_zone_redundant")),
+        ],
+        "outputs": ["sql_server_id", "sql_server_name", "sql_server_fqdn", "sql_database_id", "sql_database_name"],
+        "destroy": "always",
+    },
+    "03_data_factory": {
+        "flag": "--datafactory-only",
+        "description": "data factory stack",
+        "kind": "stack",
+        "variables": [
+            ("resource_group_name", output("01_resource_group", "resource_group_name")),
+            ("location", default("location")),
+            ("data_factory_name_prefix", default("data_factory_name_prefix")),
+        ],
+        "outputs": ["data_factory_id", "data_factory_name", "data_factory_location"],
+        "destroy": "always",
+    },
+    "04_adf_linked_services": {
+        "flag": "--adf-links-only",
+        "description": "ADF linked services stack",
+        "kind": "stack",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("http_linked_service_name_prefix", default("http_linked_service_name_prefix")),
+            ("http_base_url", default("http_base_url")),
+            ("http_authentication_type", default("http_authentication_type")),
+            ("http_enable_certificate_validation", default("http_enable_certificate_validation")),
+            ("adls_linked_service_name_prefix", default("adls_linked_service_name_prefix")),
+            ("storage_dfs_endpoint", output("02_storage_account", "primary_dfs_endpoint")),
+            ("storage_account_key", output("02_storage_account", "storage_account_primary_access_key")),
+            ("sql_linked_service_name_prefix", default("sql_linked_service_name_prefix")),
+            ("sql_server_fqdn", output("07_sql_database", "sql_server_fqdn")),
+            ("sql_database_name", output("07_sql_database", "sql_database_name")),
+            ("sql_username", resolved("sql_username")),
+            ("sql_password", resolved("sql_password")),
+            ("description", default("linked_services_description")),
+        ],
+        "outputs": ["http_linked_service_name", "adls_linked_service_name", "sql_linked_service_name"],
+        "destroy": "allow_references",
+    },
+    "05_adf_pipeline_http": {
+        "flag": "--adf-pipeline-only",
+        "description": "ADF pipeline stack",
+        "kind": "pipeline",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("http_linked_service_name", output("04_adf_linked_services", "http_linked_service_name", "http_linked_service_name_prefix")),
+            ("adls_linked_service_name", output("04_adf_linked_services", "adls_linked_service_name", "adls_linked_service_name_prefix")),
+            ("pipeline_name_prefix", default("pipeline_name_prefix")),
+            ("http_dataset_name_prefix", default("http_dataset_name_prefix")),
+            ("sink_dataset_name_prefix", default("sink_dataset_name_prefix")),
+            ("sink_file_system", default("sink_file_system")),
+        ],
+        "outputs": ["pipeline_name", "http_dataset_name", "sink_dataset_name"],
+        "destroy": "always",
+    },
+    "06_adf_pipeline_airport_json": {
+        "flag": "--adf-airport-pipeline-only",
+        "description": "ADF airport JSON pipeline stack",
+        "kind": "pipeline",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("http_linked_service_name", output("04_adf_linked_services", "http_linked_service_name", "http_linked_service_name_prefix")),
+            ("adls_linked_service_name", output("04_adf_linked_services", "adls_linked_service_name", "adls_linked_service_name_prefix")),
+            ("pipeline_name_prefix", default("airport_pipeline_name_prefix")),
+            ("http_dataset_name_prefix", default("http_airport_dataset_name_prefix")),
+            ("sink_dataset_name_prefix", default("sink_airport_dataset_name_prefix")),
+            ("sink_file_system", default("sink_file_system")),
+            ("sink_folder", default("airport_sink_folder")),
+            ("sink_file", default("airport_sink_file")),
+            ("airport_url", default("airport_url")),
+            ("airport_rel_url", default("airport_rel_url")),
+        ],
+        "outputs": ["pipeline_name", "http_dataset_name", "sink_dataset_name"],
+        "destroy": "always",
+    },
+    "08_adf_pipeline_fact_bookings_incremental": {
+        "flag": "--adf-bookings-pipeline-only",
+        "description": "ADF bookings SQL pipeline stack",
+        "kind": "pipeline",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("sql_linked_service_name", output("04_adf_linked_services", "sql_linked_service_name", "sql_linked_service_name_prefix")),
+            ("adls_linked_service_name", output("04_adf_linked_services", "adls_linked_service_name", "adls_linked_service_name_prefix")),
+            ("pipeline_name_prefix", default("bookings_pipeline_name_prefix")),
+            ("sql_dataset_name_prefix", default("bookings_sql_dataset_name_prefix")),
+            ("json_dataset_name_prefix", default("bookings_json_dataset_name_prefix")),
+            ("parquet_dataset_name_prefix", default("bookings_parquet_dataset_name_prefix")),
+            ("monitor_container", default("monitor_container")),
+            ("monitor_empty_folder", default("monitor_empty_folder")),
+            ("monitor_empty_file", default("monitor_empty_file")),
+            ("monitor_lastload_folder", default("monitor_lastload_folder")),
+            ("monitor_lastload_file", default("monitor_lastload_file")),
+            ("monitor_lastversion_folder", default("monitor_lastversion_folder")),
+            ("monitor_lastversion_file", default("monitor_lastversion_file")),
+            ("monitor_state_folder", default("monitor_state_folder")),
+            ("sink_container", default("bookings_sink_container")),
+            ("sink_folder", default("bookings_sink_folder")),
+            ("sink_file", default("bookings_sink_file")),
+            ("sql_schema", default("bookings_sql_schema")),
+            ("sql_table", default("bookings_sql_table")),
+            ("change_capture_mode", default("bookings_change_capture_mode")),
+            ("lookback_days", default("bookings_lookback_days")),
+            ("compression_codec", default("bookings_parquet_compression_codec")),
+        ],
+        "outputs": ["pipeline_name", "sql_dataset_name", "json_dataset_name", "parquet_dataset_name"],
+        "destroy": "always",
+    },
+    "10_adf_dataflow_bronze_silver": {
+        "flag": "--adf-dataflow-only",
+        "description": "ADF bronze-to-silver data flow stack",
+        "kind": "dataflow",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("adls_linked_service_name", output("04_adf_linked_services", "adls_linked_service_name", "adls_linked_service_name_prefix")),
+            ("dataflow_name_prefix", default("dataflow_name_prefix")),
+            ("source_container", default("dataflow_source_container")),
+            ("source_folder", default("dataflow_source_folder")),
+            ("airline_source_file", default("dataflow_airline_source_file")),
+            ("flight_source_file", default("dataflow_flight_source_file")),
+            ("passenger_source_file", default("dataflow_passenger_source_file")),
+            ("airport_source_file", default("dataflow_airport_source_file")),
+            ("bookings_source_file", default("dataflow_bookings_source_file")),
+            ("sink_container", default("dataflow_sink_container")),
+            ("sink_folder", default("dataflow_sink_folder")),
+            ("airline_sink_file", default("dataflow_airline_sink_file")),
+            ("flight_sink_file", default("dataflow_flight_sink_file")),
+            ("passenger_sink_file", default("dataflow_passenger_sink_file")),
+            ("airport_sink_file", default("dataflow_airport_sink_file")),
+            ("bookings_sink_file", default("dataflow_bookings_sink_file")),
+            ("delta_optimized_write", default("silver_delta_optimized_write")),
+            ("delta_auto_compact", default("silver_delta_auto_compact")),
+            ("scd2_dimensions", default("silver_scd2_dimensions")),
+            ("validate_schema", default("silver_validate_schema")),
+            ("quarantine_folder", default("silver_quarantine_folder")),
+        ],
+        "outputs": [
+            "dataflow_name",
+            "airline_source_dataset_name",
+            "flight_source_dataset_name",
+            "passenger_source_dataset_name",
+            "airport_source_dataset_name",
+            "bookings_source_dataset_name",
+        ],
+        "destroy": "allow_references",
+        "destroy_first": ["11_adf_pipeline_silver_dataflow"],
+    },
+    "11_adf_pipeline_silver_dataflow": {
+        "flag": "--adf-silver-pipeline-only",
+        "description": "ADF silver data flow pipeline stack",
+        "kind": "pipeline",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("dataflow_name", output("10_adf_dataflow_bronze_silver", "dataflow_name", "dataflow_name_prefix")),
+            ("pipeline_name_prefix", default("silver_pipeline_name_prefix")),
+        ],
+        "outputs": ["pipeline_name"],
+        "destroy": "if_state",
+    },
+    "12_adf_dataflow_gold_sales": {
+        "flag": "--adf-gold-dataflow-only",
+        "description": "ADF gold data flow stack",
+        "kind": "dataflow",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("adls_linked_service_name", output("04_adf_linked_services", "adls_linked_service_name", "adls_linked_service_name_prefix")),
+            ("dataflow_name_prefix", default("gold_dataflow_name_prefix")),
+            ("source_container", default("gold_source_container")),
+            ("source_folder", default("gold_source_folder")),
+            ("airline_source_file", default("gold_airline_source_file")),
+            ("bookings_source_file", default("gold_bookings_source_file")),
+            ("sink_container", default("gold_sink_container")),
+            ("sink_folder", default("gold_sink_folder")),
+            ("sink_name", default("gold_sink_name")),
+            ("scd2_dimensions", default("silver_scd2_dimensions")),
+        ],
+        "outputs": ["dataflow_name"],
+        "destroy": "allow_references",
+        "destroy_first": ["13_adf_pipeline_gold_dataflow"],
+    },
+    "13_adf_pipeline_gold_dataflow": {
+        "flag": "--adf-gold-pipeline-only",
+        "description": "ADF gold data flow pipeline stack",
+        "kind": "pipeline",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("dataflow_name", output("12_adf_dataflow_gold_sales", "dataflow_name", "gold_dataflow_name_prefix")),
+            ("pipeline_name_prefix", default("gold_pipeline_name_prefix")),
+        ],
+        "outputs": ["pipeline_name"],
+        "destroy": "if_state",
+    },
+    "09_adf_pipeline_master": {
+        "flag": "--adf-master-pipeline-only",
+        "description": "ADF master pipeline stack",
+        "kind": "pipeline",
+        "variables": [
+            ("data_factory_id", output("03_data_factory", "data_factory_id")),
+            ("http_pipeline_name", output("05_adf_pipeline_http", "pipeline_name", "pipeline_name_prefix")),
+            ("airport_pipeline_name", output("06_adf_pipeline_airport_json", "pipeline_name", "airport_pipeline_name_prefix")),
+            ("bookings_pipeline_name", output("08_adf_pipeline_fact_bookings_incremental", "pipeline_name", "bookings_pipeline_name_prefix")),
+            ("silver_pipeline_name", output("11_adf_pipeline_silver_dataflow", "pipeline_name", "silver_pipeline_name_prefix")),
+            ("gold_pipeline_name", output("13_adf_pipeline_gold_dataflow", "pipeline_name", "gold_pipeline_name_prefix")),
+            ("pipeline_name_prefix", default("master_pipeline_name_prefix")),
+            ("airport_url", default("airport_url")),
+            ("airport_rel_url", default("airport_rel_url")),
+            ("bronze_failure_policy", default("master_bronze_failure_policy")),
+        ],
+        "outputs": ["pipeline_name"],
+        "destroy": "always",
+    },
+}
+
+
+def get_stack_dir(repo_root, name):
+    return repo_root / "terraform" / name
+
+
+def get_env_name():
+    # Set per child process by --envs; every environment gets its own tfvars next to the shared config.
+    return os.environ.get("DEPLOY_ENV") or None
+
+
+def get_tfvars_path(tf_dir):
+    env_name = get_env_name()
+    return tf_dir / (f"{env_name}.tfvars" if env_name else "terraform.tfvars")
+
+
+def get_var_file_args(tf_dir):
+    env_name = get_env_name()
+    return [f"-var-file={get_tfvars_path(tf_dir).name}"] if env_name else []
+
+
+def get_env_state_path(tf_dir):
+    # --envs selects TF_WORKSPACE=<env>, whose local state never falls back to the default workspace.
+    env_name = get_env_name()
+    if env_name:
+        return tf_dir / "terraform.tfstate.d" / env_name / "terraform.tfstate"
+    return tf_dir / "terraform.tfstate"
+
+
+def get_data_dir(tf_dir):
+    data_dir = Path(os.environ.get("TF_DATA_DIR", tf_dir / ".terraform"))
+    return data_dir if data_dir.is_absolute() else tf_dir / data_dir
+
+
+def get_workspace(tf_dir):
+    # Same lookup terraform uses, without spawning `terraform workspace show` per output.
+    env_workspace = os.environ.get("TF_WORKSPACE")
+    if env_workspace:
+        return env_workspace
+    data_dir = get_data_dir(tf_dir)
+    environment_file = data_dir / "environment"
+    if environment_file.exists():
+        return environment_file.read_text(encoding="utf-8").strip() or "default"
+    return "default"
+
+
+def get_tfstate_path(tf_dir):
+    if get_env_name():
+        env_state = get_env_state_path(tf_dir)
+        return env_state if env_state.exists() else None
+    workspace = get_workspace(tf_dir)
+    if workspace and workspace != "default":
+        workspace_state = tf_dir / "terraform.tfstate.d" / workspace / "terraform.tfstate"
+        if workspace_state.exists():
+            return workspace_state
+    default_state = tf_dir / "terraform.tfstate"
+    if default_state.exists():
+        return default_state
+    return None
+
+
+def get_output_from_state(tf_dir, output_name):
+    state_path = get_tfstate_path(tf_dir)
+    if not state_path or not state_path.exists():
+        return None
+    try:
+        # Only the leading "outputs" member is parsed; the resources list can be megabytes.
+        outputs = read_json_member(state_path, "outputs") or {}
+    except ValueError:
+        return None
+    if output_name not in outputs:
+        return None
+    return format_output_value(outputs[output_name].get("value"))
+
+
+def format_output_value(value):
+    if value is None or value == "null":
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def apply_default_overrides():
+    overrides = os.environ.get("DEPLOY_DEFAULTS")
+    if overrides:
+        DEFAULTS.update(json.loads(overrides))
+
+
+def apply_storage_settings(path):
+    settings = json.loads(path.read_text(encoding="utf-8"))
+    unknown = sorted(set(settings) - set(STORAGE_SETTING_KEYS))
+    if unknown:
+        raise RuntimeError(f"Unknown storage settings in {path}: {', '.join(unknown)}")
+    DEFAULTS.update(settings)
+    for key in STORAGE_SETTING_KEYS:
+        if key in settings:
+            print(f"Storage setting {key} = {json.dumps(settings[key])} ({path.name})")
+
+
+def get_only_dest(name):
+    return STACKS[name]["flag"].lstrip("-").replace("-", "_")
+
+
+def add_only_arguments(group, verb):
+    for name, spec in STACKS.items():
+        group.add_argument(spec["flag"], action="store_true", help=f"{verb} only the {spec['description']}")
+
+
+def get_only_stack(args):
+    return next((name for name in STACKS if getattr(args, get_only_dest(name), False)), None)
+
+
+def get_consumed_outputs(name):
+    consumed = {}
+    for _, source in STACKS[name]["variables"]:
+        if source[0] == "output":
+            consumed.setdefault(source[1], []).append(source[2])
+    return consumed
+
+
+def get_upstream_stacks(name):
+    return list(get_consumed_outputs(name))
+
+
+def get_extra_files():
+    return {relative: name for name, spec in STACKS.items() for relative in spec.get("extra_files", [])}
+
+
+def check_registry():
+    seen = set()
+    for name, spec in STACKS.items():
+        for upstream, outputs in get_consumed_outputs(name).items():
+            if upstream not in seen:
+                raise RuntimeError(f"Stack {name} reads outputs from {upstream}, which is not registered before it.")
+            missing = set(outputs) - set(STACKS[upstream]["outputs"])
+            if missing:
+                raise RuntimeError(f"Stack {name} reads undeclared outputs {sorted(missing)} from {upstream}.")
+        for _, source in spec["variables"]:
+            if source[0] == "default" and source[1] not in DEFAULTS:
+                raise RuntimeError(f"Stack {name} uses unknown DEFAULTS key '{source[1]}'.")
+        seen.add(name)
+
+
+def build_stack_tfvars(name, read_output, resolvers, use_fallbacks=False):
+    items = []
+    for variable, source in STACKS[name]["variables"]:
+        kind = source[0]
+        if variable in resolvers and kind in ("output", "resolve"):
+            value = resolvers[variable]()
+            if value is None and kind == "resolve" and source[2]:
+                continue
+        elif kind == "default":
+            value = DEFAULTS[source[1]]
+        elif kind == "literal":
+            value = source[1]
+        elif kind == "output":
+            _, upstream, output_name, fallback = source
+            value = read_output(upstream, output_name)
+            if value is None and use_fallbacks and fallback:
+                value = DEFAULTS[fallback]
+            if value is None:
+                raise RuntimeError(f"Terraform output '{output_name}' of {upstream} not found (needed by {name}).")
+        else:
+            raise RuntimeError(f"No resolver for '{variable}' of {name}.")
+        items.append((variable, value))
+    return items
+
+
+def hcl_value(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        rendered = ", ".join(hcl_value(item) for item in value)
+        return f"[{rendered}]"
+    if isinstance(value, dict):
+        rendered = ", ".join(f"{hcl_value(str(key))} = {hcl_value(item)}" for key, item in value.items())
+        return f"{{ {rendered} }}"
+    escaped = str(value).replace("\"", "\\\"")
+    return f"\"{escaped}\""
+
+
+def write_tfvars(path, items):
+    lines = [f"{key} = {hcl_value(value)}" for key, value in items]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def read_tfvars_value(path, key):
+    if not path.exists():
+        return None
+    for line in path.read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+        name, value = stripped.split("=", 1)
+        if name.strip() != key:
+            continue
+        value = value.strip()
+        if value == "null":
+            return None
+        if value.startswith("\"") and value.endswith("\""):
+            return value[1:-1].replace("\\\"", "\"")
+        return value
+    return None
+
+
+def get_sql_admin_login(sql_dir):
+    env_login = os.environ.get("SQL_ADMIN_LOGIN")
+    if env_login:
+        return env_login
+    existing = read_tfvars_value(get_tfvars_path(sql_dir), "sql_admin_login")
+    if existing:
+        return existing
+    return DEFAULTS["sql_admin_login"]
+
+
+def run_capture(cmd):
+    print("\n$ " + " ".join(cmd))
+    return subprocess.check_output(cmd, text=True).strip()
+
+
+def run_capture_optional(cmd):
+    try:
+        return run_capture(cmd)
+    except subprocess.CalledProcessError:
+        return None
+
+
+def get_az_exe():
+    return "az.cmd" if os.name == "nt" else "az"
+
+
+def load_env_file(path):
+    if not path.exists():
+        return
+    for line in path.read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+        key, value = stripped.split("=", 1)
+        key = key.strip()
+        value = value.strip()
+        if key and key not in os.environ:
+            os.environ[key] = value
@@ -0,0 +1,255 @@
+import argparse
+import csv
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from local_lake import get_repo_root
+from stacks import STORAGE_SETTINGS_FILE_NAME
+from watermark_bench import FIRST_BOOKING_DATE, generate_bookings
+
+CODECS = ["snappy", "zstd", "gzip", "none"]
+# Codecs the ADF Parquet dataset can write (08_adf_pipeline_fact_bookings_incremental); zstd is
+# measured for comparison but cannot be deployed there.
+ADF_PARQUET_CODECS = {"snappy", "gzip", "none"}
+ROW_GROUP_SIZES = [16_384, 131_072, 1_048_576]
+# A codec/row-group pair is acceptable when the gold scan stays within this factor of the fastest.
+SCAN_TOLERANCE = 1.25
+# Small files cost this much more to scan than one compacted file before compaction is worth it.
+SMALL_FILE_TOLERANCE = 1.2
+SMALL_FILE_COUNT = 100
+RANGE_DAYS = 30
+DIMENSION_FILES = {
+    "passenger": ("DimPassenger.csv", "passenger_id"),
+    "flight": ("DimFlight.csv", "flight_id"),
+    "airline": ("DimAirline.csv", "airline_id"),
+}
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("pyarrow is required for the storage benchmark (pip install pyarrow).") from None
+    return pyarrow
+
+
+def build_bookings_table(pa, rows, seed):
+    columns = [[] for _ in range(10)]
+    for booking in generate_bookings(rows, seed):
+        for index, value in enumerate(booking):
+            columns[index].append(value)
+    columns[6] = [date.fromisoformat(value) for value in columns[6]]
+    return pa.table({
+        "booking_id": pa.array(columns[0], pa.int32()),
+        "passenger_id": pa.array(columns[1], pa.int32()),
+        "flight_id": pa.array(columns[2], pa.int32()),
+        "airline_id": pa.array(columns[3], pa.int32()),
+        "origin_airport_id": pa.array(columns[4], pa.int32()),
+        "destination_airport_id": pa.array(columns[5], pa.int32()),
+        "booking_date": pa.array(columns[6], pa.date32()),
+        "ticket_cost": pa.array(columns[7], pa.float64()),
+        "flight_duration_mins": pa.array(columns[8], pa.int32()),
+        "checkin_status": pa.array(columns[9], pa.string()),
+    })
+
+
+def build_dimension_table(pa, repo_root, file_name, key, rows):
+    # The repository dimensions have a handful of rows; they are repeated under new keys to get a
+    # realistic size while keeping the real value distributions.
+    with (repo_root / "data" / file_name).open("r", encoding="utf-8-sig", newline="") as handle:
+        template = list(csv.DictReader(handle))
+    records = []
+    for index in range(rows):
+        record = dict(template[index % len(template)])
+        record[key] = index + 1
+        records.append(record)
+    return pa.Table.from_pylist(records)
+
+
+def median_ms(action, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def write_parquet(pa, table, path, codec, row_group_size):
+    started = time.perf_counter()
+    pa.parquet.write_table(table, path, compression=codec, row_group_size=row_group_size)
+    return time.perf_counter() - started
+
+
+def gold_scan(pa, path):
+    # Same access pattern as the gold flow: ticket_cost summed per airline_id over every booking.
+    table = pa.parquet.read_table(path, columns=["airline_id", "ticket_cost"])
+    return table.group_by("airline_id").aggregate([("ticket_cost", "sum")])
+
+
+def date_range_scan(pa, path, first_day):
+    last_day = first_day + timedelta(days=RANGE_DAYS)
+    filters = [("booking_date", ">=", first_day), ("booking_date", "<", last_day)]
+    return pa.parquet.read_table(path, columns=["booking_id", "booking_date", "ticket_cost"], filters=filters)
+
+
+def point_lookup(pa, path, booking_id):
+    return pa.parquet.read_table(path, filters=[("booking_id", "==", booking_id)])
+
+
+def measure_bookings(pa, table, work_dir, codecs, row_group_sizes, repeat):
+    raw_bytes = table.nbytes
+    range_start = FIRST_BOOKING_DATE + timedelta(days=365)
+    lookup_id = table.num_rows // 2
+    results = []
+    for codec in codecs:
+        for row_group_size in row_group_sizes:
+            path = work_dir / f"bookings-{codec}-{row_group_size}.parquet"
+            write_seconds = write_parquet(pa, table, path, codec, row_group_size)
+            results.append({
+                "table": "bookings",
+                "codec": codec,
+                "row_group_size": row_group_size,
+                "bytes": path.stat().st_size,
+                "write_rows_per_second": table.num_rows / write_seconds,
+                "write_mb_per_second": raw_bytes / write_seconds / 1e6,
+                "scan_ms": median_ms(lambda: gold_scan(pa, path), repeat),
+                "range_ms": median_ms(lambda: date_range_scan(pa, path, range_start), repeat),
+                "lookup_ms": median_ms(lambda: point_lookup(pa, path, lookup_id), repeat),
+            })
+            print(f"bookings {codec:<6} row groups {row_group_size:>9,}: {path.stat().st_size / 1e6:8.1f} MB")
+    return results
+
+
+def measure_dimensions(pa, repo_root, work_dir, codecs, dimension_rows):
+    results = []
+    for name, (file_name, key) in DIMENSION_FILES.items():
+        table = build_dimension_table(pa, repo_root, file_name, key, dimension_rows)
+        for codec in codecs:
+            path = work_dir / f"{name}-{codec}.parquet"
+            write_seconds = write_parquet(pa, table, path, codec, None)
+            started = time.perf_counter()
+            pa.parquet.read_table(path)
+            results.append({
+                "table": name,
+                "codec": codec,
+                "bytes": path.stat().st_size,
+                "write_rows_per_second": table.num_rows / write_seconds,
+                "read_ms": (time.perf_counter() - started) * 1000,
+            })
+    return results
+
+
+def measure_small_files(pa, table, work_dir, codec, row_group_size, repeat):
+    # Incremental loads append one small file per run unless the delta sink compacts them.
+    small_dir = work_dir / f"small-files-{codec}"
+    small_dir.mkdir()
+    chunk = -(-table.num_rows // SMALL_FILE_COUNT)
+    for index in range(SMALL_FILE_COUNT):
+        part = table.slice(index * chunk, chunk)
+        if part.num_rows:
+            pa.parquet.write_table(part, small_dir / f"part-{index:05d}.parquet", compression=codec)
+    compacted = work_dir / f"bookings-{codec}-{row_group_size}.parquet"
+    return {
+        "files": SMALL_FILE_COUNT,
+        "small_files_scan_ms": median_ms(lambda: gold_scan(pa, small_dir), repeat),
+        "compacted_scan_ms": median_ms(lambda: gold_scan(pa, compacted), repeat),
+    }
+
+
+def recommend(results, small_files):
+    fastest = min(result["scan_ms"] for result in results)
+    acceptable = [result for result in results if result["scan_ms"] <= fastest * SCAN_TOLERANCE]
+    best = min(acceptable, key=lambda result: (result["bytes"], result["scan_ms"]))
+    deployable = [result for result in acceptable if result["codec"] in ADF_PARQUET_CODECS]
+    if not deployable:
+        deployable = [result for result in results if result["codec"] in ADF_PARQUET_CODECS]
+    if not deployable:
+        raise RuntimeError(f"Benchmark at least one codec the ADF sink supports: {', '.join(sorted(ADF_PARQUET_CODECS))}.")
+    best_deployable = min(deployable, key=lambda result: (result["bytes"], result["scan_ms"]))
+    compact = small_files["small_files_scan_ms"] > small_files["compacted_scan_ms"] * SMALL_FILE_TOLERANCE
+    settings = {
+        "bookings_parquet_compression_codec": best_deployable["codec"],
+        "silver_delta_optimized_write": compact,
+        "silver_delta_auto_compact": compact,
+    }
+    return settings, best, best_deployable
+
+
+def print_results(results, dimension_results, small_files, settings, best, best_deployable):
+    print(f"\n{'codec':<7} {'row group':>10} {'MB':>8} {'write MB/s':>10} {'scan ms':>8} {'range ms':>9} {'lookup ms':>10}")
+    for result in results:
+        print(
+            f"{result['codec']:<7} {result['row_group_size']:>10,} {result['bytes'] / 1e6:>8.1f} "
+            f"{result['write_mb_per_second']:>10.1f} {result['scan_ms']:>8.1f} {result['range_ms']:>9.1f} {result['lookup_ms']:>10.2f}"
+        )
+    print(f"\n{'dimension':<10} {'codec':<7} {'KB':>8} {'rows/s':>12} {'read ms':>8}")
+    for result in dimension_results:
+        print(
+            f"{result['table']:<10} {result['codec']:<7} {result['bytes'] / 1e3:>8.1f} "
+            f"{result['write_rows_per_second']:>12,.0f} {result['read_ms']:>8.2f}"
+        )
+    print(
+        f"\n{small_files['files']} small files: gold scan {small_files['small_files_scan_ms']:.1f} ms, "
+        f"one compacted file {small_files['compacted_scan_ms']:.1f} ms"
+    )
+    print(f"Best overall: {best['codec']} with {best['row_group_size']:,}-row groups")
+    print(
+        f"Best deployable to the ADF Parquet sink: {best_deployable['codec']} "
+        f"(row groups are sized by ADF; {best_deployable['row_group_size']:,} rows measured best for local writers)"
+    )
+    print("Recommended settings:")
+    for key, value in settings.items():
+        print(f"  {key} = {json.dumps(value)}")
+
+
+def run_benchmark(rows, dimension_rows, codecs, row_group_sizes, repeat, seed, output_path):
+    pa = import_pyarrow()
+    repo_root = get_repo_root()
+    work_dir = Path(tempfile.mkdtemp(prefix="storage_bench_"))
+    try:
+        started = time.perf_counter()
+        table = build_bookings_table(pa, rows, seed)
+        print(f"Generated {rows:,} bookings ({table.nbytes / 1e6:.1f} MB in memory) in {time.perf_counter() - started:.1f}s")
+        results = measure_bookings(pa, table, work_dir, codecs, row_group_sizes, repeat)
+        dimension_results = measure_dimensions(pa, repo_root, work_dir, codecs, dimension_rows)
+        fastest = min(results, key=lambda result: result["scan_ms"])
+        small_files = measure_small_files(pa, table, work_dir, fastest["codec"], fastest["row_group_size"], repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    settings, best, best_deployable = recommend(results, small_files)
+    print_results(results, dimension_results, small_files, settings, best, best_deployable)
+    if output_path:
+        output_path.write_text(json.dumps(settings, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {output_path}; apply with: python scripts/deploy.py --storage-settings {output_path.name}")
+    return settings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parquet codecs and row-group sizes for the bronze/silver outputs.")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Bookings to generate")
+    parser.add_argument("--dimension-rows", type=int, default=100_000, help="Rows per generated dimension table")
+    parser.add_argument("--codec", choices=CODECS, action="append", help="Limit the run to a codec")
+    parser.add_argument("--row-group-size", type=int, action="append", help="Row-group size to test (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per read (the median is reported)")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the generated bookings")
+    parser.add_argument("--output", default=STORAGE_SETTINGS_FILE_NAME, help="Settings file to write, relative to the repo root ('' to skip)")
+    args = parser.parse_args()
+
+    output_path = get_repo_root() / args.output if args.output else None
+    run_benchmark(
+        args.rows,
+        args.dimension_rows,
+        args.codec or CODECS,
+        args.row_group_size or ROW_GROUP_SIZES,
+        args.repeat,
+        args.seed,
+        output_path,
+    )
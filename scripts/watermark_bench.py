@@ -0,0 +1,116 @@
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from pipeline_runner import create_booking_date_index, create_bookings_table, sql_to_sqlite
+from silver_flow import BOOKING_COLUMNS
+from stacks import DEFAULTS
+
+# Watermark queries of 08_adf_pipeline_fact_bookings_incremental, before and after the sargable rewrite.
+LATEST_LOAD_QUERIES = {
+    "latest load, CAST inside MAX": "SELECT MAX(CAST(booking_date AS datetime2)) as latestload FROM {table}",
+    "latest load, MAX then CAST": "SELECT CAST(MAX(booking_date) AS datetime2) as latestload FROM {table}",
+}
+INCREMENTAL_QUERY = "SELECT * FROM {table} WHERE booking_date > '{last_load}' AND booking_date <= '{latest_load}'"
+FIRST_BOOKING_DATE = date(2024, 1, 1)
+BOOKING_DAYS = 730
+INSERT_BATCH_ROWS = 100_000
+
+
+def generate_bookings(rows, seed):
+    rng = random.Random(seed)
+    for booking_id in range(1, rows + 1):
+        booking_date = FIRST_BOOKING_DATE + timedelta(days=rng.randrange(BOOKING_DAYS))
+        yield (
+            booking_id,
+            rng.randint(1, 100),
+            rng.randint(100, 200),
+            rng.randint(1, 10),
+            rng.randint(1, 10),
+            rng.randint(1, 10),
+            booking_date.isoformat(),
+            round(rng.uniform(50, 1000), 2),
+            rng.randint(30, 900),
+            rng.choice(("Yes", "No")),
+        )
+
+
+def load_bookings(connection, table, rows, seed):
+    started = time.perf_counter()
+    create_bookings_table(connection, table, with_index=False)
+    insert = f"INSERT INTO {table} VALUES ({', '.join('?' for _ in BOOKING_COLUMNS)})"
+    bookings = generate_bookings(rows, seed)
+    while True:
+        batch = [booking for _, booking in zip(range(INSERT_BATCH_ROWS), bookings)]
+        if not batch:
+            break
+        connection.executemany(insert, batch)
+    connection.commit()
+    print(f"Loaded {rows:,} bookings in {time.perf_counter() - started:.1f}s")
+
+
+def time_query(connection, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = connection.execute(query).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, len(rows)
+
+
+def get_plan(connection, query):
+    return "; ".join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}"))
+
+
+def get_queries(connection, table):
+    queries = {name: sql_to_sqlite(query.format(table=table), None) for name, query in LATEST_LOAD_QUERIES.items()}
+    # One day of new bookings, the usual gap between two pipeline runs.
+    latest_load = connection.execute(f"SELECT MAX(booking_date) FROM {table}").fetchone()[0]
+    last_load = (date.fromisoformat(latest_load) - timedelta(days=1)).isoformat()
+    queries["incremental window (1 day)"] = INCREMENTAL_QUERY.format(table=table, last_load=last_load, latest_load=latest_load)
+    return queries
+
+
+def run_benchmark(db_path, rows, repeat, seed, reuse=False):
+    table = DEFAULTS["bookings_sql_table"]
+    with sqlite3.connect(db_path) as connection:
+        existing = 0
+        if reuse and connection.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone():
+            existing = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if existing != rows:
+            load_bookings(connection, table, rows, seed)
+        connection.execute(f"DROP INDEX IF EXISTS IX_{table}_booking_date")
+        queries = get_queries(connection, table)
+        results = {name: {} for name in queries}
+        for label in ("no index", "booking_date index"):
+            if label == "booking_date index":
+                started = time.perf_counter()
+                create_booking_date_index(connection, table)
+                print(f"Built IX_{table}_booking_date in {time.perf_counter() - started:.1f}s")
+            for name, query in queries.items():
+                elapsed_ms, row_count = time_query(connection, query, repeat)
+                results[name][label] = (elapsed_ms, row_count, get_plan(connection, query))
+    print(f"\nMedian of {repeat} runs over {rows:,} rows ({db_path}):")
+    print(f"{'query':<32} {'no index':>12} {'indexed':>12}  rows  indexed plan")
+    for name, by_label in results.items():
+        plain_ms, row_count, _ = by_label["no index"]
+        indexed_ms, _, plan = by_label["booking_date index"]
+        print(f"{name:<32} {plain_ms:>10.2f}ms {indexed_ms:>10.2f}ms  {row_count:>5}  {plan}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the FactBookings watermark queries on a SQLite stand-in.")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Bookings to generate")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (the median is reported)")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the generated bookings")
+    parser.add_argument("--db", default=str(Path(tempfile.gettempdir()) / "watermark_bench.db"), help="SQLite file to use")
+    parser.add_argument("--reuse", action="store_true", help="Keep the generated table if it already has --rows rows")
+    args = parser.parse_args()
+
+    run_benchmark(Path(args.db), args.rows, args.repeat, args.seed, args.reuse)
@@ -0,0 +1,176 @@
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+from adf_expressions import parse_timestamp
+from json_stream import iter_json_values
+from local_lake import (
+    ConcurrentWriteError,
+    commit,
+    get_lake_root,
+    list_versions,
+    read_commit,
+    table_path,
+    write_file_atomic,
+    write_json_lines,
+)
+from stacks import DEFAULTS
+
+# Per-source load state, kept like the silver tables: every run is one commit in an append-only
+# _delta_log. The latest version is the compare-and-swap token, older versions are the history
+# that rollback restores from.
+ADVANCE = "ADVANCE"
+ROLLBACK = "ROLLBACK"
+# Written by RecordLoadHistory in 08_adf_pipeline_fact_bookings_incremental, one file per run.
+PIPELINE_RUNS_FOLDER = "runs"
+ENTRY_FIELDS = ("version", "timestamp", "operation")
+
+
+def get_state_dir(lake_root, source):
+    return table_path(lake_root, DEFAULTS["monitor_container"], DEFAULTS["monitor_state_folder"], source)
+
+
+def get_lastload_path(lake_root):
+    return table_path(
+        lake_root, DEFAULTS["monitor_container"], DEFAULTS["monitor_lastload_folder"], DEFAULTS["monitor_lastload_file"]
+    )
+
+
+def write_checkpoint(lake_root, record):
+    # last_load.json is the checkpoint LastLoad in 08_adf_pipeline_fact_bookings_incremental and
+    # pipeline_runner.py read; the store's commits are mirrored into it.
+    write_file_atomic(get_lastload_path(lake_root), lambda handle: write_json_lines(handle, [record]))
+
+
+def read_entry(state_dir, version):
+    entry = {"version": version}
+    for action in read_commit(state_dir, version):
+        if "watermark" in action:
+            entry.update(action["watermark"])
+        elif "commitInfo" in action:
+            entry["timestamp"] = action["commitInfo"]["timestamp"]
+            entry["operation"] = action["commitInfo"]["operation"]
+    return entry
+
+
+def read_history(lake_root, source):
+    state_dir = get_state_dir(lake_root, source)
+    return [read_entry(state_dir, version) for version in list_versions(state_dir)]
+
+
+def get_state(lake_root, source):
+    state_dir = get_state_dir(lake_root, source)
+    versions = list_versions(state_dir)
+    return read_entry(state_dir, versions[-1]) if versions else None
+
+
+def commit_state(lake_root, source, expected_version, watermark, operation):
+    try:
+        return commit(get_state_dir(lake_root, source), [{"watermark": watermark}], operation, expected_version)
+    except ConcurrentWriteError:
+        raise RuntimeError(
+            f"Concurrent update of the {source} watermark: version {expected_version + 1} was committed by another run."
+        ) from None
+
+
+def advance_watermark(lake_root, source, expected_version, value, rows=None, bytes_written=None, duration_seconds=None, details=None):
+    # expected_version is the state the run started from (-1 for a new source). A run that
+    # committed in between makes this fail instead of being overwritten.
+    watermark = {
+        "source": source,
+        "value": value,
+        "rows": rows,
+        "bytes": bytes_written,
+        "durationSeconds": round(duration_seconds, 3) if duration_seconds is not None else None,
+        **(details or {}),
+    }
+    return commit_state(lake_root, source, expected_version, watermark, ADVANCE)
+
+
+def find_entry(history, version=None, as_of=None):
+    if version is not None:
+        matches = [entry for entry in history if entry["version"] == version]
+    else:
+        moment, _ = parse_timestamp(as_of, "as_of")
+        cutoff = int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000)
+        matches = [entry for entry in history if entry["timestamp"] <= cutoff]
+    return matches[-1] if matches else None
+
+
+def rollback_watermark(lake_root, source, version=None, as_of=None):
+    # Restores an earlier watermark as a new commit, so the rollback itself stays in the history
+    # and the next load re-reads everything after the restored value.
+    history = read_history(lake_root, source)
+    if not history:
+        raise RuntimeError(f"No watermark history for '{source}'.")
+    target = find_entry(history, version, as_of)
+    if target is None:
+        raise RuntimeError(f"No '{source}' watermark at {'version ' + str(version) if version is not None else as_of}.")
+    watermark = {"source": source, "value": target["value"], "restoredFrom": target["version"]}
+    new_version = commit_state(lake_root, source, history[-1]["version"], watermark, ROLLBACK)
+    if source == DEFAULTS["bookings_sql_table"]:
+        write_checkpoint(lake_root, {"lastload": target["value"], "restoredfrom": target["version"]})
+    print(f"{source}: watermark restored to {target['value']!r} from version {target['version']} (now version {new_version})")
+    return new_version
+
+
+def read_pipeline_runs(lake_root, source):
+    runs = []
+    for path in sorted((get_state_dir(lake_root, source) / PIPELINE_RUNS_FOLDER).glob("*.json")):
+        runs.extend(value for value in iter_json_values(path) if isinstance(value, dict))
+    return runs
+
+
+def format_time(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_rows_per_second(entry):
+    if entry.get("rows") is None or not entry.get("durationSeconds"):
+        return None
+    return float(entry["rows"]) / float(entry["durationSeconds"])
+
+
+def print_history(history, runs):
+    print(f"{'version':>7}  {'committed (UTC)':<19}  {'operation':<9}  {'rows':>8}  {'bytes':>10}  {'seconds':>8}  {'rows/s':>9}  watermark")
+    for entry in history:
+        rate = get_rows_per_second(entry)
+        print(
+            f"{entry['version']:>7}  {format_time(entry['timestamp']):<19}  {entry['operation']:<9}  "
+            f"{'' if entry.get('rows') is None else entry['rows']:>8}  {'' if entry.get('bytes') is None else entry['bytes']:>10}  "
+            f"{'' if entry.get('durationSeconds') is None else entry['durationSeconds']:>8}  "
+            f"{'' if rate is None else f'{rate:,.0f}':>9}  {entry['value']}"
+        )
+    rates = [rate for rate in map(get_rows_per_second, history) if rate is not None]
+    if rates:
+        total_rows = sum(entry["rows"] for entry in history if entry.get("rows") is not None)
+        print(f"{len(rates)} timed runs, {total_rows:,} rows, median {statistics.median(rates):,.0f} rows/s")
+    if runs:
+        print(f"\nPipeline runs ({PIPELINE_RUNS_FOLDER}/):")
+        for run in runs:
+            print(
+                f"  {run.get('runId')}: watermark {run.get('value')}, {run.get('rows')} rows, "
+                f"{run.get('bytes')} bytes, {run.get('durationSeconds')}s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or roll back the per-source watermark state.")
+    parser.add_argument("command", choices=["show", "history", "rollback"], help="Store action")
+    parser.add_argument("source", nargs="?", default=DEFAULTS["bookings_sql_table"], help="Source name (default: the bookings table)")
+    parser.add_argument("--version", type=int, help="rollback: state version to restore")
+    parser.add_argument("--as-of", help="rollback: restore the state as of this UTC timestamp (yyyy-MM-ddTHH:mm:ss)")
+    args = parser.parse_args()
+
+    lake_root = get_lake_root()
+    if args.command == "show":
+        state = get_state(lake_root, args.source)
+        if state is None:
+            raise RuntimeError(f"No watermark state for '{args.source}'.")
+        print(f"{args.source}: {state['value']!r} (version {state['version']}, {state['operation']} at {format_time(state['timestamp'])} UTC)")
+    elif args.command == "history":
+        print_history(read_history(lake_root, args.source), read_pipeline_runs(lake_root, args.source))
+    else:
+        if (args.version is None) == (args.as_of is None):
+            raise RuntimeError("rollback needs exactly one of --version or --as-of.")
+        rollback_watermark(lake_root, args.source, args.version, args.as_of)
@@ -0,0 +1,23 @@
+-- Optional, for analytical copies of FactBookings: stores the table as a clustered columnstore.
+-- Run after fact_bookings_full.sql. booking_id stays unique through a nonclustered primary key and
+-- the watermark queries keep their rowstore index on booking_date. Change tracking has to be
+-- switched off to replace the primary key, so the next change_tracking run does a full copy.
+IF OBJECT_ID('dbo.FactBookings','U') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID('dbo.FactBookings') AND type = 5)
+BEGIN
+DECLARE @primary_key sysname = (
+    SELECT name FROM sys.key_constraints
+    WHERE parent_object_id = OBJECT_ID('dbo.FactBookings') AND type = 'PK'
+);
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID('dbo.FactBookings') AND name = 'IX_FactBookings_booking_date')
+    DROP INDEX IX_FactBookings_booking_date ON dbo.FactBookings;
+IF EXISTS (SELECT 1 FROM sys.change_tracking_tables WHERE object_id = OBJECT_ID('dbo.FactBookings'))
+    ALTER TABLE dbo.FactBookings DISABLE CHANGE_TRACKING;
+IF @primary_key IS NOT NULL
+    EXEC('ALTER TABLE dbo.FactBookings DROP CONSTRAINT ' + QUOTENAME(@primary_key));
+CREATE CLUSTERED COLUMNSTORE INDEX CCI_FactBookings ON dbo.FactBookings;
+ALTER TABLE dbo.FactBookings ADD CONSTRAINT PK_FactBookings PRIMARY KEY NONCLUSTERED (booking_id);
+CREATE NONCLUSTERED INDEX IX_FactBookings_booking_date ON dbo.FactBookings (booking_date);
+IF EXISTS (SELECT 1 FROM sys.change_tracking_databases WHERE database_id = DB_ID())
+    ALTER TABLE dbo.FactBookings ENABLE CHANGE_TRACKING;
+END
@@ -2,7 +2,7 @@
 IF OBJECT_ID('dbo.FactBookings','U') IS NULL
 BEGIN
 CREATE TABLE FactBookings (
-    booking_id INT PRIMARY KEY,
+    booking_id INT CONSTRAINT PK_FactBookings PRIMARY KEY,
     passenger_id INT,
     flight_id INT,
     airline_id INT,
@@ -16,6 +16,15 @@ CREATE TABLE FactBookings (
 
 END
 
+-- Serves the incremental pipeline: MAX(booking_date) is a single-row seek and the
+-- booking_date window is a range seek that never touches the base table.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID('dbo.FactBookings') AND name = 'IX_FactBookings_booking_date')
+BEGIN
+CREATE NONCLUSTERED INDEX IX_FactBookings_booking_date ON dbo.FactBookings (booking_date)
+    INCLUDE (passenger_id, flight_id, airline_id, origin_airport_id, destination_airport_id,
+             ticket_cost, flight_duration_mins, checkin_status);
+END
+
 IF NOT EXISTS (SELECT 1 FROM dbo.FactBookings)
 BEGIN
 INSERT INTO FactBookings VALUES (1, 90, 187, 8, 6, 3, '2025-04-20', 167.19, 178, 'Yes');
@@ -1019,3 +1028,15 @@ INSERT INTO FactBookings VALUES (998, 41, 187, 2, 4, 8, '2025-01-04', 160.22, 42
 INSERT INTO FactBookings VALUES (999, 16, 172, 5, 2, 6, '2025-06-21', 788.52, 685, 'No');
 INSERT INTO FactBookings VALUES (1000, 16, 168, 4, 2, 7, '2025-06-06', 340.42, 331, 'Yes');
 END
+
+-- Change tracking feeds the change_tracking capture mode of 08_adf_pipeline_fact_bookings_incremental:
+-- inserts, updates and deletes since the last synced version, without rescanning the table.
+IF NOT EXISTS (SELECT 1 FROM sys.change_tracking_databases WHERE database_id = DB_ID())
+BEGIN
+ALTER DATABASE CURRENT SET CHANGE_TRACKING = ON (CHANGE_RETENTION = 7 DAYS, AUTO_CLEANUP = ON);
+END
+
+IF NOT EXISTS (SELECT 1 FROM sys.change_tracking_tables WHERE object_id = OBJECT_ID('dbo.FactBookings'))
+BEGIN
+ALTER TABLE dbo.FactBookings ENABLE CHANGE_TRACKING;
+END
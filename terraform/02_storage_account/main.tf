@@ -27,14 +27,16 @@ resource "random_pet" "storage" {
 }
 
 locals {
-  storage_account_name = var.storage_account_name != null ? var.storage_account_name : substr("${var.storage_account_name_prefix}${random_pet.storage.id}", 0, 24)
-  container_names      = toset(var.container_names)
-  parameters_file_path = "${path.module}/../../parameters/parameters.json"
-  parameters_blob_name = "parameters/parameters.json"
-  empty_json_path      = "${path.module}/../../sql_scripts/empty.json"
-  last_load_json_path  = "${path.module}/../../sql_scripts/last_load.json"
-  empty_json_blob_name = "monitor/emptyjson/empty.json"
-  last_load_blob_name  = "monitor/lastload/last_load.json"
+  storage_account_name   = var.storage_account_name != null ? var.storage_account_name : substr("${var.storage_account_name_prefix}${random_pet.storage.id}", 0, 24)
+  container_names        = toset(var.container_names)
+  parameters_file_path   = "${path.module}/../../parameters/parameters.json"
+  parameters_blob_name   = "parameters/parameters.json"
+  empty_json_path        = "${path.module}/../../sql_scripts/empty.json"
+  last_load_json_path    = "${path.module}/../../sql_scripts/last_load.json"
+  last_version_json_path = "${path.module}/../../sql_scripts/last_version.json"
+  empty_json_blob_name   = "monitor/emptyjson/empty.json"
+  last_load_blob_name    = "monitor/lastload/last_load.json"
+  last_version_blob_name = "monitor/lastversion/last_version.json"
 }
 
 resource "azurerm_storage_account" "main" {
@@ -102,3 +104,14 @@ resource "azurerm_storage_blob" "monitor_last_load_json" {
   content_md5            = filemd5(local.last_load_json_path)
   content_type           = "application/json"
 }
+
+resource "azurerm_storage_blob" "monitor_last_version_json" {
+  count                  = fileexists(local.last_version_json_path) ? 1 : 0
+  name                   = local.last_version_blob_name
+  storage_account_name   = azurerm_storage_account.main.name
+  storage_container_name = azurerm_storage_container.medallion["bronze"].name
+  type                   = "Block"
+  source                 = local.last_version_json_path
+  content_md5            = filemd5(local.last_version_json_path)
+  content_type           = "application/json"
+}
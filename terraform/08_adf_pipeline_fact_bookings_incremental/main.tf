@@ -57,11 +57,12 @@ locals {
   sql_linked_service_id = "${var.data_factory_id}/linkedservices/${var.sql_linked_service_name}"
   sql_table_full        = "${var.sql_schema}.${var.sql_table}"
   lastload_field_name   = "lastload"
+  change_tracking       = var.change_capture_mode == "change_tracking"
 
   lastload_dataset_params = {
     container = var.monitor_container
-    folder    = var.monitor_lastload_folder
-    file      = var.monitor_lastload_file
+    folder    = local.change_tracking ? var.monitor_lastversion_folder : var.monitor_lastload_folder
+    file      = local.change_tracking ? var.monitor_lastversion_file : var.monitor_lastload_file
   }
 
   empty_dataset_params = {
@@ -81,13 +82,70 @@ locals {
     table  = var.sql_table
   }
 
-  latest_load_query = "SELECT MAX(CAST(booking_date AS datetime2)) as latestload FROM ${local.sql_table_full}"
+  run_history_dataset_params = {
+    container = var.monitor_container
+    folder    = "${var.monitor_state_folder}/${var.sql_table}/runs"
+    file = {
+      value = "@{pipeline().RunId}.json"
+      type  = "Expression"
+    }
+  }
+
+  # The window re-reads lookback_days before the watermark; the silver sink's keyed upsert on
+  # booking_id turns re-read rows into no-ops, so only late arrivals and corrections change silver.
+  lookback_from     = "addDays(activity('LastLoad').output.firstRow.${local.lastload_field_name}, -${var.lookback_days})"
+  latest_load_query = "SELECT CAST(MAX(booking_date) AS datetime2) as latestload FROM ${local.sql_table_full}"
   incremental_query = <<EOT
 SELECT * FROM ${local.sql_table_full}
-WHERE booking_date > '@{activity('LastLoad').output.firstRow.${local.lastload_field_name}}'
+WHERE booking_date > '@{${local.lookback_from}}'
 AND booking_date <= '@{activity('LatestLoad').output.firstRow.latestload}'
 EOT
-  should_copy_expression = "@greater(ticks(activity('LatestLoad').output.firstRow.latestload), ticks(activity('LastLoad').output.firstRow.${local.lastload_field_name}))"
+  # Copy whenever the window holds rows, not only when MAX(booking_date) passed the watermark:
+  # a booking committed late for an already-loaded date must still be re-read.
+  should_copy_load_expression = "@greater(ticks(activity('LatestLoad').output.firstRow.latestload), ticks(${local.lookback_from}))"
+  # MAX(booking_date) can sit at the watermark when only late rows arrived; it never moves back.
+  next_load = "if(greater(ticks(activity('LatestLoad').output.firstRow.latestload), ticks(activity('LastLoad').output.firstRow.${local.lastload_field_name})), activity('LatestLoad').output.firstRow.latestload, activity('LastLoad').output.firstRow.${local.lastload_field_name})"
+
+  # change_tracking mode: copy the rows changed since the stored version from CHANGETABLE, with
+  # deletes as is_deleted tombstones. A stored version older than the retained history (or the
+  # initial -1) falls back to a full snapshot.
+  lastversion_field_name = "lastversion"
+  last_version           = "activity('LastLoad').output.firstRow.${local.lastversion_field_name}"
+  latest_version         = "activity('LatestLoad').output.firstRow.latestversion"
+  booking_value_columns  = ["passenger_id", "flight_id", "airline_id", "origin_airport_id", "destination_airport_id", "booking_date", "ticket_cost", "flight_duration_mins", "checkin_status"]
+  latest_version_query   = "SELECT CHANGE_TRACKING_CURRENT_VERSION() as latestversion, CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID('${local.sql_table_full}')) as minvalidversion"
+  snapshot_query         = "concat('SELECT *, CAST(0 AS bit) as is_deleted, CAST(', string(${local.latest_version}), ' AS bigint) as change_version FROM ${local.sql_table_full}')"
+  changes_query          = "concat('SELECT ct.booking_id, ${join(", ", [for column in local.booking_value_columns : "b.${column}"])}, CAST(CASE WHEN b.booking_id IS NULL THEN 1 ELSE 0 END AS bit) as is_deleted, ct.SYS_CHANGE_VERSION as change_version FROM CHANGETABLE(CHANGES ${local.sql_table_full}, ', string(${local.last_version}), ') AS ct LEFT JOIN ${local.sql_table_full} AS b ON b.booking_id = ct.booking_id WHERE ct.SYS_CHANGE_VERSION <= ', string(${local.latest_version}))"
+  change_tracking_query  = "@if(less(${local.last_version}, activity('LatestLoad').output.firstRow.minvalidversion), ${local.snapshot_query}, ${local.changes_query})"
+
+  should_copy_version_expression = "@greater(${local.latest_version}, ${local.last_version})"
+
+  latest_query           = local.change_tracking ? local.latest_version_query : local.latest_load_query
+  copy_query             = local.change_tracking ? local.change_tracking_query : local.incremental_query
+  should_copy_expression = local.change_tracking ? local.should_copy_version_expression : local.should_copy_load_expression
+
+  checkpoint_column = {
+    name  = local.change_tracking ? local.lastversion_field_name : local.lastload_field_name
+    value = local.change_tracking ? "@${local.latest_version}" : "@${local.next_load}"
+  }
+
+  # One record per run in monitor/state, same fields as scripts/watermark_store.py, for
+  # throughput history across runs.
+  run_history_columns = [
+    { name = "source", value = var.sql_table },
+    { name = "runId", value = "@pipeline().RunId" },
+    { name = "value", value = local.checkpoint_column.value },
+    { name = "rows", value = "@activity('CopyFactBookings').output.rowsCopied" },
+    { name = "bytes", value = "@activity('CopyFactBookings').output.dataWritten" },
+    { name = "durationSeconds", value = "@activity('CopyFactBookings').output.copyDuration" },
+  ]
+
+  # Per-run cost, kept next to the checkpoint: rows copied and, in watermark mode, where the
+  # re-read window started.
+  run_report_columns = concat(
+    [{ name = "rowscopied", value = "@activity('CopyFactBookings').output.rowsCopied" }],
+    local.change_tracking ? [] : [{ name = "lookbackfrom", value = "@${local.lookback_from}" }],
+  )
 
   pipeline_activities = [
     {
@@ -111,7 +169,7 @@ EOT
       typeProperties = {
         source = {
           type           = "SqlSource"
-          sqlReaderQuery = local.latest_load_query
+          sqlReaderQuery = local.latest_query
         }
         dataset = {
           referenceName = azurerm_data_factory_dataset_azure_sql_table.sql.name
@@ -160,7 +218,7 @@ EOT
             typeProperties = {
               source = {
                 type           = "SqlSource"
-                sqlReaderQuery = local.incremental_query
+                sqlReaderQuery = local.copy_query
               }
               sink = {
                 type = "ParquetSink"
@@ -192,13 +250,41 @@ EOT
             ]
             typeProperties = {
               source = {
-                type = "JsonSource"
-                additionalColumns = [
-                  {
-                    name  = local.lastload_field_name
-                    value = "@activity('LatestLoad').output.firstRow.latestload"
-                  }
-                ]
+                type              = "JsonSource"
+                additionalColumns = concat([local.checkpoint_column], local.run_report_columns)
+              }
+              sink = {
+                type = "JsonSink"
+              }
+            }
+          },
+          {
+            name = "RecordLoadHistory"
+            type = "Copy"
+            dependsOn = [
+              {
+                activity             = "UpdateLastLoad"
+                dependencyConditions = ["Succeeded"]
+              }
+            ]
+            inputs = [
+              {
+                referenceName = azurerm_data_factory_dataset_json.monitor.name
+                type          = "DatasetReference"
+                parameters    = local.empty_dataset_params
+              }
+            ]
+            outputs = [
+              {
+                referenceName = azurerm_data_factory_dataset_json.monitor.name
+                type          = "DatasetReference"
+                parameters    = local.run_history_dataset_params
+              }
+            ]
+            typeProperties = {
+              source = {
+                type              = "JsonSource"
+                additionalColumns = local.run_history_columns
               }
               sink = {
                 type = "JsonSink"
@@ -245,7 +331,7 @@ resource "azurerm_data_factory_dataset_parquet" "adls_sink" {
   name                = local.parquet_dataset_name
   data_factory_id     = var.data_factory_id
   linked_service_name = var.adls_linked_service_name
-  compression_codec   = "snappy"
+  compression_codec   = var.compression_codec
 
   parameters = {
     container = "String"
@@ -91,6 +91,24 @@ variable "monitor_lastload_file" {
   default     = "last_load.json"
 }
 
+variable "monitor_lastversion_folder" {
+  type        = string
+  description = "Folder containing last_version.json (change_tracking mode)"
+  default     = "monitor/lastversion"
+}
+
+variable "monitor_lastversion_file" {
+  type        = string
+  description = "Last change tracking version JSON filename"
+  default     = "last_version.json"
+}
+
+variable "monitor_state_folder" {
+  type        = string
+  description = "Folder holding per-source load state; each run adds <sql_table>/runs/<run id>.json"
+  default     = "monitor/state"
+}
+
 variable "sink_container" {
   type        = string
   description = "ADLS container for the Parquet sink"
@@ -120,3 +138,36 @@ variable "sql_table" {
   description = "SQL table name"
   default     = "FactBookings"
 }
+
+variable "change_capture_mode" {
+  type        = string
+  description = "How new bookings are found: watermark (booking_date window) or change_tracking (SQL change tracking, with deletes)"
+  default     = "watermark"
+
+  validation {
+    condition     = contains(["watermark", "change_tracking"], var.change_capture_mode)
+    error_message = "change_capture_mode must be watermark or change_tracking."
+  }
+}
+
+variable "lookback_days" {
+  type        = number
+  description = "Days before the stored watermark that watermark mode re-reads, so bookings committed late for a loaded date are picked up"
+  default     = 3
+
+  validation {
+    condition     = var.lookback_days >= 0 && floor(var.lookback_days) == var.lookback_days
+    error_message = "lookback_days must be a whole number of days, 0 or more."
+  }
+}
+
+variable "compression_codec" {
+  type        = string
+  description = "Compression codec of the bronze bookings Parquet sink (see scripts/storage_bench.py)"
+  default     = "snappy"
+
+  validation {
+    condition     = contains(["snappy", "gzip", "none"], var.compression_codec)
+    error_message = "compression_codec must be snappy, gzip or none."
+  }
+}
@@ -130,6 +130,23 @@ locals {
     mappings = local.mapping_passenger
   }
 
+  # -----------------------------
+  # Fan-in: the bronze ingestions share no data and start together; silver waits for all three.
+  # "Completed" lets silver proceed on the previous bronze files when that branch fails.
+  # -----------------------------
+  bronze_branches = {
+    http     = "ExecuteHttpCsvPipeline"
+    airport  = "ExecuteAirportJsonPipeline"
+    bookings = "ExecuteBookingsPipeline"
+  }
+
+  silver_fan_in = [
+    for branch, activity in local.bronze_branches : {
+      activity             = activity
+      dependencyConditions = [lookup(var.bronze_failure_policy, branch, "Succeeded")]
+    }
+  ]
+
   pipeline_activities = [
     {
       name = "ExecuteHttpCsvPipeline"
@@ -163,12 +180,6 @@ locals {
     {
       name = "ExecuteAirportJsonPipeline"
       type = "ExecutePipeline"
-      dependsOn = [
-        {
-          activity             = "ExecuteHttpCsvPipeline"
-          dependencyConditions = ["Succeeded"]
-        }
-      ]
       typeProperties = {
         pipeline = {
           referenceName = var.airport_pipeline_name
@@ -190,12 +201,6 @@ locals {
     {
       name = "ExecuteBookingsPipeline"
       type = "ExecutePipeline"
-      dependsOn = [
-        {
-          activity             = "ExecuteAirportJsonPipeline"
-          dependencyConditions = ["Succeeded"]
-        }
-      ]
       typeProperties = {
         pipeline = {
           referenceName = var.bookings_pipeline_name
@@ -205,14 +210,9 @@ locals {
       }
     },
     {
-      name = "ExecuteSilverDataflowPipeline"
-      type = "ExecutePipeline"
-      dependsOn = [
-        {
-          activity             = "ExecuteBookingsPipeline"
-          dependencyConditions = ["Succeeded"]
-        }
-      ]
+      name      = "ExecuteSilverDataflowPipeline"
+      type      = "ExecutePipeline"
+      dependsOn = local.silver_fan_in
       typeProperties = {
         pipeline = {
           referenceName = var.silver_pipeline_name
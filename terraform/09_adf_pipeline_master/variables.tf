@@ -40,6 +40,21 @@ variable "gold_pipeline_name" {
   description = "Name of the gold data flow pipeline to execute"
 }
 
+variable "bronze_failure_policy" {
+  type        = map(string)
+  description = "Per bronze branch (http, airport, bookings): Succeeded blocks silver when the branch fails, Completed proceeds with the previous bronze data"
+  default = {
+    http     = "Succeeded"
+    airport  = "Completed"
+    bookings = "Succeeded"
+  }
+
+  validation {
+    condition     = alltrue([for policy in values(var.bronze_failure_policy) : contains(["Succeeded", "Completed"], policy)])
+    error_message = "bronze_failure_policy values must be Succeeded or Completed."
+  }
+}
+
 variable "airport_url" {
   type        = string
   description = "Airport JSON URL"
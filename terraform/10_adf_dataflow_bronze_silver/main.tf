@@ -48,34 +48,192 @@ locals {
   sink_airport_path   = "${var.sink_folder}/${var.airport_sink_file}"
   sink_bookings_path  = "${var.sink_folder}/${var.bookings_sink_file}"
 
-  dataflow_script_lines = [
-    "source(output(airline_id as integer, airline_name as string, country as string), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, format: 'delimited') ~> srcAirline",
-    "source(output(flight_id as integer, flight_number as string, departure_time as string, arrival_time as string), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, format: 'delimited') ~> srcFlight",
-    "source(output(passenger_id as integer, full_name as string, gender as string, age as integer, country as string), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, format: 'delimited') ~> srcPassenger",
-    "source(output(airport_id as integer, airport_name as string, city as string, country as string), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, format: 'json') ~> srcAirport",
-    "source(output(booking_id as integer, passenger_id as integer, flight_id as integer, airline_id as integer, origin_airport_id as integer, destination_airport_id as integer, booking_date as date, ticket_cost as decimal(10,2), flight_duration_mins as integer, checkin_status as string), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, format: 'parquet') ~> srcBookings",
-    "srcAirline derive(airline_name_clean = trim(airline_name), country_upper = upper(country)) ~> drAirline",
-    "srcFlight derive(flight_prefix = substring(flight_number, 1, 2), departure_ts = toTimestamp(concat('1970-01-01 ', departure_time), 'yyyy-MM-dd HH:mm'), arrival_ts = toTimestamp(concat('1970-01-01 ', arrival_time), 'yyyy-MM-dd HH:mm')) ~> drFlight",
-    "srcPassenger derive(full_name_clean = trim(full_name), gender_full = iif(gender == 'M', 'Male', 'Female'), age_band = iif(age < 18, 'child', iif(age < 65, 'adult', 'senior'))) ~> drPassenger",
-    "srcAirport derive(airport_name_clean = trim(airport_name), city_upper = upper(city)) ~> drAirport",
-    "srcBookings derive(booking_year = year(booking_date), booking_month = month(booking_date), is_paid = iif(checkin_status == 'Yes', true(), false())) ~> drBookings",
-    "drAirline alterRow(upsertIf(true())) ~> arAirline",
+  # Dimensions in var.scd2_dimensions keep SCD type 2 history. The sink's current rows are read
+  # back and compared by row hash: unchanged rows are dropped, a changed key gets its current row
+  # closed (effective_to, is_current = false) plus a new version from currentUTC(), and a new key
+  # starts with a version open towards the past (1900-01-01) so older bookings still join to it.
+  # Rows are keyed on (id, effective_from). The other dimensions are plain keyed upserts.
+  scd2_columns = "effective_from as timestamp, effective_to as timestamp, is_current as boolean, row_hash as string"
+  dimension_sinks = {
+    airline = {
+      stream  = "Airline"
+      key     = "airline_id"
+      path    = local.sink_airline_path
+      columns = "airline_id as integer, airline_name as string, country as string, airline_name_clean as string, country_upper as string"
+      hash    = "airline_name, country"
+    }
+    passenger = {
+      stream  = "Passenger"
+      key     = "passenger_id"
+      path    = local.sink_passenger_path
+      columns = "passenger_id as integer, full_name as string, gender as string, age as integer, country as string, full_name_clean as string, gender_full as string, age_band as string"
+      hash    = "full_name, gender, age, country"
+    }
+  }
+  scd2_dimension_sinks   = { for name, sink in local.dimension_sinks : name => sink if contains(var.scd2_dimensions, name) }
+  upsert_dimension_sinks = { for name, sink in local.dimension_sinks : name => sink if !contains(var.scd2_dimensions, name) }
+
+  upsert_dimension_lines = flatten([
+    for name, sink in local.upsert_dimension_sinks : [
+      "dr${sink.stream} alterRow(upsertIf(true())) ~> ar${sink.stream}",
+      "ar${sink.stream} sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${sink.path}', insertable: true, updateable: true, upsertable: true, optimizedWrite: ${var.delta_optimized_write}, autoCompact: ${var.delta_auto_compact}, keys: ['${sink.key}']) ~> sink${sink.stream}",
+    ]
+  ])
+  scd2_source_lines = [
+    for name, sink in local.scd2_dimension_sinks :
+    "source(output(${sink.columns}, ${local.scd2_columns}), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: true, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${sink.path}') ~> cur${sink.stream}"
+  ]
+  # Rows written by the upsert sink before SCD2 was enabled carry no SCD2 columns. As in
+  # scripts/scd2.py, they count as open versions from 1900-01-01: the comparison reads them with
+  # the columns filled in, and cnv<Stream> rewrites them in place (keyed on the dimension key
+  # alone, which only the legacy row holds) before the SCD2 sink merges on the effective range.
+  scd2_dimension_lines = flatten([
+    for name, sink in local.scd2_dimension_sinks : [
+      "cur${sink.stream} derive(is_current = coalesce(is_current, true()), effective_from = coalesce(effective_from, toTimestamp('1900-01-01 00:00:00', 'yyyy-MM-dd HH:mm:ss')), row_hash = coalesce(row_hash, sha2(256, ${sink.hash}))) ~> mg${sink.stream}",
+      "mg${sink.stream} filter(is_current) ~> open${sink.stream}",
+      "cur${sink.stream} filter(isNull(is_current)) ~> lg${sink.stream}",
+      "lg${sink.stream} derive(effective_from = toTimestamp('1900-01-01 00:00:00', 'yyyy-MM-dd HH:mm:ss'), effective_to = toTimestamp(toString(null())), is_current = true(), row_hash = sha2(256, ${sink.hash})) ~> lgv${sink.stream}",
+      "lgv${sink.stream} alterRow(upsertIf(true())) ~> alg${sink.stream}",
+      "alg${sink.stream} sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${sink.path}', insertable: false, updateable: true, upsertable: true, optimizedWrite: ${var.delta_optimized_write}, autoCompact: ${var.delta_auto_compact}, keys: ['${sink.key}'], saveOrder: 1) ~> cnv${sink.stream}",
+      "dr${sink.stream} derive(row_hash = sha2(256, ${sink.hash})) ~> hs${sink.stream}",
+      "hs${sink.stream}, open${sink.stream} exists(hs${sink.stream}@${sink.key} == open${sink.stream}@${sink.key} && hs${sink.stream}@row_hash == open${sink.stream}@row_hash, negate:true, broadcast: 'auto') ~> nw${sink.stream}",
+      "nw${sink.stream}, open${sink.stream} exists(nw${sink.stream}@${sink.key} == open${sink.stream}@${sink.key}, negate:true, broadcast: 'auto') ~> fr${sink.stream}",
+      "nw${sink.stream}, open${sink.stream} exists(nw${sink.stream}@${sink.key} == open${sink.stream}@${sink.key}, negate:false, broadcast: 'auto') ~> cg${sink.stream}",
+      "open${sink.stream}, hs${sink.stream} exists(open${sink.stream}@${sink.key} == hs${sink.stream}@${sink.key} && open${sink.stream}@row_hash != hs${sink.stream}@row_hash, negate:false, broadcast: 'auto') ~> ex${sink.stream}",
+      "fr${sink.stream} derive(effective_from = toTimestamp('1900-01-01 00:00:00', 'yyyy-MM-dd HH:mm:ss'), effective_to = toTimestamp(toString(null())), is_current = true()) ~> frv${sink.stream}",
+      "cg${sink.stream} derive(effective_from = currentUTC(), effective_to = toTimestamp(toString(null())), is_current = true()) ~> cgv${sink.stream}",
+      "ex${sink.stream} derive(effective_to = currentUTC(), is_current = false()) ~> exv${sink.stream}",
+      "frv${sink.stream}, cgv${sink.stream}, exv${sink.stream} union(byName: true) ~> un${sink.stream}",
+      "un${sink.stream} alterRow(upsertIf(true())) ~> ar${sink.stream}",
+      "ar${sink.stream} sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${sink.path}', insertable: true, updateable: true, upsertable: true, optimizedWrite: ${var.delta_optimized_write}, autoCompact: ${var.delta_auto_compact}, keys: ['${sink.key}', 'effective_from'], saveOrder: 2) ~> sink${sink.stream}",
+    ]
+  ])
+  scd2_sources = [for name, sink in local.scd2_dimension_sinks : "cur${sink.stream}"]
+  scd2_transformations = flatten([
+    for name, sink in local.scd2_dimension_sinks : [
+      for prefix in ["mg", "open", "lg", "lgv", "alg", "hs", "nw", "fr", "cg", "ex", "frv", "cgv", "exv", "un"] : "${prefix}${sink.stream}"
+    ]
+  ])
+
+  # Data-quality gate between the bronze sources and the derivations, with the rule ids of
+  # scripts/quality_gate.py. Every source goes through assert transformations, whose per-rule counts
+  # show in the data flow run. Rows failing a quarantine rule are split off to
+  # <quarantine_folder>/<table> in the source container and never reach silver. Bookings are checked
+  # against the dimension rows that passed their own rules; missing passengers and flights are
+  # reported but still loaded.
+  quality_streams = ["Airline", "Flight", "Passenger", "Airport", "Bookings"]
+  quality_rules = {
+    Airline = {
+      table      = "airline"
+      checks     = ["expectTrue(!isNull(airline_id), false, 'airline_id_not_null')"]
+      references = []
+      quarantine = ["airline_id_not_null"]
+    }
+    Flight = {
+      table      = "flight"
+      checks     = ["expectTrue(!isNull(flight_id), false, 'flight_id_not_null')"]
+      references = []
+      quarantine = ["flight_id_not_null"]
+    }
+    Passenger = {
+      table = "passenger"
+      checks = [
+        "expectTrue(!isNull(passenger_id), false, 'passenger_id_not_null')",
+        "expectTrue(isNull(gender) || in(['M', 'F'], gender), false, 'gender_allowed')",
+        "expectTrue(isNull(age) || (age >= 0 && age <= 120), false, 'age_range')",
+      ]
+      references = []
+      quarantine = ["passenger_id_not_null", "gender_allowed", "age_range"]
+    }
+    Airport = {
+      table      = "airport"
+      checks     = ["expectTrue(!isNull(airport_id), false, 'airport_id_not_null')"]
+      references = []
+      quarantine = ["airport_id_not_null"]
+    }
+    Bookings = {
+      table = "bookings"
+      checks = [
+        "expectTrue(!isNull(booking_id), false, 'booking_id_not_null')",
+        "expectTrue(!isNull(passenger_id), false, 'passenger_id_not_null')",
+        "expectTrue(!isNull(flight_id), false, 'flight_id_not_null')",
+        "expectTrue(!isNull(airline_id), false, 'airline_id_not_null')",
+        "expectTrue(!isNull(booking_date), false, 'booking_date_not_null')",
+        "expectTrue(isNull(ticket_cost) || (ticket_cost >= 0 && ticket_cost <= 100000), false, 'ticket_cost_range')",
+        "expectTrue(isNull(flight_duration_mins) || (flight_duration_mins >= 1 && flight_duration_mins <= 1440), false, 'flight_duration_mins_range')",
+        "expectTrue(isNull(checkin_status) || in(['Yes', 'No'], checkin_status), false, 'checkin_status_allowed')",
+      ]
+      references = [
+        { id = "airline_id_exists", column = "airline_id", stream = "Airline", key = "airline_id" },
+        { id = "origin_airport_id_exists", column = "origin_airport_id", stream = "Airport", key = "airport_id" },
+        { id = "destination_airport_id_exists", column = "destination_airport_id", stream = "Airport", key = "airport_id" },
+        { id = "passenger_id_exists", column = "passenger_id", stream = "Passenger", key = "passenger_id" },
+        { id = "flight_id_exists", column = "flight_id", stream = "Flight", key = "flight_id" },
+      ]
+      quarantine = [
+        "booking_id_not_null",
+        "passenger_id_not_null",
+        "flight_id_not_null",
+        "airline_id_not_null",
+        "booking_date_not_null",
+        "ticket_cost_range",
+        "flight_duration_mins_range",
+        "checkin_status_allowed",
+        "airline_id_exists",
+        "origin_airport_id_exists",
+        "destination_airport_id_exists",
+      ]
+    }
+  }
+  # qa<Stream> runs the row checks, then one fk<Stream><n> assert per referenced dimension.
+  quality_steps = {
+    for stream in local.quality_streams :
+    stream => concat(["qa${stream}"], [for index, ref in local.quality_rules[stream].references : "fk${stream}${index}"])
+  }
+  quality_lines = flatten([
+    for stream in local.quality_streams : concat(
+      ["src${stream} assert(${join(", ", local.quality_rules[stream].checks)}) ~> qa${stream}"],
+      [
+        for index, ref in local.quality_rules[stream].references :
+        "${local.quality_steps[stream][index]}, dq${ref.stream}@ok${ref.stream} assert(expectExists(isNull(${local.quality_steps[stream][index]}@${ref.column}) || ${local.quality_steps[stream][index]}@${ref.column} == ok${ref.stream}@${ref.key}, false, '${ref.id}')) ~> ${local.quality_steps[stream][index + 1]}"
+      ],
+      [
+        "${element(local.quality_steps[stream], length(local.quality_steps[stream]) - 1)} split(${join(" || ", [for id in local.quality_rules[stream].quarantine : "hasError('${id}')"])}, disjoint: false) ~> dq${stream}@(bad${stream}, ok${stream})",
+        "dq${stream}@bad${stream} sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.source_container}', folderPath: '${var.quarantine_folder}/${local.quality_rules[stream].table}', insertable: true, updateable: false, upsertable: false, deletable: false) ~> quarantine${stream}",
+      ]
+    )
+  ])
+  quality_transformations = flatten([for stream in local.quality_streams : concat(local.quality_steps[stream], ["dq${stream}"])])
+
+  # The dimension sources honour var.validate_schema. Bookings declare the change-capture columns,
+  # which only exist in change_tracking mode, so that source cannot validate its schema; its
+  # required columns are covered by the not_null rules.
+  dataflow_script_lines = concat([
+    "source(output(airline_id as integer, airline_name as string, country as string), allowSchemaDrift: true, validateSchema: ${var.validate_schema}, ignoreNoFilesFound: false, format: 'delimited') ~> srcAirline",
+    "source(output(flight_id as integer, flight_number as string, departure_time as string, arrival_time as string), allowSchemaDrift: true, validateSchema: ${var.validate_schema}, ignoreNoFilesFound: false, format: 'delimited') ~> srcFlight",
+    "source(output(passenger_id as integer, full_name as string, gender as string, age as integer, country as string), allowSchemaDrift: true, validateSchema: ${var.validate_schema}, ignoreNoFilesFound: false, format: 'delimited') ~> srcPassenger",
+    "source(output(airport_id as integer, airport_name as string, city as string, country as string), allowSchemaDrift: true, validateSchema: ${var.validate_schema}, ignoreNoFilesFound: false, format: 'json') ~> srcAirport",
+    "source(output(booking_id as integer, passenger_id as integer, flight_id as integer, airline_id as integer, origin_airport_id as integer, destination_airport_id as integer, booking_date as date, ticket_cost as decimal(10,2), flight_duration_mins as integer, checkin_status as string, is_deleted as boolean, change_version as long), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, format: 'parquet') ~> srcBookings",
+  ], local.scd2_source_lines, [
+    "dqAirline@okAirline derive(airline_name_clean = trim(airline_name), country_upper = upper(country)) ~> drAirline",
+    "dqFlight@okFlight derive(flight_prefix = substring(flight_number, 1, 2), departure_ts = toTimestamp(concat('1970-01-01 ', departure_time), 'yyyy-MM-dd HH:mm'), arrival_ts = toTimestamp(concat('1970-01-01 ', arrival_time), 'yyyy-MM-dd HH:mm')) ~> drFlight",
+    "dqPassenger@okPassenger derive(full_name_clean = trim(full_name), gender_full = case(gender == 'M', 'Male', gender == 'F', 'Female', toString(null())), age_band = iif(age < 18, 'child', iif(age < 65, 'adult', 'senior'))) ~> drPassenger",
+    "dqAirport@okAirport derive(airport_name_clean = trim(airport_name), city_upper = upper(city)) ~> drAirport",
+    "dqBookings@okBookings derive(booking_year = year(booking_date), booking_month = month(booking_date), is_paid = iif(checkin_status == 'Yes', true(), false())) ~> drBookings",
     "drFlight alterRow(upsertIf(true())) ~> arFlight",
-    "drPassenger alterRow(upsertIf(true())) ~> arPassenger",
     "drAirport alterRow(upsertIf(true())) ~> arAirport",
-    "drBookings alterRow(upsertIf(true())) ~> arBookings",
-    "arAirline sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_airline_path}', insertable: true, updateable: true, upsertable: true, keys: ['airline_id']) ~> sinkAirline",
-    "arFlight sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_flight_path}', insertable: true, updateable: true, upsertable: true, keys: ['flight_id']) ~> sinkFlight",
-    "arPassenger sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_passenger_path}', insertable: true, updateable: true, upsertable: true, keys: ['passenger_id']) ~> sinkPassenger",
-    "arAirport sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_airport_path}', insertable: true, updateable: true, upsertable: true, keys: ['airport_id']) ~> sinkAirport",
-    "arBookings sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_bookings_path}', insertable: true, updateable: true, upsertable: true, keys: ['booking_id']) ~> sinkBookings",
-  ]
+    "drBookings alterRow(deleteIf(coalesce(is_deleted, false())), upsertIf(true())) ~> arBookings",
+    "arBookings select(mapColumn(each(match(!in(['is_deleted', 'change_version'], name)), $$ = $$)), skipDuplicateMapInputs: true, skipDuplicateMapOutputs: true) ~> slBookings",
+    "arFlight sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_flight_path}', insertable: true, updateable: true, upsertable: true, optimizedWrite: ${var.delta_optimized_write}, autoCompact: ${var.delta_auto_compact}, keys: ['flight_id']) ~> sinkFlight",
+    "arAirport sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_airport_path}', insertable: true, updateable: true, upsertable: true, optimizedWrite: ${var.delta_optimized_write}, autoCompact: ${var.delta_auto_compact}, keys: ['airport_id']) ~> sinkAirport",
+    "slBookings sink(allowSchemaDrift: true, validateSchema: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.sink_container}', folderPath: '${local.sink_bookings_path}', insertable: true, updateable: true, upsertable: true, deletable: true, optimizedWrite: ${var.delta_optimized_write}, autoCompact: ${var.delta_auto_compact}, keys: ['booking_id']) ~> sinkBookings",
+  ], local.quality_lines, local.upsert_dimension_lines, local.scd2_dimension_lines)
 
   dataflow_body = {
     properties = {
       type = "MappingDataFlow"
       typeProperties = {
-        sources = [
+        sources = concat([
           {
             name = "srcAirline"
             dataset = {
@@ -111,8 +269,16 @@ locals {
               type          = "DatasetReference"
             }
           }
-        ]
-        transformations = [
+        ], [
+          for name in local.scd2_sources : {
+            name = name
+            linkedService = {
+              referenceName = var.adls_linked_service_name
+              type          = "LinkedServiceReference"
+            }
+          }
+        ])
+        transformations = concat([
           { name = "drAirline" },
           { name = "drFlight" },
           { name = "drPassenger" },
@@ -123,8 +289,9 @@ locals {
           { name = "arPassenger" },
           { name = "arAirport" },
           { name = "arBookings" },
-        ]
-        sinks = [
+          { name = "slBookings" },
+        ], [for name in concat(local.quality_transformations, local.scd2_transformations) : { name = name }])
+        sinks = concat([
           {
             name = "sinkAirline"
             linkedService = {
@@ -160,7 +327,23 @@ locals {
               type          = "LinkedServiceReference"
             }
           }
-        ]
+        ], [
+          for name, sink in local.scd2_dimension_sinks : {
+            name = "cnv${sink.stream}"
+            linkedService = {
+              referenceName = var.adls_linked_service_name
+              type          = "LinkedServiceReference"
+            }
+          }
+        ], [
+          for stream in local.quality_streams : {
+            name = "quarantine${stream}"
+            linkedService = {
+              referenceName = var.adls_linked_service_name
+              type          = "LinkedServiceReference"
+            }
+          }
+        ])
         scriptLines = local.dataflow_script_lines
       }
     }
@@ -223,3 +223,38 @@ variable "bookings_sink_file" {
   description = "Bookings parquet file name"
   default     = "fact_bookings.parquet"
 }
+
+variable "delta_optimized_write" {
+  type        = bool
+  description = "Enable optimizedWrite on the silver delta sinks (see scripts/storage_bench.py)"
+  default     = false
+}
+
+variable "delta_auto_compact" {
+  type        = bool
+  description = "Enable autoCompact on the silver delta sinks (see scripts/storage_bench.py)"
+  default     = false
+}
+
+variable "scd2_dimensions" {
+  type        = list(string)
+  description = "Dimensions written as SCD type 2 history (effective_from/effective_to/is_current) instead of keyed upserts"
+  default     = ["airline", "passenger"]
+
+  validation {
+    condition     = alltrue([for name in var.scd2_dimensions : contains(["airline", "passenger"], name)])
+    error_message = "scd2_dimensions can only contain airline and passenger."
+  }
+}
+
+variable "validate_schema" {
+  type        = bool
+  description = "Fail a dimension source whose file is missing a column declared in its source schema"
+  default     = true
+}
+
+variable "quarantine_folder" {
+  type        = string
+  description = "Folder in source_container for rows that fail a data-quality rule (one delta table per source)"
+  default     = "airport/_quarantine"
+}
@@ -36,15 +36,22 @@ locals {
   bookings_source_path = "${var.source_folder}/${var.bookings_source_file}"
   sink_path            = "${var.sink_folder}/${var.sink_name}"
 
+  # With airline history (SCD type 2 in 10_adf_dataflow_bronze_silver) each booking joins the
+  # airline version in effect on its booking_date. Non-equi joins need a fixed broadcast side.
+  airline_history        = contains(var.scd2_dimensions, "airline")
+  airline_source_columns = local.airline_history ? "airline_id as integer, airline_name as string, country as string, effective_from as timestamp, effective_to as timestamp" : "airline_id as integer, airline_name as string, country as string"
+  airline_join_condition = local.airline_history ? "factBookings@airline_id === airline@airline_id && toTimestamp(factBookings@booking_date) >= airline@effective_from && (isNull(airline@effective_to) || toTimestamp(factBookings@booking_date) < airline@effective_to)" : "factBookings@airline_id === airline@airline_id"
+  airline_join_broadcast = local.airline_history ? "right" : "auto"
+
   # Notes:
   # - Use ADF script scoping syntax with @ (e.g., factBookings@airline_id) to avoid context errors.
   # - Avoid referencing upstream streams inside select() after join (ADF parser/runtime is picky).
   # - Use rank + filter for Top 5 (more reliable than window syntax variations).
   dataflow_script_lines = [
     "source(output(booking_id as integer, passenger_id as integer, flight_id as integer, airline_id as integer, origin_airport_id as integer, destination_airport_id as integer, booking_date as date, ticket_cost as decimal(10,2), flight_duration_mins as integer, checkin_status as string), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.source_container}', folderPath: '${local.bookings_source_path}') ~> factBookings",
-    "source(output(airline_id as integer, airline_name as string, country as string), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.source_container}', folderPath: '${local.airline_source_path}') ~> airline",
+    "source(output(${local.airline_source_columns}), allowSchemaDrift: true, validateSchema: false, ignoreNoFilesFound: false, store: 'AzureBlobFS', format: 'delta', fileSystem: '${var.source_container}', folderPath: '${local.airline_source_path}') ~> airline",
 
-    "factBookings, airline join(factBookings@airline_id === airline@airline_id, joinType:'left', matchType:'exact', ignoreSpaces:false, broadcast:'auto') ~> join1",
+    "factBookings, airline join(${local.airline_join_condition}, joinType:'left', matchType:'exact', ignoreSpaces:false, broadcast:'${local.airline_join_broadcast}') ~> join1",
 
     # Aggregate ticket cost by airline name
     "join1 aggregate(groupBy(airline_name), total_sales = sum(ticket_cost)) ~> aggregate1",
@@ -62,3 +62,9 @@ variable "sink_name" {
   description = "Gold output folder name for airline sales"
   default     = "airline_sales_top5"
 }
+
+variable "scd2_dimensions" {
+  type        = list(string)
+  description = "Silver dimensions kept as SCD type 2 history; the airline join becomes point-in-time when it includes airline"
+  default     = ["airline", "passenger"]
+}